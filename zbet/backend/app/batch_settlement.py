@@ -0,0 +1,156 @@
+"""
+Batch settlement of expired events.
+
+Every event is settled in its own session and transaction, so a failure only
+rolls back that event. Independent events run on a thread pool; an in-process
+set of events being settled plus a conditional claim on the sport_events row
+keep two runners (or a runner and a manual settlement) from settling the same
+event.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Optional, Set
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from . import models, crud, betting_utils
+from .config import settings
+from .database import SessionLocal
+
+# Events being settled in this process; an id is removed as soon as its settlement ends
+_settling: Set[int] = set()
+_settling_guard = threading.Lock()
+
+
+@contextmanager
+def _event_lock(event_id: int):
+    """Mark an event as being settled for the block; yields False if it already was"""
+    with _settling_guard:
+        acquired = event_id not in _settling
+        _settling.add(event_id)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with _settling_guard:
+                _settling.discard(event_id)
+
+
+def _claim_event(db: Session, event_id: int) -> bool:
+    """
+    Take the write lock on the event row as the transaction's first statement.
+
+    The no-op UPDATE only matches events that are still open for settlement, so
+    a runner that waited behind another one sees the committed SETTLED status
+    and backs off instead of settling twice.
+    """
+    sport_events = models.SportEvent.__table__
+    result = db.execute(
+        update(sport_events).where(
+            sport_events.c.id == event_id,
+            sport_events.c.status.in_([models.EventStatus.OPEN.name, models.EventStatus.CLOSED.name])
+        ).values(status=sport_events.c.status)
+    )
+    return result.rowcount == 1
+
+
+def settle_expired_event(event_id: int, session_factory=SessionLocal,
+                         refund_without_consensus: bool = True) -> dict:
+    """
+    Settle one expired event in its own transaction.
+
+    Consensus is computed once: the event is settled with the consensus outcome
+    if there is one, otherwise as a PUSH (refund all bets). With
+    refund_without_consensus=False an event without consensus is left alone
+    (action "no_consensus"). Returns a result dict including how long the
+    event took.
+    """
+    started = time.perf_counter()
+    with _event_lock(event_id) as acquired:
+        if not acquired:
+            return {
+                "event_id": event_id,
+                "action": "skipped",
+                "reason": "Settlement already in progress",
+                "duration_ms": 0.0
+            }
+        result = _settle_event(event_id, session_factory, refund_without_consensus)
+
+    result["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def _settle_event(event_id: int, session_factory, refund_without_consensus: bool) -> dict:
+    """settle_expired_event for an event this thread has marked as settling"""
+    db = session_factory()
+    try:
+        if not _claim_event(db, event_id):
+            db.rollback()
+            result = {
+                "event_id": event_id,
+                "action": "skipped",
+                "reason": "Event is no longer open for settlement"
+            }
+        else:
+            consensus_outcome, consensus_percentage = crud.determine_consensus_outcome(db, event_id)
+
+            if consensus_outcome:
+                settlement_response = betting_utils.settle_event(db, event_id, consensus_outcome)
+                result = {
+                    "event_id": event_id,
+                    "action": "settled_with_consensus",
+                    "winning_outcome": consensus_outcome,
+                    "consensus_percentage": consensus_percentage,
+                    "total_payouts": settlement_response.total_payouts,
+                    "total_payout_amount": settlement_response.total_payout_amount
+                }
+            elif not refund_without_consensus:
+                db.rollback()
+                result = {
+                    "event_id": event_id,
+                    "action": "no_consensus"
+                }
+            else:
+                # No consensus - settle with PUSH (refund all bets)
+                settlement_response = betting_utils.settle_event(db, event_id, "push")
+                result = {
+                    "event_id": event_id,
+                    "action": "cancelled_and_refunded",
+                    "reason": "No validation consensus reached by deadline",
+                    "total_refunds": settlement_response.total_payouts,
+                    "total_refund_amount": settlement_response.total_payout_amount
+                }
+    except Exception as e:
+        db.rollback()
+        print(f"Error processing expired event {event_id}: {str(e)}")
+        result = {
+            "event_id": event_id,
+            "action": "error",
+            "error": str(e)
+        }
+    finally:
+        db.close()
+
+    return result
+
+
+def settle_expired_events(event_ids: List[int], max_workers: Optional[int] = None,
+                          session_factory=SessionLocal) -> List[dict]:
+    """
+    Settle a batch of expired events concurrently, one transaction per event.
+
+    Results are returned in the order of event_ids. With max_workers <= 1 the
+    events are settled one after another on the calling thread.
+    """
+    if max_workers is None:
+        max_workers = settings.SETTLEMENT_WORKERS
+
+    if max_workers <= 1 or len(event_ids) <= 1:
+        return [settle_expired_event(event_id, session_factory) for event_id in event_ids]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda event_id: settle_expired_event(event_id, session_factory), event_ids))
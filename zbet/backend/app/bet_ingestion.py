@@ -0,0 +1,256 @@
+"""
+Group-commit bet ingestion for peak bursts (optional, BET_GROUP_COMMIT).
+
+SQLite has a single writer, and placing a bet the usual way commits several
+times (bet, ledger row, confirmation, pool totals), each waiting on its own
+fsync. Just before event_start_time that queue of fsyncs caps throughput.
+
+In group-commit mode place_bet validates the request as usual, then hands it
+to one writer thread and waits. The writer takes everything queued (waiting
+at most BET_GROUP_COMMIT_WINDOW_MS for stragglers, up to
+BET_GROUP_COMMIT_MAX_BATCH bets) and writes the whole micro-batch in one
+transaction: bets, BET_PLACED ledger rows (one bulk insert through
+LedgerWriter), user balances and pool totals. Each request is answered once
+the commit that contains its bet has returned.
+
+Within a batch, every bet is re-checked before anything is written for it:
+the event must still be open, the outcome must have a pool and the user's
+balance must cover the bet after the bets already accepted in the same batch.
+A bet that fails is rejected on its own. If writing the batch fails, the
+batch is rolled back and its bets are retried one transaction each, so one
+bad bet cannot fail its neighbours.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from . import models, schemas, betting_utils
+from .config import settings
+from .database import SessionLocal
+from .odds_cache import odds_cache
+from .transaction_service import LedgerWriter
+
+
+class PendingBet(NamedTuple):
+    user_id: int
+    request: schemas.BetPlacementRequest
+    future: Future
+
+
+class BetIngestor:
+    """Single writer thread committing queued bets in micro-batches"""
+
+    def __init__(self, session_factory=SessionLocal, window_ms: float = None, max_batch: int = None):
+        self.session_factory = session_factory
+        self.window_seconds = (window_ms if window_ms is not None else settings.BET_GROUP_COMMIT_WINDOW_MS) / 1000
+        self.max_batch = max_batch if max_batch is not None else settings.BET_GROUP_COMMIT_MAX_BATCH
+        self._queue: "queue.Queue[Optional[PendingBet]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # Metrics
+        self.batches = 0
+        self.bets_committed = 0
+        self.bets_rejected = 0
+        self.batch_fallbacks = 0
+        self.largest_batch = 0
+        self.commit_seconds_total = 0.0
+
+    def submit(self, user_id: int, request: schemas.BetPlacementRequest) -> Future:
+        """Queue a validated bet; the future resolves to the bet id once its batch commits"""
+        self.start()
+        future = Future()
+        self._queue.put(PendingBet(user_id, request, future))
+        return future
+
+    # Writer
+
+    def _next_batch(self, first: PendingBet) -> List[PendingBet]:
+        batch = [first]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch:
+            try:
+                # Take what is already queued, then wait briefly for stragglers
+                remaining = deadline - time.monotonic()
+                pending = self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if pending is None:
+                # Stop requested; finish this batch first
+                self._queue.put(None)
+                break
+            batch.append(pending)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._next_batch(first)
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                print(f"Bet ingestion batch failed: {str(e)}")
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(HTTPException(status_code=500, detail="Failed to place bet"))
+
+    def write_batch(self, batch: List[PendingBet]) -> int:
+        """Write and commit one micro-batch. Returns the number of bets committed."""
+        started = time.perf_counter()
+        with self.session_factory() as db:
+            try:
+                accepted = self._write(db, batch)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                if len(batch) == 1:
+                    raise
+                # Isolate the failure: one transaction per bet
+                print(f"Bet batch of {len(batch)} failed ({str(e)}); retrying bets one at a time")
+                self.batch_fallbacks += 1
+                return sum(self._write_alone(pending) for pending in batch)
+
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.commit_seconds_total += time.perf_counter() - started
+        self._committed(accepted)
+        return len(accepted)
+
+    def _write_alone(self, pending: PendingBet) -> int:
+        try:
+            return self.write_batch([pending])
+        except Exception as e:
+            print(f"Error placing bet for user {pending.user_id}: {str(e)}")
+            pending.future.set_exception(
+                e if isinstance(e, HTTPException) else HTTPException(status_code=500, detail="Failed to place bet")
+            )
+            return 0
+
+    def _write(self, db: Session, batch: List[PendingBet]) -> List[tuple]:
+        """Check and stage every bet in the batch; rejected bets get their error and are left out"""
+        spent: Dict[int, float] = {}
+        accepted = []
+        for pending in batch:
+            if pending.future.done():
+                continue
+            try:
+                sport_event, user = self._check(db, pending, spent)
+            except HTTPException as e:
+                self.bets_rejected += 1
+                pending.future.set_exception(e)
+                continue
+
+            bet = models.Bet(
+                user_id=pending.user_id,
+                sport_event_id=sport_event.id,
+                amount=pending.request.amount,
+                predicted_outcome=pending.request.predicted_outcome,
+                deposit_status=models.DepositStatus.CONFIRMED,
+                deposit_confirmed_at=datetime.utcnow()
+            )
+            db.add(bet)
+            # Pool objects stay in the identity map, so increments accumulate across the batch
+            betting_utils.update_pari_mutuel_pool_stats(db, bet, sport_event)
+            spent[pending.user_id] = spent.get(pending.user_id, 0.0) + bet.amount
+            accepted.append((pending, bet, user.zcash_transparent_address or user.zcash_address))
+
+        if not accepted:
+            return accepted
+
+        # Bet ids are needed for the ledger rows
+        db.flush()
+        ledger = LedgerWriter(db)
+        for pending, bet, _ in accepted:
+            ledger.add(
+                user_id=bet.user_id,
+                transaction_type=models.TransactionType.BET_PLACED,
+                amount=-bet.amount,  # Negative for bet placement
+                description=f"Bet placed on event {bet.sport_event_id}",
+                sport_event_id=bet.sport_event_id,
+                bet_id=bet.id,
+                confirmed=True  # Bet transactions are internal
+            )
+        ledger.flush()
+        return [(pending, bet.id, address, bet.amount) for pending, bet, address in accepted]
+
+    def _check(self, db: Session, pending: PendingBet, spent: Dict[int, float]) -> Tuple[models.SportEvent, models.User]:
+        request = pending.request
+        sport_event = db.get(models.SportEvent, request.sport_event_id)
+        if not sport_event:
+            raise HTTPException(status_code=404, detail="Sport event not found")
+        betting_utils.validate_bet_for_event(sport_event, request.predicted_outcome, request.amount)
+        if sport_event.betting_system_type != models.BettingSystemType.PARI_MUTUEL:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported betting system: {sport_event.betting_system_type}"
+            )
+
+        odds = odds_cache.get(db, sport_event.id)
+        if odds is None:
+            raise HTTPException(status_code=500, detail="Pari-mutuel event not found for this sport event")
+        if request.predicted_outcome not in odds.outcome_index():
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid predicted outcome: '{request.predicted_outcome}'. "
+                       f"Available options: {[pool.outcome_name for pool in odds.pools]}"
+            )
+
+        user = db.get(models.User, pending.user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        available_balance = user.get_total_balance() - spent.get(pending.user_id, 0.0)
+        if available_balance < request.amount:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient balance. Available: {available_balance:.4f} ZEC, Required: {request.amount:.4f} ZEC"
+            )
+        return sport_event, user
+
+    def _committed(self, accepted: List[tuple]):
+        from .zcash_mod import zcash_wallet
+
+        for pending, bet_id, address, amount in accepted:
+            # Legacy balance deduction for development mode compatibility
+            if address:
+                zcash_wallet.deduct_user_balance(address, amount)
+            self.bets_committed += 1
+            pending.future.set_result(bet_id)
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="zbet-bet-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+
+    def metrics(self) -> dict:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "bets_committed": self.bets_committed,
+            "bets_rejected": self.bets_rejected,
+            "batch_fallbacks": self.batch_fallbacks,
+            "largest_batch": self.largest_batch,
+            "average_batch_size": self.bets_committed / self.batches if self.batches else None,
+            "average_commit_seconds": self.commit_seconds_total / self.batches if self.batches else None,
+            "window_ms": self.window_seconds * 1000,
+            "max_batch": self.max_batch
+        }
+
+
+bet_ingestor = BetIngestor()
@@ -7,18 +7,45 @@ This module contains betting system-specific logic that doesn't belong in CRUD o
 from datetime import datetime
 from typing import List, Dict, Any
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from . import models, schemas, serializers, crud
+from sqlalchemy import DateTime, Integer, and_, case, func, literal, select
+from sqlalchemy.orm import Session, joinedload
+from . import models, schemas, serializers, crud, pari_mutuel, payout_plans
+from . import odds_cache
 from .zcash_mod import zcash_wallet
 from .config import settings
 
 def get_est_now():
-    """Get current time in EST timezone"""
+    """Get current time in EST timezone (naive, like the stored event times)"""
     from datetime import datetime, timezone, timedelta
-    est_timezone = timezone(timedelta(hours=-5))  # EST is UTC-5
+    est_timezone = timezone(timedelta(hours=settings.EVENT_UTC_OFFSET_HOURS))  # EST is UTC-5
     return datetime.now(est_timezone).replace(tzinfo=None)
 
 
+def close_ended_events(db: Session, now=None) -> int:
+    """
+    Persist OPEN -> CLOSED for every event whose end time has passed, in one
+    UPDATE on the (status, event_end_time) index. Commits.
+    
+    Returns:
+        Number of events closed
+    """
+    now = now or get_est_now()
+    sport_events = models.SportEvent.__table__
+    closed_ids = db.execute(
+        sport_events.update().where(
+            sport_events.c.status == models.EventStatus.OPEN.name,
+            sport_events.c.event_end_time <= now
+        ).values(status=models.EventStatus.CLOSED.name).returning(sport_events.c.id)
+    ).scalars().all()
+    
+    # Stream subscribers see the close once it commits
+    for event_id in closed_ids:
+        odds_cache.record_status_change(db, event_id)
+    
+    db.commit()
+    return len(closed_ids)
+
+
 def update_pari_mutuel_pool_stats(db: Session, bet: models.Bet, sport_event: models.SportEvent):
     """Update pari-mutuel pool statistics when a bet is placed"""
     # Get the pari-mutuel event
@@ -57,8 +84,11 @@ def update_pari_mutuel_pool_stats(db: Session, bet: models.Bet, sport_event: mod
     # Update total pool amount in pari-mutuel event
     pari_event.total_pool += bet.amount
     
-    # Store pool ID in bet metadata for future reference
+    # Link the bet to its pool (indexed column, used for pool-scoped bet queries)
     bet.set_pari_mutuel_pool_id(pool.id)
+    
+    # Cached odds pick up the bet when this transaction commits
+    odds_cache.record_bet(db, sport_event.id, pool.outcome_name, bet.amount)
 
 
 def validate_bet_for_event(sport_event: models.SportEvent, predicted_outcome: str, amount: float, db: Session = None, user_id: int = None):
@@ -175,11 +205,12 @@ def settle_event_with_consensus(db: Session, event_id: int, pool_address: str =
         raise HTTPException(status_code=400, detail="Event must be closed for consensus settlement")
     
     # Check for validation consensus
-    consensus_outcome, consensus_percentage = crud.determine_consensus_outcome(db, event_id)
+    outcome_counts = crud.get_validation_tally(db, event_id)
+    consensus_outcome, consensus_percentage = crud.consensus_from_tally(outcome_counts)
     
     if consensus_outcome is None:
         # Check validation summary for better error message
-        summary = crud.get_validation_summary(db, event_id)
+        summary = crud.summarize_validation_tally(event_id, outcome_counts)
         if summary.total_validations < 3:
             raise HTTPException(
                 status_code=400, 
@@ -188,7 +219,7 @@ def settle_event_with_consensus(db: Session, event_id: int, pool_address: str =
         else:
             raise HTTPException(
                 status_code=400, 
-                detail=f"No consensus reached. Need 60% agreement, highest is {consensus_percentage:.1f}%"
+                detail=f"No consensus reached. Need 60% agreement, highest is {summary.consensus_percentage or 0:.1f}%"
             )
     
     # Use the consensus outcome to settle the event
@@ -244,6 +275,7 @@ def settle_event(db: Session, event_id: int, winning_outcome: str, pool_address:
     sport_event.settled_at = get_est_now()
     
     # Mark winning outcome in pari-mutuel event if applicable
+    pari_event = None
     if sport_event.betting_system_type == models.BettingSystemType.PARI_MUTUEL:
         pari_event = db.query(models.PariMutuelEvent).filter(
             models.PariMutuelEvent.sport_event_id == event_id
@@ -251,6 +283,12 @@ def settle_event(db: Session, event_id: int, winning_outcome: str, pool_address:
         if pari_event:
             pari_event.winning_outcome = winning_outcome
     
+    # Snapshot the payout plan so the review/payout views don't recompute it
+    payout_plans.save_payout_plan(db, sport_event, winning_outcome, pari_event)
+    
+    # Winning pool and payout ratios changed: cached odds are dropped on commit
+    odds_cache.record_invalidation(db, event_id)
+    
     db.commit()
     
     # Calculate totals
@@ -267,6 +305,171 @@ def settle_event(db: Session, event_id: int, winning_outcome: str, pool_address:
     )
 
 
+def process_event_payouts(db: Session, event_id: int) -> dict:
+    """
+    Create payout records for review (Phase 2 - Process Payouts).
+    
+    Creates payout records if they don't exist (backup for settlement) and
+    returns a summary of the pending records. Does NOT send any Zcash
+    transactions. Commits.
+    """
+    # Get the event with relationships
+    sport_event = db.query(models.SportEvent).options(
+        joinedload(models.SportEvent.nonprofit),
+        joinedload(models.SportEvent.creator)
+    ).filter(models.SportEvent.id == event_id).first()
+    
+    if not sport_event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    if sport_event.status != models.EventStatus.SETTLED:
+        raise HTTPException(status_code=400, detail="Event must be settled before processing payouts")
+    
+    # Check for existing pending payouts
+    pending_payouts = db.query(models.Payout).filter(
+        models.Payout.sport_event_id == event_id,
+        models.Payout.is_processed == False
+    ).all()
+    
+    # If no pending payouts exist, create them from the settled event
+    if not pending_payouts:
+        # Unless they were already sent: new records would pay everyone again
+        already_sent = db.query(models.Payout.id).filter(
+            models.Payout.sport_event_id == event_id,
+            models.Payout.is_processed == True
+        ).first()
+        if already_sent:
+            raise HTTPException(status_code=400, detail="Payouts for this event were already sent")
+        
+        print(f"No existing payouts found for event {event_id}. Creating payout records...")
+        
+        # Get the pari-mutuel event to find the winning outcome
+        pari_event = db.query(models.PariMutuelEvent).filter(
+            models.PariMutuelEvent.sport_event_id == event_id
+        ).first()
+        
+        if not pari_event or not pari_event.winning_outcome:
+            raise HTTPException(status_code=400, detail="Event must have a winning outcome to process payouts")
+        
+        # Use the existing settlement logic to create payout records
+        # This reuses the same logic from _process_event_payouts
+        payout_records_list = _process_event_payouts(db, sport_event, pari_event.winning_outcome)
+        
+        # The above function creates the Payout records in the database
+        # Now query for the newly created pending payouts
+        pending_payouts = db.query(models.Payout).filter(
+            models.Payout.sport_event_id == event_id,
+            models.Payout.is_processed == False
+        ).all()
+        
+        if not pending_payouts:
+            raise HTTPException(status_code=400, detail="Failed to create payout records")
+        
+        payout_plans.save_payout_plan(db, sport_event, pari_event.winning_outcome, pari_event)
+    
+    db.commit()
+    
+    return {
+        "event_id": event_id,
+        "created_payouts": len(pending_payouts),
+        "total_amount_calculated": sum(p.payout_amount for p in pending_payouts),
+        "message": "Payout records created successfully. Ready for review."
+    }
+
+
+def send_event_payouts(db: Session, event_id: int) -> dict:
+    """
+    Send Zcash transactions for an event's pending payouts (Phase 3 - Send Payouts).
+    
+    Sends the external payouts from the stored payout plan in one z_sendmany,
+    marks the payout records processed, adds internal payouts to the wallet
+    balances (dev mode) and records the transaction ID on the plan. Commits.
+    """
+    sport_event = db.query(models.SportEvent).filter(models.SportEvent.id == event_id).first()
+    if not sport_event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    # Payouts come from the plan stored at settlement; a sent plan has nothing pending
+    plan_row = payout_plans.get_payout_plan(db, sport_event)
+    planned_payouts = payout_plans.payout_rows(payout_plans.plan_data(plan_row)) if plan_row and not plan_row.sent_at else []
+    
+    # Only send plan rows whose payout records are still unprocessed
+    unprocessed_ids = {
+        payout_id for (payout_id,) in db.query(models.Payout.id).filter(
+            models.Payout.sport_event_id == event_id,
+            models.Payout.is_processed == False
+        )
+    }
+    pending_payouts = [p for p in planned_payouts if p["payout_id"] in unprocessed_ids]
+    
+    if not pending_payouts:
+        raise HTTPException(status_code=400, detail="No pending payouts found. Process payouts first.")
+    
+    # Claim the plan before touching the node: of two concurrent senders only
+    # the one whose conditional UPDATE matches broadcasts
+    plan_id = plan_row.id
+    claimed = db.query(models.EventPayoutPlan).filter(
+        models.EventPayoutPlan.id == plan_id,
+        models.EventPayoutPlan.sent_at.is_(None)
+    ).update({models.EventPayoutPlan.sent_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Payouts for this event are already being sent")
+    
+    # Convert to PayoutRecord format for the batch payout function
+    payout_records = [
+        schemas.PayoutRecord(
+            user_id=p["user_id"], bet_id=p["bet_id"], payout_amount=p["payout_amount"],
+            payout_type=p["payout_type"], recipient_address=p["recipient_address"]
+        ) for p in pending_payouts
+    ]
+    
+    # Send the batch payout transaction (only for external addresses)
+    pool_address = settings.get_pool_address()
+    try:
+        transaction_id = _send_batch_payouts(pool_address, payout_records)
+    except Exception:
+        # z_sendmany only returns an operation id (the broadcast happens later),
+        # so a failed call sent nothing: release the claim for a later attempt
+        db.rollback()
+        db.query(models.EventPayoutPlan).filter(
+            models.EventPayoutPlan.id == plan_id,
+            models.EventPayoutPlan.transaction_id.is_(None)
+        ).update({models.EventPayoutPlan.sent_at: None}, synchronize_session=False)
+        db.commit()
+        raise
+    
+    # Mark as processed and add to user balances
+    db.query(models.Payout).filter(
+        models.Payout.id.in_([p["payout_id"] for p in pending_payouts]),
+        models.Payout.is_processed == False
+    ).update({
+        models.Payout.is_processed: True,
+        models.Payout.zcash_transaction_id: transaction_id
+    }, synchronize_session=False)
+    db.query(models.EventPayoutPlan).filter(models.EventPayoutPlan.id == plan_id).update({
+        models.EventPayoutPlan.sent_at: datetime.utcnow(),
+        models.EventPayoutPlan.transaction_id: transaction_id
+    }, synchronize_session=False)
+    
+    for payout in pending_payouts:
+        # Add payout to user balance for ALL internal payouts 
+        if payout["user_id"] and payout["payout_type"] in ["user_winning", "creator_fee", "validator_fee"]:
+            if payout["user_address"]:
+                zcash_wallet.add_user_balance(payout["user_address"], payout["payout_amount"])
+                print(f"Added {payout['payout_amount']} ZEC to {payout['username']} balance ({payout['payout_type']})")
+    
+    # Payout flags and the plan are committed together
+    db.commit()
+    
+    return {
+        "event_id": event_id,
+        "processed_payouts": len(pending_payouts),
+        "total_amount_paid": sum(p["payout_amount"] for p in pending_payouts),
+        "transaction_id": transaction_id
+    }
+
+
 def mark_event_paid_out(db: Session, event_id: int) -> bool:
     """
     Mark an event as paid out after all payments have been processed.
@@ -301,11 +504,46 @@ def mark_event_paid_out(db: Session, event_id: int) -> bool:
     
     # Mark event as paid out
     sport_event.status = models.EventStatus.PAIDOUT
+    odds_cache.record_status_change(db, event_id)
     db.commit()
     
     return True
 
 
+def mark_sent_events_paid_out(db: Session) -> int:
+    """
+    Mark every settled event whose payouts have all been processed as paid out.
+    
+    Same rule as mark_event_paid_out, applied to all settled events in one
+    statement. Events without any payout records are left alone.
+    
+    Returns:
+        int: Number of events marked as paid out
+    """
+    payouts = models.Payout.__table__
+    sport_events = models.SportEvent.__table__
+    
+    has_payouts = select(payouts.c.id).where(payouts.c.sport_event_id == sport_events.c.id).exists()
+    has_unprocessed = select(payouts.c.id).where(
+        payouts.c.sport_event_id == sport_events.c.id,
+        payouts.c.is_processed == False
+    ).exists()
+    
+    paid_out_ids = db.execute(
+        sport_events.update().where(
+            sport_events.c.status == models.EventStatus.SETTLED.name,
+            has_payouts,
+            ~has_unprocessed
+        ).values(status=models.EventStatus.PAIDOUT.name).returning(sport_events.c.id)
+    ).scalars().all()
+    
+    for event_id in paid_out_ids:
+        odds_cache.record_status_change(db, event_id)
+    
+    db.commit()
+    return len(paid_out_ids)
+
+
 def _validate_winning_outcome(db: Session, sport_event: models.SportEvent, winning_outcome: str):
     """Validate that the winning outcome is valid for this event"""
     
@@ -371,17 +609,25 @@ def _mark_winning_pool(db: Session, sport_event: models.SportEvent, winning_outc
 
 def _process_event_payouts(db: Session, sport_event: models.SportEvent, winning_outcome: str) -> List[schemas.PayoutRecord]:
     """
-    Process all bets for an event and create payout records for winners.
+    Settle all confirmed bets for an event and create payout records, set-based.
+    
+    Bet outcomes are set with one bulk UPDATE keyed on predicted_outcome, winner
+    (or refund) payouts are created with one INSERT ... SELECT joined to users,
+    and validator rewards the same way, so the statement count does not grow
+    with the number of bets. Nothing is committed here.
     
     Returns list of PayoutRecord objects for the settlement response.
     """
-    payout_records = []
-    
-    # Get all confirmed bets for this event
-    bets = db.query(models.Bet).filter(
-        models.Bet.sport_event_id == sport_event.id,
-        models.Bet.deposit_status == models.DepositStatus.CONFIRMED
-    ).all()
+    bets = models.Bet.__table__
+    payouts = models.Payout.__table__
+    validations = models.ValidationResult.__table__
+    users = models.User.__table__
+    
+    now = datetime.utcnow()
+    confirmed_bets = and_(
+        bets.c.sport_event_id == sport_event.id,
+        bets.c.deposit_status == models.DepositStatus.CONFIRMED.name
+    )
 
     # Calculate total fees once for the entire event
     total_house_fees = 0.0
@@ -398,153 +644,99 @@ def _process_event_payouts(db: Session, sport_event: models.SportEvent, winning_
         ).first()
         
         if pari_event:
-            # Find winning pool
-            winning_pool = db.query(models.PariMutuelPool).filter(
-                models.PariMutuelPool.pari_mutuel_event_id == pari_event.id,
-                models.PariMutuelPool.outcome_name == winning_outcome
-            ).first()
-            
-            if winning_pool:
-                losing_pool_gross = pari_event.total_pool - winning_pool.pool_amount
-                
-                # Only calculate fees if there's a losing pool
-                if losing_pool_gross > 0:
-                    total_house_fees = losing_pool_gross * pari_event.house_fee_percentage
-                    total_creator_fees = losing_pool_gross * pari_event.creator_fee_percentage
-                    total_validator_fees = losing_pool_gross * pari_event.validator_fee_percentage
-                    total_charity_fees = losing_pool_gross * pari_event.charity_fee_percentage
-
-    # Process all bets
-    for bet in bets:
-        # Determine bet outcome
-        if winning_outcome.lower() == "push" or winning_outcome.lower() == "tie":
-            # PUSH/TIE: Everyone gets their money back (refund)
-            bet.outcome = models.BetOutcome.PUSH
-            bet.payout_amount = bet.amount  # Full refund
+            pools = db.query(
+                models.PariMutuelPool.outcome_name, models.PariMutuelPool.pool_amount
+            ).filter(
+                models.PariMutuelPool.pari_mutuel_event_id == pari_event.id
+            ).all()
+            outcome_names = [pool.outcome_name for pool in pools]
             
-            # Create payout record for refund
-            payout = models.Payout(
-                user_id=bet.user_id,
-                bet_id=bet.id,
-                sport_event_id=sport_event.id,
-                payout_amount=bet.amount,
-                recipient_address=bet.user.zcash_address,
-                payout_type="refund",
-                is_processed=False
+            if winning_outcome in outcome_names:
+                # Each pool is one "bet" of its total, so the calculator's fee totals
+                # come straight from the losing pool (zero when nobody bet against)
+                settlement = pari_mutuel.calculate_settlement(
+                    amounts=[pool.pool_amount for pool in pools],
+                    outcome_indices=range(len(pools)),
+                    winning_index=outcome_names.index(winning_outcome),
+                    fees=pari_mutuel.PariMutuelFees.from_event(pari_event)
+                )
+                total_house_fees = settlement.fees["house"]
+                total_creator_fees = settlement.fees["creator"]
+                total_validator_fees = settlement.fees["validator"]
+                total_charity_fees = settlement.fees["charity"]
+    
+    # Payout ids above this one are the rows created by this call
+    last_payout_id = db.query(func.max(models.Payout.id)).scalar() or 0
+
+    # Mark every confirmed bet in one statement
+    if is_push_outcome:
+        # PUSH/TIE: Everyone gets their money back (refund)
+        paid_bets = confirmed_bets
+        bet_payout_type = "refund"
+        db.execute(
+            bets.update().where(confirmed_bets).values(
+                outcome=models.BetOutcome.PUSH.name,
+                payout_amount=bets.c.amount  # Full refund
             )
-            db.add(payout)
-            
-            # Add to response records
-            payout_records.append(schemas.PayoutRecord(
-                user_id=bet.user_id,
-                bet_id=bet.id,
-                payout_amount=bet.amount,
-                payout_type="refund",
-                recipient_address=bet.user.zcash_address
-            ))
-            
-        elif bet.predicted_outcome == winning_outcome:
-            # Winning bet - winner gets refund (original bet amount back)
-            bet.outcome = models.BetOutcome.WIN
-            bet.payout_amount = bet.amount  # Refund = original bet amount
-                        
-            # Create payout record in database for winner's refund
-            payout = models.Payout(
-                user_id=bet.user_id,
-                bet_id=bet.id,
-                sport_event_id=sport_event.id,
-                payout_amount=bet.amount,  # Refund = original bet amount
-                recipient_address=bet.user.zcash_address,
-                payout_type="user_winning",
-                is_processed=False
+        )
+    else:
+        # Winners get a refund of the original bet amount, losers get nothing
+        is_winner = bets.c.predicted_outcome == winning_outcome
+        paid_bets = and_(confirmed_bets, is_winner)
+        bet_payout_type = "user_winning"
+        db.execute(
+            bets.update().where(confirmed_bets).values(
+                outcome=case((is_winner, models.BetOutcome.WIN.name), else_=models.BetOutcome.LOSS.name),
+                payout_amount=case((is_winner, bets.c.amount), else_=0.0)
             )
-            db.add(payout)
-            
-            # Add to response records
-            payout_records.append(schemas.PayoutRecord(
-                user_id=bet.user_id,
-                bet_id=bet.id,
-                payout_amount=bet.amount,  # Refund = original bet amount
-                payout_type="user_winning",
-                recipient_address=bet.user.zcash_address
-            ))
-            
-        else:
-            # Losing bet
-            bet.outcome = models.BetOutcome.LOSS
-            bet.payout_amount = 0.0
+        )
+    
+    payout_columns = [
+        "user_id", "bet_id", "sport_event_id", "payout_type", "payout_amount", "recipient_address",
+        "house_fee_deducted", "creator_fee_deducted", "payout_processed_at", "is_processed"
+    ]
     
-    # Create house fee payout record if there are fees to collect
+    # Create payout records for refunds/winners straight from the bets table
+    db.execute(payouts.insert().from_select(payout_columns, select(
+        bets.c.user_id,
+        bets.c.id,
+        literal(sport_event.id),
+        literal(bet_payout_type),
+        bets.c.amount,
+        users.c.zcash_address,
+        literal(0.0),
+        literal(0.0),
+        literal(now, DateTime),
+        literal(False)
+    ).select_from(bets.join(users, users.c.id == bets.c.user_id)).where(paid_bets).order_by(bets.c.id)))
+    
+    # House, creator and charity fee payout records (only when there are fees to collect)
+    fee_payouts = []
     if total_house_fees > 0:
         # Get house address from environment configuration
-        house_address = settings.get_house_address()
-        
-        house_payout = models.Payout(
-            user_id=None,  # No user for house fees
-            bet_id=None,   # No specific bet
-            sport_event_id=sport_event.id,
-            payout_amount=total_house_fees,
-            recipient_address=house_address,
-            payout_type="house_fee",
-            is_processed=False
-        )
-        db.add(house_payout)
-        
-        payout_records.append(schemas.PayoutRecord(
-            user_id=None,
-            bet_id=None,
-            payout_amount=total_house_fees,
-            payout_type="house_fee",
-            recipient_address=house_address
-        ))
-    
-    # Create creator fee payout record if there are fees to collect
+        fee_payouts.append((None, "house_fee", total_house_fees, settings.get_house_address()))
     if total_creator_fees > 0:
-        # Get creator address from the event data
-        creator_address = sport_event.creator.zcash_address
-        
-        creator_payout = models.Payout(
-            user_id=sport_event.creator_id,  # Get user id from the event data
-            bet_id=None,   # No specific bet
-            sport_event_id=sport_event.id,
-            payout_amount=total_creator_fees,
-            recipient_address=creator_address,
-            payout_type="creator_fee",
-            is_processed=False
-        )
-        db.add(creator_payout)
-        
-        payout_records.append(schemas.PayoutRecord(
-            user_id=sport_event.creator_id,
-            bet_id=None,
-            payout_amount=total_creator_fees,
-            payout_type="creator_fee",
-            recipient_address=creator_address
-        ))
-
-    # Create charity fee payout record if there are fees to collect
+        fee_payouts.append((sport_event.creator_id, "creator_fee", total_creator_fees, sport_event.creator.zcash_address))
     if total_charity_fees > 0:
-        # Get creator address from the event data
-        charity_address = sport_event.nonprofit.zcash_transparent_address
-        
-        charity_payout = models.Payout(
-            user_id=None,  # Nonprofits are not users, similar to house fees
-            bet_id=None,   # No specific bet
-            sport_event_id=sport_event.id,
-            payout_amount=total_charity_fees,
-            recipient_address=charity_address,
-            payout_type="charity_fee",
-            is_processed=False
-        )
-        db.add(charity_payout)
-        
-        payout_records.append(schemas.PayoutRecord(
-            user_id=None,
-            bet_id=None,
-            payout_amount=total_charity_fees,
-            payout_type="charity_fee",
-            recipient_address=charity_address
-        ))
+        # Nonprofits are not users, similar to house fees
+        fee_payouts.append((None, "charity_fee", total_charity_fees, sport_event.nonprofit.zcash_transparent_address))
+    
+    if fee_payouts:
+        db.execute(payouts.insert(), [
+            {
+                "user_id": user_id,
+                "bet_id": None,
+                "sport_event_id": sport_event.id,
+                "payout_type": payout_type,
+                "payout_amount": amount,
+                "recipient_address": address,
+                "house_fee_deducted": 0.0,
+                "creator_fee_deducted": 0.0,
+                "payout_processed_at": now,
+                "is_processed": False
+            }
+            for user_id, payout_type, amount, address in fee_payouts
+        ])
     
     # Create validator fee payout records if there are fees to collect
     if total_validator_fees > 0:
@@ -554,40 +746,47 @@ def _process_event_payouts(db: Session, sport_event: models.SportEvent, winning_
         )
         
         if num_rewarded_validators > 0:
-            # Get all correct validations to create payout records
-            correct_validations = db.query(models.ValidationResult).filter(
-                models.ValidationResult.sport_event_id == sport_event.id,
-                models.ValidationResult.is_correct_validation == True
-            ).all()
-            
-            # Create individual payout records for each validator
-            for validation in correct_validations:
-                validator_payout = models.Payout(
-                    user_id=validation.user_id,
-                    bet_id=None,  # Not associated with a specific bet
-                    sport_event_id=sport_event.id,
-                    payout_amount=validation.validator_reward_amount,
-                    recipient_address=validation.user.zcash_address,
-                    payout_type="validator_fee",
-                    is_processed=False
-                )
-                db.add(validator_payout)
-                
-                # Add to response records
-                payout_records.append(schemas.PayoutRecord(
-                    user_id=validation.user_id,
-                    bet_id=None,
-                    payout_amount=validation.validator_reward_amount,
-                    payout_type="validator_fee",
-                    recipient_address=validation.user.zcash_address
-                ))
+            db.execute(payouts.insert().from_select(payout_columns, select(
+                validations.c.user_id,
+                literal(None, Integer),  # Not associated with a specific bet
+                literal(sport_event.id),
+                literal("validator_fee"),
+                validations.c.validator_reward_amount,
+                users.c.zcash_address,
+                literal(0.0),
+                literal(0.0),
+                literal(now, DateTime),
+                literal(False)
+            ).select_from(validations.join(users, users.c.id == validations.c.user_id)).where(
+                validations.c.sport_event_id == sport_event.id,
+                validations.c.is_correct_validation == True
+            ).order_by(validations.c.id)))
         else:
             # No validators to reward - fees remain in the pool
             # This could happen if no one validated correctly
             print(f"Warning: No validators to reward for event {sport_event.id}. Validator fees: {total_validator_fees}")
-            pass
     
-    return payout_records
+    # Read back the created payouts for the response in one query
+    created = db.execute(
+        select(
+            payouts.c.user_id, payouts.c.bet_id, payouts.c.payout_amount,
+            payouts.c.payout_type, payouts.c.recipient_address
+        ).where(
+            payouts.c.sport_event_id == sport_event.id,
+            payouts.c.id > last_payout_id
+        ).order_by(payouts.c.id)
+    )
+    
+    return [
+        schemas.PayoutRecord(
+            user_id=user_id,
+            bet_id=bet_id,
+            payout_amount=payout_amount,
+            payout_type=payout_type,
+            recipient_address=recipient_address
+        )
+        for user_id, bet_id, payout_amount, payout_type, recipient_address in created
+    ]
 
 def _send_batch_payouts(pool_address: str, payout_records: List[schemas.PayoutRecord]) -> str:
     """
@@ -18,6 +18,58 @@ class Settings:
     POOL_ZCASH_ADDRESS: str = os.getenv("POOL_ZCASH_ADDRESS", "ztestsapling1pool123456789abcdefghijklmnopqrstuvwxyz")
     HOUSE_ZCASH_ADDRESS: str = os.getenv("HOUSE_ZCASH_ADDRESS", "ztestsapling1house123456789abcdefghijklmnopqrstuvwxyz")
     
+    # Event times are stored as naive Eastern Standard Time (fixed UTC-5, no DST);
+    # betting_utils.get_est_now is the one clock they are compared against
+    EVENT_UTC_OFFSET_HOURS: float = float(os.getenv("EVENT_UTC_OFFSET_HOURS", "-5"))
+    
+    # In-process scheduler (see scheduler.py); intervals are in seconds. Settlement is
+    # driven by event deadlines (deadlines.py); the periodic pass is only a backstop
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+    SCHEDULER_TICK_SECONDS: float = float(os.getenv("SCHEDULER_TICK_SECONDS", "5"))
+    SCHEDULER_LEASE_SECONDS: float = float(os.getenv("SCHEDULER_LEASE_SECONDS", "30"))
+    SCHEDULER_LIFECYCLE_INTERVAL: float = float(os.getenv("SCHEDULER_LIFECYCLE_INTERVAL", "60"))
+    SCHEDULER_SETTLEMENT_INTERVAL: float = float(os.getenv("SCHEDULER_SETTLEMENT_INTERVAL", "900"))
+    SCHEDULER_PAYOUT_STATUS_INTERVAL: float = float(os.getenv("SCHEDULER_PAYOUT_STATUS_INTERVAL", "300"))
+    SCHEDULER_RECONCILIATION_INTERVAL: float = float(os.getenv("SCHEDULER_RECONCILIATION_INTERVAL", "3600"))
+    
+    # Batch settlement (see batch_settlement.py): default number of events settled concurrently
+    SETTLEMENT_WORKERS: int = int(os.getenv("SETTLEMENT_WORKERS", "4"))
+    
+    # Live odds cache (see odds_cache.py): how often each worker polls for other
+    # workers' changes (0 disables), and how long the change log is kept
+    ODDS_CACHE_SYNC_SECONDS: float = float(os.getenv("ODDS_CACHE_SYNC_SECONDS", "1"))
+    ODDS_CACHE_CHANGE_RETENTION_SECONDS: float = float(os.getenv("ODDS_CACHE_CHANGE_RETENTION_SECONDS", "600"))
+    
+    # Live odds stream (see odds_stream.py): at most one update per event per
+    # coalescing interval, a keepalive comment when idle, and a cap on ids per client
+    ODDS_STREAM_COALESCE_SECONDS: float = float(os.getenv("ODDS_STREAM_COALESCE_SECONDS", "1"))
+    ODDS_STREAM_KEEPALIVE_SECONDS: float = float(os.getenv("ODDS_STREAM_KEEPALIVE_SECONDS", "15"))
+    ODDS_STREAM_MAX_EVENTS: int = int(os.getenv("ODDS_STREAM_MAX_EVENTS", "50"))
+    
+    # Odds history (see odds_history.py): at most one pool-amount sample per event
+    # per interval, stored in chunks of up to CHUNK_SAMPLES samples
+    ODDS_HISTORY_INTERVAL_SECONDS: float = float(os.getenv("ODDS_HISTORY_INTERVAL_SECONDS", "10"))
+    ODDS_HISTORY_CHUNK_SAMPLES: int = int(os.getenv("ODDS_HISTORY_CHUNK_SAMPLES", "256"))
+    
+    # Response cache for event and nonprofit reads (see response_cache.py): entries
+    # expire after TTL_SECONDS (0 disables caching; ETags and 304s still apply)
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    
+    # Group-commit bet ingestion (see bet_ingestion.py): off by default. When on, bets
+    # are committed in micro-batches of up to MAX_BATCH, waiting at most WINDOW_MS
+    BET_GROUP_COMMIT: bool = os.getenv("BET_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+    BET_GROUP_COMMIT_WINDOW_MS: float = float(os.getenv("BET_GROUP_COMMIT_WINDOW_MS", "2"))
+    BET_GROUP_COMMIT_MAX_BATCH: int = int(os.getenv("BET_GROUP_COMMIT_MAX_BATCH", "200"))
+    
+    # Durable job queue (see job_queue.py); JOB_WORKERS=0 leaves queued jobs for another process
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_POLL_SECONDS: float = float(os.getenv("JOB_POLL_SECONDS", "2"))
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BASE_SECONDS: float = float(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+    JOB_RETRY_MAX_SECONDS: float = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+    
     @classmethod
     def get_pool_address(cls) -> str:
         return cls.POOL_ZCASH_ADDRESS
@@ -1,7 +1,11 @@
 from fastapi import HTTPException
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import base64
+import json
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, or_, select, tuple_
+from sqlalchemy.orm import Session, selectinload
 
 from . import auth, models, schemas, cleaners
 from .zcash_mod import zcash_utils, zcash_wallet
@@ -70,11 +74,21 @@ def create_user(db: Session, user: schemas.UserCreate):
 
 
 # Betting CRUD functions
-def get_sport_events(db: Session, skip: int = 0, limit: int = 100, status: str = None):
-    """Get all sport events with optional status filter"""
-    query = db.query(models.SportEvent)
+def get_sport_events(db: Session, skip: int = 0, limit: int = 100, status: models.EventStatus = None):
+    """
+    Get all sport events with optional status filter.
+    
+    A status filter reads the persisted status in event_end_time order straight
+    from the (status, event_end_time) index; unfiltered listings page by id.
+    Nonprofits for the whole page are loaded in one extra IN query.
+    """
+    query = db.query(models.SportEvent).options(selectinload(models.SportEvent.nonprofit))
     if status:
-        query = query.filter(models.SportEvent.status == status)
+        query = query.filter(models.SportEvent.status == status).order_by(
+            models.SportEvent.event_end_time, models.SportEvent.id
+        )
+    else:
+        query = query.order_by(models.SportEvent.id)
     return query.offset(skip).limit(limit).all()
 
 
@@ -83,6 +97,100 @@ def get_sport_event(db: Session, event_id: int):
     return db.query(models.SportEvent).filter(models.SportEvent.id == event_id).first()
 
 
+def get_expired_sport_events(db: Session, now: datetime):
+    """
+    Get events past their settlement deadline that are still OPEN or CLOSED.
+    
+    Filters on status with IN (not NOT IN) so the (status, settlement_time) index is used.
+    """
+    return db.query(models.SportEvent).filter(
+        models.SportEvent.status.in_([models.EventStatus.OPEN, models.EventStatus.CLOSED]),
+        models.SportEvent.settlement_time < now
+    ).all()
+
+
+def encode_settled_event_cursor(settled_at: Optional[datetime], event_id: int) -> str:
+    """Encode a settled event's (settled_at, id) position as an opaque pagination cursor"""
+    payload = json.dumps({"settled_at": settled_at.isoformat() if settled_at else None, "id": event_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_settled_event_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Decode a settled-events cursor; raises ValueError if it is malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        settled_at = datetime.fromisoformat(payload["settled_at"]) if payload["settled_at"] else None
+        return settled_at, int(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor}") from e
+
+
+def get_settled_events_page(db: Session, limit: int = 100, cursor: str = None):
+    """
+    Get one page of SETTLED events with their winning outcome, confirmed bet
+    count and confirmed pool total, newest settlement first.
+    
+    One query per page: the (status, settled_at) index yields the events in
+    page order and stops after limit + 1 rows, and the bet count and pool total
+    are correlated subqueries on the (sport_event_id, deposit_status) bet
+    index, so they only run for events on the page. Events settled before
+    settled_at was recorded sort last.
+    
+    Returns:
+        Tuple of (rows, next_cursor); each row is (SportEvent, winning_outcome,
+        bet_count, total_pool_amount). next_cursor is None on the last page.
+    """
+    confirmed_bets = and_(
+        models.Bet.sport_event_id == models.SportEvent.id,
+        models.Bet.deposit_status == models.DepositStatus.CONFIRMED
+    )
+    bet_count = select(func.count(models.Bet.id)).where(confirmed_bets).correlate(models.SportEvent).scalar_subquery()
+    total_pool_amount = select(func.coalesce(func.sum(models.Bet.amount), 0.0)).where(confirmed_bets).correlate(models.SportEvent).scalar_subquery()
+    
+    query = db.query(
+        models.SportEvent,
+        models.PariMutuelEvent.winning_outcome,
+        bet_count.label("bet_count"),
+        total_pool_amount.label("total_pool_amount")
+    ).outerjoin(
+        models.PariMutuelEvent,
+        and_(
+            models.PariMutuelEvent.sport_event_id == models.SportEvent.id,
+            models.SportEvent.betting_system_type == models.BettingSystemType.PARI_MUTUEL
+        )
+    ).filter(models.SportEvent.status == models.EventStatus.SETTLED)
+    
+    if cursor:
+        cursor_settled_at, cursor_id = decode_settled_event_cursor(cursor)
+        if cursor_settled_at is None:
+            query = query.filter(models.SportEvent.settled_at.is_(None), models.SportEvent.id < cursor_id)
+        else:
+            query = query.filter(or_(
+                tuple_(models.SportEvent.settled_at, models.SportEvent.id) < tuple_(cursor_settled_at, cursor_id),
+                models.SportEvent.settled_at.is_(None)
+            ))
+    
+    # Fetch one extra row to know whether there is another page
+    rows = query.order_by(
+        models.SportEvent.settled_at.desc(),
+        models.SportEvent.id.desc()
+    ).limit(limit + 1).all()
+    
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    last_event = rows[-1][0]
+    return rows, encode_settled_event_cursor(last_event.settled_at, last_event.id)
+
+
+def count_settled_events(db: Session) -> int:
+    """Count SETTLED events (index-only on status)"""
+    return db.query(func.count(models.SportEvent.id)).filter(
+        models.SportEvent.status == models.EventStatus.SETTLED
+    ).scalar()
+
+
 def create_sport_event(db: Session, event_data: schemas.SportEventCreate, creator_id: int):
     """Create a new sport event"""
     # Parse datetime strings as EST (no timezone conversion)
@@ -194,11 +302,25 @@ def create_validation_result(db: Session, user_id: int, sport_event_id: int, val
     )
     
     db.add(db_validation)
+    # The tally is updated in the same transaction as the validation row
+    increment_validation_tally(db, sport_event_id, validation_data.predicted_outcome)
     db.commit()
     db.refresh(db_validation)
     return db_validation
 
 
+def increment_validation_tally(db: Session, sport_event_id: int, outcome: str):
+    """Add one validation to an event's outcome tally. Does not commit."""
+    updated = db.query(models.ValidationTally).filter(
+        models.ValidationTally.sport_event_id == sport_event_id,
+        models.ValidationTally.outcome == outcome
+    ).update({models.ValidationTally.count: models.ValidationTally.count + 1}, synchronize_session=False)
+    if not updated:
+        # The UPDATE already holds the write lock, so no other writer can insert this row first
+        db.add(models.ValidationTally(sport_event_id=sport_event_id, outcome=outcome, count=1))
+        db.flush()
+
+
 def get_user_validation_for_event(db: Session, user_id: int, sport_event_id: int):
     """Get a user's validation for a specific event"""
     return db.query(models.ValidationResult).filter(
@@ -214,24 +336,105 @@ def get_validations_for_event(db: Session, sport_event_id: int):
     ).all()
 
 
-def get_validation_summary(db: Session, sport_event_id: int) -> schemas.ValidationSummary:
-    """Get validation summary with outcome counts and consensus"""
-    validations = get_validations_for_event(db, sport_event_id)
+def get_validation_tallies(db: Session, sport_event_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """
+    Validation counts per predicted outcome for many events, read from the
+    maintained validation_tallies table by primary key in one query.
     
-    # Count outcomes
-    outcome_counts = {}
-    for validation in validations:
-        outcome = validation.predicted_outcome
-        outcome_counts[outcome] = outcome_counts.get(outcome, 0) + 1
+    Returns {sport_event_id: {outcome: count}}; events without validations map to {}.
+    """
+    tallies = {sport_event_id: {} for sport_event_id in sport_event_ids}
+    if not tallies:
+        return tallies
+    
+    rows = db.query(
+        models.ValidationTally.sport_event_id,
+        models.ValidationTally.outcome,
+        models.ValidationTally.count
+    ).filter(
+        models.ValidationTally.sport_event_id.in_(list(tallies)),
+        models.ValidationTally.count > 0
+    ).all()
+    
+    for sport_event_id, outcome, count in rows:
+        tallies[sport_event_id][outcome] = count
+    return tallies
+
+
+def count_validation_outcomes(db: Session, sport_event_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, int]]:
+    """
+    Count validations per predicted outcome from validation_results with one GROUP BY.
     
-    # Determine consensus (simple majority)
+    This is the source of truth the tally table is checked against. With
+    sport_event_ids=None every event with validations is counted.
+    """
+    query = db.query(
+        models.ValidationResult.sport_event_id,
+        models.ValidationResult.predicted_outcome,
+        func.count(models.ValidationResult.id)
+    )
+    if sport_event_ids is not None:
+        query = query.filter(models.ValidationResult.sport_event_id.in_(list(sport_event_ids)))
+    
+    counts = {sport_event_id: {} for sport_event_id in sport_event_ids or []}
+    for sport_event_id, outcome, count in query.group_by(
+        models.ValidationResult.sport_event_id,
+        models.ValidationResult.predicted_outcome
+    ):
+        counts.setdefault(sport_event_id, {})[outcome] = count
+    return counts
+
+
+def rebuild_validation_tallies(db: Session, sport_event_ids: Optional[List[int]] = None, dry_run: bool = False) -> List[int]:
+    """
+    Compare validation_tallies with validation_results and rewrite the tallies
+    of every event that disagrees. Commits unless dry_run.
+    
+    Returns:
+        IDs of the events whose tallies were (or, with dry_run, would be) rebuilt
+    """
+    expected = count_validation_outcomes(db, sport_event_ids)
+    
+    stored_query = db.query(models.ValidationTally).filter(models.ValidationTally.count > 0)
+    if sport_event_ids is not None:
+        stored_query = stored_query.filter(models.ValidationTally.sport_event_id.in_(list(sport_event_ids)))
+    stored = {}
+    for tally in stored_query:
+        stored.setdefault(tally.sport_event_id, {})[tally.outcome] = tally.count
+    
+    mismatched = sorted(
+        sport_event_id for sport_event_id in set(expected) | set(stored)
+        if expected.get(sport_event_id, {}) != stored.get(sport_event_id, {})
+    )
+    if dry_run or not mismatched:
+        return mismatched
+    
+    db.query(models.ValidationTally).filter(
+        models.ValidationTally.sport_event_id.in_(mismatched)
+    ).delete(synchronize_session=False)
+    db.add_all([
+        models.ValidationTally(sport_event_id=sport_event_id, outcome=outcome, count=count)
+        for sport_event_id in mismatched
+        for outcome, count in expected.get(sport_event_id, {}).items()
+    ])
+    db.commit()
+    return mismatched
+
+
+def get_validation_tally(db: Session, sport_event_id: int) -> Dict[str, int]:
+    """An event's validation counts per predicted outcome"""
+    return get_validation_tallies(db, [sport_event_id])[sport_event_id]
+
+
+def summarize_validation_tally(sport_event_id: int, outcome_counts: Dict[str, int]) -> schemas.ValidationSummary:
+    """Validation summary with simple-majority consensus from an outcome tally"""
     consensus_outcome = None
     consensus_percentage = None
-    total_validations = len(validations)
+    total_validations = sum(outcome_counts.values())
     
     if total_validations > 0:
         # Find the most common outcome
-        max_count = max(outcome_counts.values()) if outcome_counts else 0
+        max_count = max(outcome_counts.values())
         consensus_outcomes = [outcome for outcome, count in outcome_counts.items() if count == max_count]
         
         if len(consensus_outcomes) == 1:  # Clear consensus
@@ -247,31 +450,15 @@ def get_validation_summary(db: Session, sport_event_id: int) -> schemas.Validati
     )
 
 
-def determine_consensus_outcome(db: Session, sport_event_id: int, minimum_validations: int = 3, consensus_threshold: float = 0.6):
+def consensus_from_tally(outcome_counts: Dict[str, int], minimum_validations: int = 3, consensus_threshold: float = 0.6):
     """
-    Determine if there's consensus on the outcome of an event.
-    
-    Args:
-        sport_event_id: The event to check
-        minimum_validations: Minimum number of validations required for consensus
-        consensus_threshold: Percentage of validations required for consensus (0.6 = 60%)
+    Settlement consensus from an outcome tally.
     
     Returns:
         tuple: (consensus_outcome, consensus_percentage) or (None, None) if no consensus
     """
-    validations = get_validations_for_event(db, sport_event_id)
-    
-    if len(validations) < minimum_validations:
-        return None, None
-    
-    # Count outcomes
-    outcome_counts = {}
-    for validation in validations:
-        outcome = validation.predicted_outcome
-        outcome_counts[outcome] = outcome_counts.get(outcome, 0) + 1
-    
-    # Find the most common outcome
-    if not outcome_counts:
+    total_validations = sum(outcome_counts.values())
+    if total_validations < minimum_validations or not outcome_counts:
         return None, None
     
     max_count = max(outcome_counts.values())
@@ -279,19 +466,39 @@ def determine_consensus_outcome(db: Session, sport_event_id: int, minimum_valida
     
     # Check if there's a clear winner and it meets the threshold
     if len(consensus_outcomes) == 1:
-        consensus_outcome = consensus_outcomes[0]
-        consensus_percentage = (max_count / len(validations)) * 100
-        
+        consensus_percentage = (max_count / total_validations) * 100
         if consensus_percentage >= (consensus_threshold * 100):
-            return consensus_outcome, consensus_percentage
+            return consensus_outcomes[0], consensus_percentage
     
     return None, None
 
 
+def get_validation_summary(db: Session, sport_event_id: int) -> schemas.ValidationSummary:
+    """Get validation summary with outcome counts and consensus"""
+    return summarize_validation_tally(sport_event_id, get_validation_tally(db, sport_event_id))
+
+
+def determine_consensus_outcome(db: Session, sport_event_id: int, minimum_validations: int = 3, consensus_threshold: float = 0.6):
+    """
+    Determine if there's consensus on the outcome of an event.
+    
+    Args:
+        sport_event_id: The event to check
+        minimum_validations: Minimum number of validations required for consensus
+        consensus_threshold: Percentage of validations required for consensus (0.6 = 60%)
+    
+    Returns:
+        tuple: (consensus_outcome, consensus_percentage) or (None, None) if no consensus
+    """
+    return consensus_from_tally(get_validation_tally(db, sport_event_id), minimum_validations, consensus_threshold)
+
+
 def mark_correct_validations_and_calculate_rewards(db: Session, sport_event_id: int, winning_outcome: str, total_validator_fees: float):
     """
     Mark which validations were correct and calculate individual validator rewards.
     
+    Uses one COUNT and one bulk UPDATE; does not commit (settlement commits once at the end).
+    
     Args:
         sport_event_id: The event that was settled
         winning_outcome: The determined winning outcome
@@ -300,29 +507,28 @@ def mark_correct_validations_and_calculate_rewards(db: Session, sport_event_id:
     Returns:
         Number of validators who get rewards
     """
-    validations = get_validations_for_event(db, sport_event_id)
+    num_correct = db.query(func.count(models.ValidationResult.id)).filter(
+        models.ValidationResult.sport_event_id == sport_event_id,
+        models.ValidationResult.predicted_outcome == winning_outcome
+    ).scalar()
     
-    # Find all correct validations
-    correct_validations = [v for v in validations if v.predicted_outcome == winning_outcome]
-    
-    if not correct_validations:
+    if not num_correct:
         # No correct validations - validator fees remain unclaimed
         return 0
     
     # Calculate reward per validator
-    reward_per_validator = total_validator_fees / len(correct_validations)
+    reward_per_validator = total_validator_fees / num_correct
     
     # Update validation records
-    for validation in validations:
-        validation.is_correct_validation = (validation.predicted_outcome == winning_outcome)
-        if validation.is_correct_validation:
-            validation.validator_reward_amount = reward_per_validator
-        else:
-            validation.validator_reward_amount = 0.0
-    
-    db.commit()
+    is_correct = models.ValidationResult.predicted_outcome == winning_outcome
+    db.query(models.ValidationResult).filter(
+        models.ValidationResult.sport_event_id == sport_event_id
+    ).update({
+        models.ValidationResult.is_correct_validation: case((is_correct, True), else_=False),
+        models.ValidationResult.validator_reward_amount: case((is_correct, reward_per_validator), else_=0.0)
+    })
     
-    return len(correct_validations)
+    return num_correct
 
 
 # NonProfit CRUD functions
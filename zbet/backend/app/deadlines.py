@@ -0,0 +1,229 @@
+"""
+Deadline-driven event timers.
+
+Each unsettled event has up to three deadlines:
+- close: at event_end_time, the stored status moves OPEN -> CLOSED
+- consensus_check: at event_end_time (and again whenever a validation comes in
+  after that), the event is settled if validators have reached consensus
+- deadline_refund: at settlement_time, the event is settled with consensus or
+  refunded as a PUSH
+
+Deadlines sit in a min-heap ordered by due time. The timer thread sleeps until
+the earliest one is due (or until a new, earlier deadline is scheduled), so an
+idle server does no polling. Rescheduling an event just pushes a new entry;
+entries that no longer match the event's current deadline are skipped when
+popped. Every action is idempotent (settlement claims the event row), so the
+periodic settle_expired_events job in scheduler.py remains a safe backstop for
+deadlines a worker missed, e.g. events created in another process.
+"""
+
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from . import models, betting_utils, batch_settlement, odds_cache
+from .database import SessionLocal
+
+CLOSE = "close"
+CONSENSUS_CHECK = "consensus_check"
+DEADLINE_REFUND = "deadline_refund"
+ACTIONS = (CLOSE, CONSENSUS_CHECK, DEADLINE_REFUND)
+
+
+def close_event(event_id: int, session_factory=SessionLocal) -> dict:
+    """Persist the CLOSED status for an event that is still OPEN"""
+    sport_events = models.SportEvent.__table__
+    with session_factory() as db:
+        closed_id = db.execute(
+            update(sport_events).where(
+                sport_events.c.id == event_id,
+                sport_events.c.status == models.EventStatus.OPEN.name
+            ).values(status=models.EventStatus.CLOSED.name).returning(sport_events.c.id)
+        ).scalar()
+        # Stream subscribers, other workers and cached responses see the close once it commits
+        if closed_id is not None:
+            odds_cache.record_status_change(db, closed_id)
+        db.commit()
+    return {"event_id": event_id, "action": "closed" if closed_id is not None else "skipped"}
+
+
+def check_consensus(event_id: int, session_factory=SessionLocal) -> dict:
+    """Settle the event now if validators have reached consensus"""
+    return batch_settlement.settle_expired_event(event_id, session_factory, refund_without_consensus=False)
+
+
+def refund_at_deadline(event_id: int, session_factory=SessionLocal) -> dict:
+    """Settlement deadline reached: settle with consensus, or refund as PUSH"""
+    return batch_settlement.settle_expired_event(event_id, session_factory)
+
+
+ACTION_HANDLERS = {
+    CLOSE: close_event,
+    CONSENSUS_CHECK: check_consensus,
+    DEADLINE_REFUND: refund_at_deadline
+}
+
+
+class DeadlineScheduler:
+    """Min-heap of (due_at, event_id, action) deadlines served by one timer thread"""
+
+    def __init__(self, session_factory=SessionLocal, handlers: Dict[str, callable] = None):
+        self.session_factory = session_factory
+        self.handlers = handlers or ACTION_HANDLERS
+        self._heap: List[Tuple[datetime, int, int, str]] = []
+        self._current: Dict[Tuple[int, str], datetime] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+        # Metrics
+        self.fired = {action: 0 for action in ACTIONS}
+        self.failures = 0
+        self.last_lateness_ms = None
+        self.max_lateness_ms = 0.0
+        self.last_results: List[dict] = []
+
+    # Scheduling
+
+    def schedule(self, event_id: int, action: str, due_at: datetime):
+        """Schedule (or move) one deadline. due_at is naive Eastern time like the event columns."""
+        with self._condition:
+            key = (event_id, action)
+            if self._current.get(key) == due_at:
+                return
+            self._current[key] = due_at
+            heapq.heappush(self._heap, (due_at, next(self._sequence), event_id, action))
+            # Wake the timer thread if this is the new earliest deadline
+            if self._heap[0][2:] == (event_id, action):
+                self._condition.notify()
+
+    def cancel(self, event_id: int):
+        """Drop every pending deadline for an event"""
+        with self._condition:
+            for action in ACTIONS:
+                self._current.pop((event_id, action), None)
+
+    def schedule_event(self, sport_event: models.SportEvent):
+        """(Re)schedule every deadline for an event from its current state"""
+        if sport_event.status not in [models.EventStatus.OPEN, models.EventStatus.CLOSED]:
+            self.cancel(sport_event.id)
+            return
+        if sport_event.status == models.EventStatus.OPEN:
+            self.schedule(sport_event.id, CLOSE, sport_event.event_end_time)
+        self.schedule(sport_event.id, CONSENSUS_CHECK, sport_event.event_end_time)
+        self.schedule(sport_event.id, DEADLINE_REFUND, sport_event.settlement_time)
+
+    def check_consensus_soon(self, event_id: int):
+        """A validation came in for a closed event: check consensus right away"""
+        self.schedule(event_id, CONSENSUS_CHECK, betting_utils.get_est_now())
+
+    def load(self, db: Session) -> int:
+        """Schedule every unsettled event's deadlines. Returns the number of events loaded."""
+        events = db.query(models.SportEvent).filter(
+            models.SportEvent.status.in_([models.EventStatus.OPEN, models.EventStatus.CLOSED])
+        ).all()
+        for sport_event in events:
+            self.schedule_event(sport_event)
+        return len(events)
+
+    # Firing
+
+    def pop_due(self, now: datetime) -> List[Tuple[datetime, int, str]]:
+        """Remove and return every live deadline due at or before now"""
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                due_at, _, event_id, action = heapq.heappop(self._heap)
+                # Skip entries that were rescheduled or cancelled since they were pushed
+                if self._current.get((event_id, action)) != due_at:
+                    continue
+                del self._current[(event_id, action)]
+                due.append((due_at, event_id, action))
+        return due
+
+    def run_due(self, now: Optional[datetime] = None) -> List[dict]:
+        """Fire every deadline that is due. Returns the action results."""
+        now = now or betting_utils.get_est_now()
+        results = []
+        for due_at, event_id, action in self.pop_due(now):
+            lateness_ms = max((now - due_at).total_seconds() * 1000, 0.0)
+            self.last_lateness_ms = round(lateness_ms, 2)
+            self.max_lateness_ms = max(self.max_lateness_ms, self.last_lateness_ms)
+            try:
+                result = self.handlers[action](event_id, self.session_factory)
+                self.fired[action] += 1
+            except Exception as e:
+                self.failures += 1
+                print(f"Deadline {action} for event {event_id} failed: {str(e)}")
+                result = {"event_id": event_id, "action": "error", "error": str(e)}
+            result["deadline"] = action
+            results.append(result)
+        if results:
+            self.last_results = results[-10:]
+        return results
+
+    def seconds_until_next(self, now: Optional[datetime] = None) -> Optional[float]:
+        with self._condition:
+            return self._seconds_until_next_locked(now)
+
+    def _seconds_until_next_locked(self, now: Optional[datetime] = None) -> Optional[float]:
+        """seconds_until_next for a caller already holding the condition"""
+        while self._heap and self._current.get((self._heap[0][2], self._heap[0][3])) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        now = now or betting_utils.get_est_now()
+        return max((self._heap[0][0] - now).total_seconds(), 0.0)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._stop:
+                    return
+            self.run_due()
+            with self._condition:
+                if self._stop:
+                    return
+                # Sleeps until the next deadline, or until schedule() adds an earlier one.
+                # The timeout is computed under the same lock as the wait, so a
+                # schedule() in between cannot lose its notify()
+                self._condition.wait(timeout=self._seconds_until_next_locked())
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self.session_factory() as db:
+            loaded = self.load(db)
+        print(f"Deadline scheduler loaded deadlines for {loaded} events")
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="zbet-deadlines", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def metrics(self) -> dict:
+        next_in = self.seconds_until_next()
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "pending_deadlines": len(self._current),
+            "seconds_until_next": round(next_in, 3) if next_in is not None else None,
+            "fired": dict(self.fired),
+            "failures": self.failures,
+            "last_lateness_ms": self.last_lateness_ms,
+            "max_lateness_ms": self.max_lateness_ms,
+            "last_results": self.last_results
+        }
+
+
+deadline_scheduler = DeadlineScheduler()
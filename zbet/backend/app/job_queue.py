@@ -0,0 +1,412 @@
+"""
+Durable job queue for long admin operations, stored in the jobs table.
+
+Endpoints enqueue a job and return its id straight away; a pool of worker
+threads claims queued jobs, runs the matching handler in its own session and
+records the result. A claimed job carries a lease that the worker extends with
+heartbeats while the handler runs, so a job whose worker died is reclaimed once
+the lease expires, as long as it has attempts left; otherwise it is marked
+failed rather than run again. Outcomes are only recorded by the worker that
+still holds the lease. Failed jobs are retried with exponential backoff up to
+max_attempts; handlers raising a 4xx HTTPException fail immediately, since
+retrying cannot fix a bad request.
+
+Claiming is a single UPDATE ... RETURNING, which works on plain SQLite.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models, schemas, crud, betting_utils, batch_settlement
+from .config import settings
+from .database import SessionLocal
+from .transaction_service import BalanceReconciliationService
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+RECONCILIATION_MODES = ("full", "incremental", "sharded")
+
+
+# Handlers: each takes a session plus the job's payload as keyword arguments and returns a JSON-able result
+
+def _process_payouts(db: Session, event_id: int) -> dict:
+    return betting_utils.process_event_payouts(db, event_id)
+
+
+def _send_payouts(db: Session, event_id: int) -> dict:
+    return betting_utils.send_event_payouts(db, event_id)
+
+
+def _process_expired_events(db: Session, workers: Optional[int] = None) -> dict:
+    expired_event_ids = [event.id for event in crud.get_expired_sport_events(db, betting_utils.get_est_now())]
+    # Release the read transaction before the settlement workers start writing
+    db.rollback()
+
+    started = time.perf_counter()
+    processed_events = batch_settlement.settle_expired_events(expired_event_ids, max_workers=workers)
+    return {
+        "message": f"Processed {len(expired_event_ids)} expired events",
+        "processed_events": processed_events,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+def _reconcile_balances(db: Session, mode: str = "full", workers: Optional[int] = None) -> dict:
+    reconciliation_service = BalanceReconciliationService(db)
+    if mode == "full":
+        reconciliation = reconciliation_service.run_full_reconciliation()
+    elif mode == "incremental":
+        reconciliation = reconciliation_service.run_incremental_reconciliation()
+    elif mode == "sharded":
+        reconciliation = reconciliation_service.run_sharded_reconciliation(max_workers=workers)
+    else:
+        raise HTTPException(status_code=400, detail=f"Invalid reconciliation mode: '{mode}'. Use 'full', 'incremental' or 'sharded'")
+
+    return schemas.BalanceReconciliationResponse(
+        id=reconciliation.id,
+        reconciliation_date=reconciliation.reconciliation_date.isoformat() + 'Z',
+        reconciliation_type=reconciliation.reconciliation_type,
+        total_users_checked=reconciliation.total_users_checked,
+        discrepancies_found=reconciliation.discrepancies_found,
+        total_shielded_pool_blockchain=reconciliation.total_shielded_pool_blockchain,
+        total_shielded_pool_database=reconciliation.total_shielded_pool_database,
+        total_transparent_pool_blockchain=reconciliation.total_transparent_pool_blockchain,
+        total_transparent_pool_database=reconciliation.total_transparent_pool_database,
+        reconciliation_status=reconciliation.reconciliation_status,
+        notes=reconciliation.notes
+    ).model_dump()
+
+
+JOB_HANDLERS: Dict[str, Callable[..., dict]] = {
+    "process_payouts": _process_payouts,
+    "send_payouts": _send_payouts,
+    "process_expired_events": _process_expired_events,
+    "reconcile_balances": _reconcile_balances
+}
+
+
+# Queue operations
+
+def enqueue(db: Session, job_type: str, payload: dict = None, max_attempts: int = None) -> models.Job:
+    """Add a job to the queue. Commits."""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    job = models.Job(
+        job_type=job_type,
+        payload=json.dumps(payload or {}),
+        status=QUEUED,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=datetime.utcnow()
+    )
+    db.add(job)
+    db.commit()
+    job_workers.notify()
+    return job
+
+
+def find_active_job(db: Session, job_type: str, payload: dict = None) -> Optional[models.Job]:
+    """A queued or running job of job_type with exactly this payload, if any"""
+    return db.query(models.Job).filter(
+        models.Job.job_type == job_type,
+        models.Job.payload == json.dumps(payload or {}),
+        models.Job.status.in_([QUEUED, RUNNING])
+    ).first()
+
+
+def claim_next_job(db: Session, worker_id: str, lease_seconds: float) -> Optional[models.Job]:
+    """
+    Claim the oldest runnable job for worker_id. Commits.
+
+    Runnable means queued and past its run_after, or running with an expired
+    lease (its worker died) and attempts left. Expired jobs without attempts
+    left are marked failed instead: a handler such as send_payouts may have
+    done its work before the worker died, so max_attempts=1 means at most one run.
+    The select and the claim are one UPDATE statement, so two workers never
+    claim the same job.
+    """
+    jobs = models.Job.__table__
+    now = datetime.utcnow()
+    expired = and_(jobs.c.status == RUNNING, jobs.c.lease_expires_at < now)
+    db.execute(
+        update(jobs).where(expired, jobs.c.attempts >= jobs.c.max_attempts).values(
+            status=FAILED,
+            last_error="Lease expired",
+            lease_owner=None,
+            lease_expires_at=None,
+            finished_at=now
+        )
+    )
+
+    runnable = or_(
+        and_(jobs.c.status == QUEUED, jobs.c.run_after <= now),
+        and_(expired, jobs.c.attempts < jobs.c.max_attempts)
+    )
+    next_id = select(jobs.c.id).where(runnable).order_by(jobs.c.run_after, jobs.c.id).limit(1).scalar_subquery()
+
+    claimed_id = db.execute(
+        update(jobs).where(jobs.c.id == next_id, runnable).values(
+            status=RUNNING,
+            lease_owner=worker_id,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            heartbeat_at=now,
+            attempts=jobs.c.attempts + 1,
+            started_at=now
+        ).returning(jobs.c.id)
+    ).scalar()
+    db.commit()
+
+    if claimed_id is None:
+        return None
+    return db.get(models.Job, claimed_id)
+
+
+def heartbeat(db: Session, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+    """Extend the lease on a job this worker still owns. Commits. False if the lease was lost."""
+    now = datetime.utcnow()
+    extended = db.query(models.Job).filter(
+        models.Job.id == job_id,
+        models.Job.status == RUNNING,
+        models.Job.lease_owner == worker_id
+    ).update({
+        models.Job.heartbeat_at: now,
+        models.Job.lease_expires_at: now + timedelta(seconds=lease_seconds)
+    }, synchronize_session=False)
+    db.commit()
+    return bool(extended)
+
+
+def retry_delay_seconds(attempts: int) -> float:
+    """Exponential backoff: base, 2x base, 4x base, ... capped at JOB_RETRY_MAX_SECONDS"""
+    return min(settings.JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), settings.JOB_RETRY_MAX_SECONDS)
+
+
+def _finish(db: Session, job_id: int, worker_id: str, values: dict) -> bool:
+    """Record an outcome if worker_id still holds the job's lease. Commits."""
+    recorded = db.query(models.Job).filter(
+        models.Job.id == job_id,
+        models.Job.status == RUNNING,
+        models.Job.lease_owner == worker_id
+    ).update(
+        {**values, models.Job.lease_owner: None, models.Job.lease_expires_at: None},
+        synchronize_session=False
+    )
+    db.commit()
+    if not recorded:
+        print(f"Lost lease on job {job_id}; outcome of {worker_id} not recorded")
+    return bool(recorded)
+
+
+def complete_job(db: Session, job: models.Job, result: Optional[dict], worker_id: str) -> bool:
+    """Record a successful run. Commits. False if worker_id no longer holds the lease."""
+    return _finish(db, job.id, worker_id, {
+        models.Job.status: SUCCEEDED,
+        models.Job.result: json.dumps(result, default=str),
+        models.Job.last_error: None,
+        models.Job.finished_at: datetime.utcnow()
+    })
+
+
+def fail_job(db: Session, job: models.Job, error: str, worker_id: str, retryable: bool = True) -> bool:
+    """
+    Record a failed run, requeueing it with backoff while attempts remain.
+    Commits. False if worker_id no longer holds the lease.
+    """
+    now = datetime.utcnow()
+    values = {models.Job.last_error: error}
+    if retryable and job.attempts < job.max_attempts:
+        values[models.Job.status] = QUEUED
+        values[models.Job.run_after] = now + timedelta(seconds=retry_delay_seconds(job.attempts))
+    else:
+        values[models.Job.status] = FAILED
+        values[models.Job.finished_at] = now
+    return _finish(db, job.id, worker_id, values)
+
+
+def run_job(db: Session, job: models.Job):
+    """Run a claimed job's handler and record the outcome"""
+    # The claim's owner; the handler's commits expire job, which would reload the current owner
+    worker_id = job.lease_owner
+    try:
+        result = JOB_HANDLERS[job.job_type](db, **json.loads(job.payload))
+    except HTTPException as e:
+        db.rollback()
+        fail_job(db, job, str(e.detail), worker_id, retryable=e.status_code >= 500)
+    except Exception as e:
+        db.rollback()
+        print(f"Job {job.id} ({job.job_type}) failed: {str(e)}")
+        fail_job(db, job, str(e), worker_id)
+    else:
+        complete_job(db, job, result, worker_id)
+
+
+def serialize_job(job: models.Job) -> dict:
+    def iso(value):
+        return value.isoformat() + 'Z' if value else None
+
+    return {
+        "job_id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "payload": json.loads(job.payload),
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "result": json.loads(job.result) if job.result else None,
+        "last_error": job.last_error,
+        "created_at": iso(job.created_at),
+        "started_at": iso(job.started_at),
+        "finished_at": iso(job.finished_at),
+        "run_after": iso(job.run_after)
+    }
+
+
+def job_accepted(job: models.Job) -> dict:
+    """Response body for an endpoint that queued a job"""
+    return {
+        "job_id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "status_url": f"/api/admin/jobs/{job.id}"
+    }
+
+
+def queue_metrics(db: Session, recent: int = 100) -> dict:
+    """Queue depth by status, oldest queued job age, and wait/run latency over recent finished jobs"""
+    now = datetime.utcnow()
+    depth = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+    for status, count in db.execute(
+        select(models.Job.status, func.count()).group_by(models.Job.status)
+    ):
+        depth[status] = count
+
+    oldest_queued = db.query(func.min(models.Job.created_at)).filter(
+        models.Job.status == QUEUED
+    ).scalar()
+
+    finished = db.query(models.Job.created_at, models.Job.started_at, models.Job.finished_at).filter(
+        models.Job.finished_at.isnot(None), models.Job.started_at.isnot(None)
+    ).order_by(models.Job.finished_at.desc()).limit(recent).all()
+    wait_ms = [(row.started_at - row.created_at).total_seconds() * 1000 for row in finished]
+    run_ms = [(row.finished_at - row.started_at).total_seconds() * 1000 for row in finished]
+
+    def summary(values):
+        if not values:
+            return None
+        ordered = sorted(values)
+        return {
+            "average_ms": round(sum(ordered) / len(ordered), 2),
+            "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 2),
+            "max_ms": round(ordered[-1], 2)
+        }
+
+    return {
+        "depth": depth,
+        "oldest_queued_age_seconds": round((now - oldest_queued).total_seconds(), 3) if oldest_queued else None,
+        "recent_jobs": len(finished),
+        "wait_latency": summary(wait_ms),
+        "run_latency": summary(run_ms),
+        "workers": job_workers.metrics()
+    }
+
+
+# Worker pool
+
+class JobWorkerPool:
+    """Threads that claim and run queued jobs"""
+
+    def __init__(self, worker_count: int = None, session_factory=SessionLocal,
+                 poll_seconds: float = None, lease_seconds: float = None):
+        self.worker_count = worker_count if worker_count is not None else settings.JOB_WORKERS
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.JOB_POLL_SECONDS
+        self.lease_seconds = lease_seconds if lease_seconds is not None else settings.JOB_LEASE_SECONDS
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.jobs_run = 0
+
+    def notify(self):
+        """Wake idle workers (called on enqueue in this process)"""
+        self._wake.set()
+
+    def run_once(self, worker_id: str) -> bool:
+        """Claim and run one job. Returns False if nothing was runnable."""
+        with self.session_factory() as db:
+            job = claim_next_job(db, worker_id, self.lease_seconds)
+            if job is None:
+                return False
+
+            stop_heartbeat = threading.Event()
+            heartbeat_thread = threading.Thread(
+                target=self._heartbeat, args=(job.id, worker_id, stop_heartbeat), daemon=True
+            )
+            heartbeat_thread.start()
+            try:
+                run_job(db, job)
+            finally:
+                stop_heartbeat.set()
+                heartbeat_thread.join()
+            self.jobs_run += 1
+            return True
+
+    def _heartbeat(self, job_id: int, worker_id: str, stop: threading.Event):
+        while not stop.wait(self.lease_seconds / 3):
+            try:
+                with self.session_factory() as db:
+                    if not heartbeat(db, job_id, worker_id, self.lease_seconds):
+                        print(f"Lost lease on job {job_id}")
+                        return
+            except Exception as e:
+                print(f"Heartbeat for job {job_id} failed: {str(e)}")
+
+    def _run(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                if self.run_once(worker_id):
+                    continue
+            except Exception as e:
+                print(f"Job worker {worker_id} error: {str(e)}")
+            # Idle: wait for an enqueue in this process or the next poll
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def start(self):
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, args=(f"{self.worker_prefix}:{i}",), name=f"zbet-job-worker-{i}", daemon=True)
+            for i in range(self.worker_count)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=self.poll_seconds + 5)
+
+    def metrics(self) -> dict:
+        return {
+            "worker_count": self.worker_count,
+            "running": sum(1 for thread in self._threads if thread.is_alive()),
+            "jobs_run": self.jobs_run
+        }
+
+
+job_workers = JobWorkerPool()
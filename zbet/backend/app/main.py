@@ -1,23 +1,62 @@
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
     
 from sqlalchemy.orm import Session
 from typing import Annotated, Optional
 
-from . import auth, crud, models, schemas, cleaners, serializers, betting_utils
+from . import auth, crud, models, schemas, cleaners, serializers, betting_utils, payout_plans, scheduler, deadlines, job_queue
+from .odds_cache import odds_cache, record_invalidation
+from .odds_stream import odds_stream, sse_messages
+from .bet_ingestion import bet_ingestor
+from .odds_history import odds_history, get_history
+from .response_cache import response_cache
 from .database import SessionLocal, engine
 from .config import settings
-from .transaction_service import TransactionService, BalanceReconciliationService
+from .transaction_service import (
+    TransactionService, LEDGER_EXPORT_FORMATS, stream_ledger_export
+)
 
 # EST timezone utility will be imported from betting_utils when needed
 
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
 
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Settlement, payout status and reconciliation run in-process (leader only),
+    # and event deadlines fire from a min-heap of timers
+    if settings.SCHEDULER_ENABLED:
+        scheduler.scheduler.start()
+        deadlines.deadline_scheduler.start()
+    # Admin endpoints enqueue long operations; the worker pool runs them
+    job_queue.job_workers.start()
+    # Follow other workers' odds changes
+    odds_cache.start()
+    # Push coalesced pool/odds/status updates to stream subscribers
+    odds_stream.start()
+    # Sample pool amounts of changed events for the odds charts
+    odds_history.start()
+    # Optional group-commit writer for bet bursts
+    if settings.BET_GROUP_COMMIT:
+        bet_ingestor.start()
+    yield
+    bet_ingestor.stop()
+    odds_history.stop()
+    odds_stream.stop()
+    odds_cache.stop()
+    job_queue.job_workers.stop()
+    deadlines.deadline_scheduler.stop()
+    scheduler.scheduler.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000", "https://zbet-frontend.vercel.app" # React development server
@@ -180,15 +219,21 @@ def get_crypto_data(start: str, end: str):
 # NonProfit API endpoints
 @app.get("/api/nonprofits", response_model=list[schemas.NonProfitResponse])
 def get_nonprofits(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     active_only: bool = True,
     search: str = None,
     db: Session = Depends(get_db)
 ):
-    """Get all nonprofits with optional filtering"""
-    nonprofits = crud.get_nonprofits(db, skip=skip, limit=limit, active_only=active_only, search=search)
-    return nonprofits
+    """Get all nonprofits with optional filtering (cached, with ETag / If-None-Match support)"""
+    def build():
+        nonprofits = crud.get_nonprofits(db, skip=skip, limit=limit, active_only=active_only, search=search)
+        return [schemas.NonProfitResponse.model_validate(nonprofit) for nonprofit in nonprofits]
+    
+    return response_cache.respond(
+        request, ("nonprofits", skip, limit, active_only, search), response_cache.nonprofit_versions(), build
+    )
 
 
 @app.get("/api/nonprofits/{nonprofit_id}", response_model=schemas.NonProfitResponse)
@@ -209,7 +254,9 @@ def create_nonprofit(
     """Create a new nonprofit (admin only for now)"""
     # TODO: Add admin role check here when implemented
     try:
-        return crud.create_nonprofit(db, nonprofit)
+        db_nonprofit = crud.create_nonprofit(db, nonprofit)
+        response_cache.nonprofits_changed()
+        return db_nonprofit
     except Exception as e:
         # Handle unique constraint violations
         if "UNIQUE constraint failed: nonprofits.federal_tax_id" in str(e):
@@ -245,39 +292,114 @@ def update_nonprofit(
     if not nonprofit:
         raise HTTPException(status_code=404, detail="Nonprofit not found")
     
-    return crud.update_nonprofit(db, nonprofit_id, nonprofit_update)
+    db_nonprofit = crud.update_nonprofit(db, nonprofit_id, nonprofit_update)
+    response_cache.nonprofits_changed()
+    return db_nonprofit
 
 
 # Betting API endpoints
 @app.get("/api/events", response_model=list[schemas.SportEventResponse])
 def get_betting_events(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
     status: str = None,
     db: Session = Depends(get_db)
 ):
-    """Get all betting events with optional status filter"""
-    events = crud.get_sport_events(db, skip=skip, limit=limit, status=status)
+    """
+    Get all betting events with optional status filter ("open", "closed", "settled", ...).
     
-    # Convert events to response format using model's to_dict method
-    response_events = []
-    for event in events:
-        event_data = event.to_dict(db)
-        response_events.append(schemas.SportEventResponse(**event_data))
+    Cached until any event changes; send If-None-Match with the last ETag to get a 304.
+    """
+    event_status = None
+    if status:
+        try:
+            event_status = models.EventStatus(status.lower())
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
+    
+    def build():
+        events = crud.get_sport_events(db, skip=skip, limit=limit, status=event_status)
+        # Events, nonprofits, pari-mutuel rows and pools for the page in at most four queries
+        return serializers.serialize_sport_events(events, db)
     
-    return response_events
+    return response_cache.respond(
+        request, ("events", skip, limit, event_status), response_cache.listing_versions(), build
+    )
 
 
-@app.get("/api/events/{event_id}", response_model=schemas.SportEventResponse)
-def get_betting_event(event_id: int, db: Session = Depends(get_db)):
-    """Get a single betting event by ID"""
+@app.get("/api/odds/stream")
+async def stream_odds(request: Request, event_ids: str):
+    """
+    Server-sent event stream of pool, odds and status updates for the given
+    comma-separated event ids. Sends each event's current state first, then at
+    most one update per event per coalescing interval.
+    """
+    try:
+        ids = sorted({int(event_id) for event_id in event_ids.split(",") if event_id.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="event_ids must be comma-separated integers")
+    if not ids:
+        raise HTTPException(status_code=400, detail="At least one event id is required")
+    if len(ids) > settings.ODDS_STREAM_MAX_EVENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.ODDS_STREAM_MAX_EVENTS} events can be streamed at once"
+        )
+    
+    # Subscribe before the snapshot so no change between the two is missed
+    subscription = odds_stream.subscribe(ids)
+    
+    def load_snapshot():
+        with SessionLocal() as db:
+            return odds_stream.snapshot(db, ids)
+    
+    try:
+        initial = await run_in_threadpool(load_snapshot)
+    except Exception as e:
+        subscription.close()
+        print(f"Error loading odds stream snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to start odds stream")
+    
+    return StreamingResponse(
+        sse_messages(subscription, initial, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/events/{event_id}/odds-history")
+def get_event_odds_history(
+    event_id: int,
+    bucket: str = "5m",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """Pool amounts over time, one point per 1m/5m/1h bucket between start and end"""
     event = crud.get_sport_event(db, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    # Convert to response format using model's to_dict method
-    event_data = event.to_dict(db)
-    return schemas.SportEventResponse(**event_data)
+    try:
+        return get_history(db, event_id, bucket=bucket, start=start, end=end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/events/{event_id}", response_model=schemas.SportEventResponse)
+def get_betting_event(event_id: int, request: Request, db: Session = Depends(get_db)):
+    """Get a single betting event by ID (cached until it changes, with ETag / If-None-Match support)"""
+    def build():
+        event = crud.get_sport_event(db, event_id)
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        
+        # Convert to response format using model's to_dict method
+        event_data = event.to_dict(db)
+        return schemas.SportEventResponse(**event_data)
+    
+    return response_cache.respond(request, ("event", event_id), response_cache.event_versions(event_id), build)
 
 
 @app.post("/api/events", response_model=schemas.SportEventResponse)
@@ -365,6 +487,14 @@ def create_betting_event(
             # Create the pari-mutuel event and pools
             crud.create_pari_mutuel_event(db, sport_event.id, pari_data)
         
+        # The event and its pools were committed in steps; have every worker's
+        # caches drop anything read in between
+        record_invalidation(db, sport_event.id)
+        db.commit()
+        
+        # Close/consensus/refund timers for the new event
+        deadlines.deadline_scheduler.schedule_event(sport_event)
+        
         # Return the created event with all data
         event_dict = sport_event.to_dict(db)
         return schemas.SportEventResponse(**event_dict)
@@ -389,11 +519,16 @@ def get_current_user_bets(
     try:
         bets = crud.get_user_bets(db, user_id=current_user.id, skip=skip, limit=limit)
         
+        # Potential payouts for the whole page in one batch
+        potential_payouts = serializers.calculate_potential_payouts(bets, db)
+        
         # Transform bets to response format
         bet_responses = []
         for bet in bets:
             try:
-                bet_response = serializers.transform_bet_to_response(bet, db)
+                bet_response = serializers.transform_bet_to_response(
+                    bet, db, potential_payout=potential_payouts.get(bet.id)
+                )
                 bet_responses.append(bet_response)
             except Exception as e:
                 print(f"Error transforming bet {bet.id}: {str(e)}")
@@ -423,6 +558,12 @@ def place_bet(
         # Validate the bet request (including balance check)
         betting_utils.validate_bet_for_event(sport_event, bet_request.predicted_outcome, bet_request.amount, db, current_user.id)
         
+        if settings.BET_GROUP_COMMIT:
+            # Written and committed with the rest of its micro-batch; returns once durable
+            bet_id = bet_ingestor.submit(current_user.id, bet_request).result()
+            bet = db.query(models.Bet).filter(models.Bet.id == bet_id).first()
+            return serializers.transform_bet_to_response(bet, db)
+        
         # Create the bet record
         bet = crud.create_bet(db, bet_request, current_user.id)
         
@@ -952,7 +1093,8 @@ def auto_settle_event(
             raise HTTPException(status_code=400, detail="Event has not ended yet")
         
         # Try consensus settlement first
-        consensus_outcome, consensus_percentage = crud.determine_consensus_outcome(db, event_id)
+        outcome_counts = crud.get_validation_tally(db, event_id)
+        consensus_outcome, consensus_percentage = crud.consensus_from_tally(outcome_counts)
         
         if consensus_outcome:
             # We have consensus - settle with it
@@ -974,12 +1116,11 @@ def auto_settle_event(
             }
         
         # Not past deadline yet, no consensus - can't auto-settle
-        summary = crud.get_validation_summary(db, event_id)
         hours_until_deadline = (sport_event.settlement_time - now_est).total_seconds() / 3600
         
         raise HTTPException(
             status_code=400, 
-            detail=f"Cannot auto-settle yet. Validations: {summary.total_validations}, "
+            detail=f"Cannot auto-settle yet. Validations: {sum(outcome_counts.values())}, "
                    f"Hours until deadline: {hours_until_deadline:.1f}. "
                    f"Need consensus (60% agreement, min 3 validators) or wait for deadline."
         )
@@ -1002,23 +1143,23 @@ def get_expired_events(db: Session = Depends(get_db)):
         now_est = betting_utils.get_est_now()
         
         # Find events past settlement deadline that aren't settled or paid out
-        expired_events = db.query(models.SportEvent).filter(
-            models.SportEvent.settlement_time < now_est,
-            models.SportEvent.status.notin_([models.EventStatus.SETTLED, models.EventStatus.PAIDOUT, models.EventStatus.CANCELLED])
-        ).all()
+        expired_events = crud.get_expired_sport_events(db, now_est)
+        
+        # Validation tallies for every expired event in one GROUP BY query
+        tallies = crud.get_validation_tallies(db, [event.id for event in expired_events])
         
         event_list = []
         for event in expired_events:
             # Check validation status
-            summary = crud.get_validation_summary(db, event.id)
-            consensus_outcome, consensus_percentage = crud.determine_consensus_outcome(db, event.id)
+            outcome_counts = tallies[event.id]
+            consensus_outcome, consensus_percentage = crud.consensus_from_tally(outcome_counts)
             
             event_list.append({
                 "id": event.id,
                 "title": event.title,
                 "settlement_time": event.settlement_time.isoformat(),
                 "hours_past_deadline": (now_est - event.settlement_time).total_seconds() / 3600,
-                "validation_count": summary.total_validations,
+                "validation_count": sum(outcome_counts.values()),
                 "consensus_outcome": consensus_outcome,
                 "consensus_percentage": consensus_percentage,
                 "can_auto_settle": consensus_outcome is not None
@@ -1036,44 +1177,32 @@ def get_expired_events(db: Session = Depends(get_db)):
 
 
 @app.get("/api/admin/settled-events")
-def get_settled_events(db: Session = Depends(get_db)):
+def get_settled_events(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """
-    Get a list of events that are settled and ready for payout processing.
+    Get a page of events that are settled and ready for payout processing.
     These events have completed voting/consensus but haven't been paid out yet.
+    
+    Events come newest settlement first, `limit` per page; pass the returned
+    next_cursor to get the following page.
     """
     try:
-        # Find events that are settled (outcome determined, ready for payout)
-        settled_events = db.query(models.SportEvent).filter(
-            models.SportEvent.status == models.EventStatus.SETTLED
-        ).all()
+        if limit < 1 or limit > 500:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+        
+        try:
+            rows, next_cursor = crud.get_settled_events_page(db, limit=limit, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        now_est = betting_utils.get_est_now()
         
         event_list = []
-        for event in settled_events:
-            # Get winning outcome
-            winning_outcome = None
-            if event.betting_system_type == models.BettingSystemType.PARI_MUTUEL:
-                pari_event = db.query(models.PariMutuelEvent).filter(
-                    models.PariMutuelEvent.sport_event_id == event.id
-                ).first()
-                if pari_event:
-                    winning_outcome = pari_event.winning_outcome
-            
-            # Get number of bets on this event
-            bet_count = db.query(models.Bet).filter(
-                models.Bet.sport_event_id == event.id,
-                models.Bet.deposit_status == models.DepositStatus.CONFIRMED
-            ).count()
-            
-            # Calculate total pool amount
-            total_pool = db.query(models.Bet).filter(
-                models.Bet.sport_event_id == event.id,
-                models.Bet.deposit_status == models.DepositStatus.CONFIRMED
-            ).with_entities(models.Bet.amount).all()
-            
-            total_pool_amount = sum(bet.amount for bet in total_pool) if total_pool else 0
-            
+        for event, winning_outcome, bet_count, total_pool_amount in rows:
             # Calculate time since settlement
-            now_est = betting_utils.get_est_now()
             hours_since_settlement = 0
             if event.settled_at:
                 hours_since_settlement = (now_est - event.settled_at).total_seconds() / 3600
@@ -1093,10 +1222,14 @@ def get_settled_events(db: Session = Depends(get_db)):
         
         return {
             "settled_events": event_list,
-            "total_count": len(event_list),
+            "total_count": crud.count_settled_events(db),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
             "current_time": now_est.isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error getting settled events: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get settled events")
@@ -1120,7 +1253,7 @@ def get_payout_calculation(
     Returns:
         Detailed breakdown of all calculated payouts
     """
-    # Just query the existing payout and bet records that were created during settlement
+    # Read the payout plan that was stored at settlement
     try:
         # Eagerly load the nonprofit and creator relationships
         from sqlalchemy.orm import joinedload
@@ -1133,53 +1266,33 @@ def get_payout_calculation(
         if not sport_event or sport_event.status != models.EventStatus.SETTLED:
             raise HTTPException(status_code=400, detail="Event must be settled")
         
-        pari_event = db.query(models.PariMutuelEvent).filter(
-            models.PariMutuelEvent.sport_event_id == event_id
-        ).first()
-        
-        payouts = db.query(models.Payout).options(
-            joinedload(models.Payout.user)
-        ).filter(models.Payout.sport_event_id == event_id).all()
-        bets = db.query(models.Bet).options(
-            joinedload(models.Bet.user)
-        ).filter(
-            models.Bet.sport_event_id == event_id,
-            models.Bet.deposit_status == models.DepositStatus.CONFIRMED
-        ).all()
-        
-        # Simple serialization - use existing data
-        return serializers.serialize_event_payout_details(sport_event, pari_event, payouts, bets)
+        plan_row = payout_plans.get_payout_plan(db, sport_event)
+        return serializers.serialize_event_payout_details(sport_event, payout_plans.plan_data(plan_row))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/admin/events/{event_id}/process-payouts")
+@app.post("/api/admin/events/{event_id}/process-payouts", status_code=status.HTTP_202_ACCEPTED)
 def process_event_payouts(
     event_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
-    Create payout records for review (Phase 2 - Process Payouts).
+    Queue creation of payout records for review (Phase 2 - Process Payouts).
     
-    This endpoint:
+    The job (see betting_utils.process_event_payouts):
     1. Creates payout records if they don't exist (backup for settlement)
-    2. Shows calculated payout amounts for admin review
+    2. Calculates payout amounts for admin review
     3. Does NOT send any Zcash transactions
     4. Prepares records for actual payout processing
     
     Returns:
-        Summary of created payout records ready for review
+        The queued job; poll /api/admin/jobs/{job_id} for the payout summary
     """
     try:
-        # Get the event with relationships
-        from sqlalchemy.orm import joinedload
-        
-        sport_event = db.query(models.SportEvent).options(
-            joinedload(models.SportEvent.nonprofit),
-            joinedload(models.SportEvent.creator)
-        ).filter(models.SportEvent.id == event_id).first()
+        sport_event = db.query(models.SportEvent).filter(models.SportEvent.id == event_id).first()
         
         if not sport_event:
             raise HTTPException(status_code=404, detail="Event not found")
@@ -1187,129 +1300,64 @@ def process_event_payouts(
         if sport_event.status != models.EventStatus.SETTLED:
             raise HTTPException(status_code=400, detail="Event must be settled before processing payouts")
         
-        # Check for existing pending payouts
-        pending_payouts = db.query(models.Payout).filter(
-            models.Payout.sport_event_id == event_id,
-            models.Payout.is_processed == False
-        ).all()
-        
-        # If no pending payouts exist, create them from the settled event
-        if not pending_payouts:
-            print(f"No existing payouts found for event {event_id}. Creating payout records...")
-            
-            # Get the pari-mutuel event to find the winning outcome
-            pari_event = db.query(models.PariMutuelEvent).filter(
-                models.PariMutuelEvent.sport_event_id == event_id
-            ).first()
-            
-            if not pari_event or not pari_event.winning_outcome:
-                raise HTTPException(status_code=400, detail="Event must have a winning outcome to process payouts")
-            
-            # Use the existing settlement logic to create payout records
-            # This reuses the same logic from betting_utils._process_event_payouts
-            payout_records_list = betting_utils._process_event_payouts(db, sport_event, pari_event.winning_outcome)
-            
-            # The above function creates the Payout records in the database
-            # Now query for the newly created pending payouts
-            pending_payouts = db.query(models.Payout).filter(
-                models.Payout.sport_event_id == event_id,
-                models.Payout.is_processed == False
-            ).all()
-            
-            if not pending_payouts:
-                raise HTTPException(status_code=400, detail="Failed to create payout records")
-        
-        db.commit()
-        
-        return {
-            "event_id": event_id,
-            "created_payouts": len(pending_payouts),
-            "total_amount_calculated": sum(p.payout_amount for p in pending_payouts),
-            "message": "Payout records created successfully. Ready for review."
-        }
+        job = job_queue.enqueue(db, "process_payouts", {"event_id": event_id})
+        return job_queue.job_accepted(job)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/admin/events/{event_id}/send-payouts")
+@app.post("/api/admin/events/{event_id}/send-payouts", status_code=status.HTTP_202_ACCEPTED)
 def send_event_payouts(
     event_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
-    Send Zcash transactions for existing payout records (Phase 3 - Send Payouts).
+    Queue the Zcash transactions for existing payout records (Phase 3 - Send Payouts).
     
-    This endpoint:
-    1. Takes existing payout records with is_processed=False
+    The job (see betting_utils.send_event_payouts):
+    1. Takes the event's unsent payout plan
     2. Sends batch Zcash transactions via z_sendmany
     3. Marks payout records as is_processed=True
     4. Updates user balances (in dev mode)
     5. Records transaction IDs in payout records
     
+    The job runs once and is not retried automatically: a failure after the
+    transaction was broadcast must not send it a second time. Returns 409
+    while another send for the event is queued or running.
+    
     Returns:
-        Summary of sent transactions with transaction_id
+        The queued job; poll /api/admin/jobs/{job_id} for the transaction_id
     """
     try:
-        # Get existing pending payouts
-        pending_payouts = db.query(models.Payout).filter(
-            models.Payout.sport_event_id == event_id,
-            models.Payout.is_processed == False
-        ).all()
-        
-        if not pending_payouts:
-            raise HTTPException(status_code=400, detail="No pending payouts found. Process payouts first.")
-        
-        # Convert to PayoutRecord format for the batch payout function
-        payout_records = [
-            schemas.PayoutRecord(
-                user_id=p.user_id, bet_id=p.bet_id, payout_amount=p.payout_amount,
-                payout_type=p.payout_type, recipient_address=p.recipient_address
-            ) for p in pending_payouts
-        ]
-        
-        # Send the batch payout transaction (only for external addresses)
-        pool_address = settings.get_pool_address()
-        transaction_id = betting_utils._send_batch_payouts(pool_address, payout_records)
-        
-        # Mark as processed and add to user balances
-        from .zcash_mod import zcash_wallet
-        for payout in pending_payouts:
-            payout.is_processed = True
-            payout.zcash_transaction_id = transaction_id
-            
-            # Add payout to user balance for ALL internal payouts 
-            if payout.user_id and payout.payout_type in ["user_winning", "creator_fee", "validator_fee"]:
-                user = db.query(models.User).filter(models.User.id == payout.user_id).first()
-                if user:
-                    user_address = user.zcash_transparent_address or user.zcash_address
-                    if user_address:
-                        zcash_wallet.add_user_balance(user_address, payout.payout_amount)
-                        print(f"Added {payout.payout_amount} ZEC to {user.username} balance ({payout.payout_type})")
+        sport_event = db.query(models.SportEvent).filter(models.SportEvent.id == event_id).first()
+        if not sport_event:
+            raise HTTPException(status_code=404, detail="Event not found")
         
-        db.commit()
+        # One sender per event; the job also claims the plan before broadcasting
+        if job_queue.find_active_job(db, "send_payouts", {"event_id": event_id}):
+            raise HTTPException(status_code=409, detail="Payouts for this event are already being sent")
         
-        return {
-            "event_id": event_id,
-            "processed_payouts": len(pending_payouts),
-            "total_amount_paid": sum(p.payout_amount for p in pending_payouts),
-            "transaction_id": transaction_id
-        }
+        job = job_queue.enqueue(db, "send_payouts", {"event_id": event_id}, max_attempts=1)
+        return job_queue.job_accepted(job)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/admin/process-expired-events")
+@app.post("/api/admin/process-expired-events", status_code=status.HTTP_202_ACCEPTED)
 def process_expired_events(
+    workers: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
-    Process events that have passed their settlement deadline (Phase 1 - Batch Auto Settlement).
+    Queue processing of events that have passed their settlement deadline (Phase 1 - Batch Auto Settlement).
     
     For events past settlement deadline:
     1. Try consensus settlement first (if enough validations exist)
@@ -1317,66 +1365,96 @@ def process_expired_events(
     3. Creates payout records but does NOT send Zcash transactions
     4. Events will need separate payout processing after this
     
-    This should be called periodically by a cron job or background task.
+    Each event is settled in its own transaction, up to `workers` events at a
+    time (default SETTLEMENT_WORKERS), so one failing event does not roll back
+    the others. Per-event timings are included in the job result.
+    
+    The in-process scheduler already does this periodically; this endpoint is for manual runs.
     """
     try:
-        # Get current time in EST
-        now_est = betting_utils.get_est_now()
-        
-        # Find events past settlement deadline that aren't settled or paid out
-        expired_events = db.query(models.SportEvent).filter(
-            models.SportEvent.settlement_time < now_est,
-            models.SportEvent.status.notin_([models.EventStatus.SETTLED, models.EventStatus.PAIDOUT, models.EventStatus.CANCELLED])
-        ).all()
+        if workers is not None and workers < 1:
+            raise HTTPException(status_code=400, detail="workers must be at least 1")
         
-        processed_events = []
-        
-        for event in expired_events:
-            try:
-                # Try consensus settlement first
-                consensus_outcome, consensus_percentage = crud.determine_consensus_outcome(db, event.id)
-                
-                if consensus_outcome:
-                    # Settle with consensus
-                    settlement_response = betting_utils.settle_event_with_consensus(db, event.id)
-                    processed_events.append({
-                        "event_id": event.id,
-                        "action": "settled_with_consensus",
-                        "winning_outcome": consensus_outcome,
-                        "consensus_percentage": consensus_percentage,
-                        "total_payouts": settlement_response.total_payouts,
-                        "total_payout_amount": settlement_response.total_payout_amount
-                    })
-                else:
-                    # No consensus - settle with PUSH (refund all bets)
-                    settlement_response = betting_utils.settle_event(db, event.id, "push")
-                    
-                    processed_events.append({
-                        "event_id": event.id,
-                        "action": "cancelled_and_refunded",
-                        "reason": "No validation consensus reached by deadline",
-                        "total_refunds": settlement_response.total_payouts,
-                        "total_refund_amount": settlement_response.total_payout_amount
-                    })
-                    
-            except Exception as e:
-                print(f"Error processing expired event {event.id}: {str(e)}")
-                processed_events.append({
-                    "event_id": event.id,
-                    "action": "error",
-                    "error": str(e)
-                })
-        
-        db.commit()
-        
-        return {
-            "message": f"Processed {len(expired_events)} expired events",
-            "processed_events": processed_events
-        }
+        job = job_queue.enqueue(db, "process_expired_events", {"workers": workers})
+        return job_queue.job_accepted(job)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error processing expired events: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to process expired events")
+        print(f"Error queueing expired events processing: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to queue expired events processing")
+
+
+@app.get("/api/admin/odds-cache")
+def get_odds_cache_metrics(
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get live odds cache size, hit/miss counts, write-throughs and invalidations"""
+    return odds_cache.metrics()
+
+
+@app.get("/api/admin/odds-stream")
+def get_odds_stream_metrics(
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get live odds stream subscriptions and how many changes were coalesced"""
+    return {**odds_stream.metrics(), "history": odds_history.metrics()}
+
+
+@app.get("/api/admin/response-cache")
+def get_response_cache_metrics(
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get cached event/nonprofit responses, hit/miss counts and 304s served"""
+    return response_cache.metrics()
+
+
+@app.get("/api/admin/bet-ingestion")
+def get_bet_ingestion_metrics(
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get group-commit batch counts and sizes, rejections and commit latency"""
+    return {"enabled": settings.BET_GROUP_COMMIT, **bet_ingestor.metrics()}
+
+
+@app.get("/api/admin/jobs")
+def get_job_queue_metrics(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Get job queue depth by status, the age of the oldest queued job, wait and
+    run latency over recently finished jobs, and the local worker pool state.
+    """
+    return job_queue.queue_metrics(db)
+
+
+@app.get("/api/admin/jobs/{job_id}")
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get a queued job's status, attempts, result or last error"""
+    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_queue.serialize_job(job)
+
+
+@app.get("/api/admin/scheduler")
+def get_scheduler_status(
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Get the in-process scheduler's leader status and per-job metrics
+    (runs, failures, last/average duration, last result or error), plus the
+    deadline timers' pending count, fired actions and lateness.
+    """
+    return {
+        **scheduler.scheduler.metrics(),
+        "deadlines": deadlines.deadline_scheduler.metrics()
+    }
 
 
 @app.get("/api/events/{event_id}/settlement", response_model=schemas.SettlementResponse | None)
@@ -1395,51 +1473,28 @@ def get_event_settlement(
         if sport_event.status not in [models.EventStatus.SETTLED, models.EventStatus.PAIDOUT] or not sport_event.settled_at:
             return None
         
-        # Get payout records for this event
-        payouts = db.query(models.Payout).filter(models.Payout.sport_event_id == event_id).all()
+        # Everything else comes from the payout plan stored at settlement
+        plan_row = payout_plans.get_payout_plan(db, sport_event)
+        plan = payout_plans.plan_data(plan_row)
         
         # Build payout records for response
-        payout_records = []
-        for payout in payouts:
-            payout_records.append(schemas.PayoutRecord(
-                user_id=payout.user_id,
-                bet_id=payout.bet_id,
-                payout_amount=payout.payout_amount,
-                house_fee_deducted=payout.house_fee_deducted,
-                creator_fee_deducted=payout.creator_fee_deducted,
-                user_address=payout.user.zcash_address
-            ))
-        
-        # Get winning outcome
-        winning_outcome = None
-        if sport_event.betting_system_type == models.BettingSystemType.PARI_MUTUEL:
-            pari_event = db.query(models.PariMutuelEvent).filter(
-                models.PariMutuelEvent.sport_event_id == event_id
-            ).first()
-            if pari_event:
-                winning_outcome = pari_event.winning_outcome
-        
-        if not winning_outcome:
-            # Fall back to first winning bet's outcome
-            winning_bet = db.query(models.Bet).filter(
-                models.Bet.sport_event_id == event_id,
-                models.Bet.outcome == models.BetOutcome.WIN
-            ).first()
-            if winning_bet:
-                winning_outcome = winning_bet.predicted_outcome
-        
-        # Calculate totals
-        total_payout_amount = sum(payout.payout_amount for payout in payouts)
-        
-        # Get transaction ID from first payout record
-        transaction_id = payouts[0].zcash_transaction_id if payouts else None
+        payout_records = [
+            schemas.PayoutRecord(
+                user_id=payout["user_id"],
+                bet_id=payout["bet_id"],
+                payout_amount=payout["payout_amount"],
+                payout_type=payout["payout_type"],
+                recipient_address=payout["recipient_address"]
+            )
+            for payout in payout_plans.payout_rows(plan)
+        ]
         
         return schemas.SettlementResponse(
             event_id=event_id,
-            winning_outcome=winning_outcome or "unknown",
-            total_payouts=len(payouts),
-            total_payout_amount=total_payout_amount,
-            transaction_id=transaction_id,
+            winning_outcome=plan_row.winning_outcome,
+            total_payouts=len(payout_records),
+            total_payout_amount=plan["total_payout_amount"],
+            transaction_id=plan_row.transaction_id,
             settled_at=sport_event.settled_at.isoformat() + 'Z',
             payout_records=payout_records
         )
@@ -1523,6 +1578,10 @@ def submit_validation(
             db, current_user.id, event_id, validation_request
         )
         
+        # A new validation on a closed event may complete consensus
+        if sport_event.get_current_status() == models.EventStatus.CLOSED:
+            deadlines.deadline_scheduler.check_consensus_soon(event_id)
+        
         # Transform to response format
         return schemas.ValidationResponse(
             id=validation_result.id,
@@ -1699,14 +1758,31 @@ def get_user_transactions(
         if request.end_date:
             end_date = datetime.fromisoformat(request.end_date.replace('Z', '+00:00'))
         
-        transactions = transaction_service.get_user_transactions(
-            user_id=current_user.id,
-            transaction_types=transaction_types,
-            limit=request.limit,
-            offset=request.offset,
-            start_date=start_date,
-            end_date=end_date
-        )
+        next_cursor = None
+        if request.offset and not request.cursor:
+            # Legacy offset pagination
+            transactions = transaction_service.get_user_transactions(
+                user_id=current_user.id,
+                transaction_types=transaction_types,
+                limit=request.limit,
+                offset=request.offset,
+                start_date=start_date,
+                end_date=end_date
+            )
+            has_more = len(transactions) == request.limit
+        else:
+            try:
+                transactions, next_cursor = transaction_service.get_user_transactions_page(
+                    user_id=current_user.id,
+                    transaction_types=transaction_types,
+                    limit=request.limit,
+                    cursor=request.cursor,
+                    start_date=start_date,
+                    end_date=end_date
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            has_more = next_cursor is not None
         
         # Convert to response format
         transaction_responses = []
@@ -1738,19 +1814,52 @@ def get_user_transactions(
             ))
         
         # Get total count for pagination
-        total_count = len(transaction_responses)  # Simplified for now
-        has_more = len(transactions) == request.limit
+        total_count = transaction_service.count_user_transactions(
+            user_id=current_user.id,
+            transaction_types=transaction_types,
+            start_date=start_date,
+            end_date=end_date
+        )
         
         return schemas.TransactionHistoryResponse(
             transactions=transaction_responses,
             total_count=total_count,
-            has_more=has_more
+            has_more=has_more,
+            next_cursor=next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get transaction history: {str(e)}")
 
 
+def _ledger_export_response(export_format: str, filename: str, user_id: Optional[int] = None) -> StreamingResponse:
+    """Build a streaming ledger export response (NDJSON or CSV)"""
+    if export_format not in LEDGER_EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid export format: '{export_format}'. Use 'ndjson' or 'csv'")
+    
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_ledger_export(export_format, user_id=user_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
+
+
+@app.get("/api/users/me/transactions/export")
+def export_user_transactions(
+    format: str = "ndjson",
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Stream the current user's full transaction ledger as NDJSON or CSV.
+    
+    Rows are streamed in batches, so memory use does not grow with history size.
+    """
+    return _ledger_export_response(format, f"transactions_user_{current_user.id}", user_id=current_user.id)
+
+
 @app.post("/api/users/me/deposit", response_model=schemas.TransactionResponse)
 def process_user_deposit(
     deposit_request: schemas.DepositRequest,
@@ -1858,33 +1967,34 @@ def process_user_withdrawal(
         raise HTTPException(status_code=500, detail=f"Failed to process withdrawal: {str(e)}")
 
 
-@app.post("/api/admin/reconcile-balances", response_model=schemas.BalanceReconciliationResponse)
+@app.post("/api/admin/reconcile-balances", status_code=status.HTTP_202_ACCEPTED)
 def run_balance_reconciliation(
+    mode: str = "full",
+    workers: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """Run balance reconciliation for all users (admin only)"""
+    """
+    Queue a balance reconciliation (admin only).
+    
+    mode=full checks every active user; mode=incremental only checks users whose
+    balance_version changed since their last reconciliation; mode=sharded checks
+    every active user split across a process pool of `workers` processes.
+    The finished job's result is the BalanceReconciliationResponse.
+    """
     try:
         # TODO: Add admin permission check
         
-        reconciliation_service = BalanceReconciliationService(db)
-        reconciliation = reconciliation_service.run_full_reconciliation()
-        
-        return schemas.BalanceReconciliationResponse(
-            id=reconciliation.id,
-            reconciliation_date=reconciliation.reconciliation_date.isoformat() + 'Z',
-            total_users_checked=reconciliation.total_users_checked,
-            discrepancies_found=reconciliation.discrepancies_found,
-            total_shielded_pool_blockchain=reconciliation.total_shielded_pool_blockchain,
-            total_shielded_pool_database=reconciliation.total_shielded_pool_database,
-            total_transparent_pool_blockchain=reconciliation.total_transparent_pool_blockchain,
-            total_transparent_pool_database=reconciliation.total_transparent_pool_database,
-            reconciliation_status=reconciliation.reconciliation_status,
-            notes=reconciliation.notes
-        )
+        if mode not in job_queue.RECONCILIATION_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid reconciliation mode: '{mode}'. Use 'full', 'incremental' or 'sharded'")
         
+        job = job_queue.enqueue(db, "reconcile_balances", {"mode": mode, "workers": workers})
+        return job_queue.job_accepted(job)
+        
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to run reconciliation: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue reconciliation: {str(e)}")
 
 
 @app.get("/api/admin/reconciliations/{reconciliation_id}/users")
@@ -1924,4 +2034,4 @@ def get_reconciliation_user_details(
         return response_data
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get reconciliation details: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to get reconciliation details: {str(e)}")
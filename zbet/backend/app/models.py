@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, ForeignKey, Text, Enum, Index
+from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, ForeignKey, Text, Enum, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -60,6 +60,8 @@ class User(Base):
     # Balance metadata
     last_balance_update = Column(DateTime, default=datetime.utcnow, nullable=False)
     balance_version = Column(Integer, default=1, nullable=False)  # For optimistic locking
+    reconciled_balance_version = Column(Integer, nullable=True)  # balance_version at last clean reconciliation
+    transaction_count = Column(Integer, default=0, nullable=False)  # Number of user_transactions rows, kept by TransactionService
 
     # Relationships
     bets = relationship("Bet", back_populates="user")
@@ -140,31 +142,39 @@ class SportEvent(Base):
     creator = relationship("User")
     nonprofit = relationship("NonProfit", back_populates="sport_events")
     
+    # Indexes for performance
+    __table_args__ = (
+        Index('idx_sport_events_status_settlement_time', 'status', 'settlement_time'),
+        Index('idx_sport_events_status_settled_at', 'status', 'settled_at'),
+        Index('idx_sport_events_status_event_end_time', 'status', 'event_end_time'),
+    )
+    
     def get_current_status(self):
         """Calculate the current status based on timing and stored status"""
         # If event is already settled, paid out, or cancelled, return as is
         if self.status in [EventStatus.SETTLED, EventStatus.PAIDOUT, EventStatus.CANCELLED]:
             return self.status
         
-        from datetime import datetime, timezone, timedelta
-        
-        # Get current time in Eastern timezone
-        # For simplicity, we'll use UTC-4 (EDT) since it's currently daylight saving time
-        # In production, you'd want to use a proper timezone library
-        eastern_offset = timedelta(hours=-4)  # EDT (Eastern Daylight Time)
-        eastern_tz = timezone(eastern_offset)
-        now_eastern = datetime.now(eastern_tz).replace(tzinfo=None)
+        # The lifecycle job (betting_utils.close_ended_events) persists CLOSED shortly
+        # after event_end_time; until it runs, derive it with the same clock
+        from .betting_utils import get_est_now
         
         # If current time is past event end time, event should be closed
-        if now_eastern > self.event_end_time:
+        if get_est_now() > self.event_end_time:
             return EventStatus.CLOSED
         
         # Otherwise, return the stored status (likely OPEN)
         return self.status
     
     # Serialization methods
-    def to_dict(self, db_session):
-        """Convert to dictionary with all related data"""
+    def to_dict(self, db_session, odds_by_event: dict = None):
+        """
+        Convert to dictionary with all related data.
+        
+        Pass odds_by_event (sport_event_id -> EventOdds, as returned by
+        odds_cache.get_many) when serializing many events to skip the
+        per-event odds lookup.
+        """
         data = {
             "id": self.id,
             "title": self.title,
@@ -187,9 +197,14 @@ class SportEvent(Base):
         
         # Each betting system handles its own data
         if self.betting_system_type == BettingSystemType.PARI_MUTUEL:
-            pari_event = db_session.query(PariMutuelEvent).filter_by(sport_event_id=self.id).first()
-            if pari_event:
-                data["betting_system_data"] = pari_event.to_dict(db_session)
+            # Live pools come from the process-wide odds cache, not the database
+            if odds_by_event is not None:
+                odds = odds_by_event.get(self.id)
+            else:
+                from .odds_cache import odds_cache
+                odds = odds_cache.get(db_session, self.id)
+            if odds:
+                data["betting_system_data"] = odds.to_dict()
         
         return data
 
@@ -216,12 +231,18 @@ class PariMutuelEvent(Base):
     # Relationships
     betting_pools = relationship("PariMutuelPool", back_populates="pari_mutuel_event")
     
+    # Indexes for performance
+    __table_args__ = (
+        Index('idx_pari_mutuel_events_sport_event_id', 'sport_event_id'),
+    )
+    
     # Utility methods
     def get_bets(self, db_session):
-        """Get all bets for this pari-mutuel event"""
-        return db_session.query(Bet).filter(
-            Bet.sport_event_id == self.sport_event_id,
-            Bet.betting_metadata.contains(f'"pari_mutuel_event_id": {self.id}')
+        """Get all bets placed in this event's pools"""
+        return db_session.query(Bet).join(
+            PariMutuelPool, Bet.pari_mutuel_pool_id == PariMutuelPool.id
+        ).filter(
+            PariMutuelPool.pari_mutuel_event_id == self.id
         ).all()
     
     def to_dict(self, db_session):
@@ -262,6 +283,15 @@ class PariMutuelPool(Base):
     # Relationships
     pari_mutuel_event = relationship("PariMutuelEvent", back_populates="betting_pools")
     
+    # Indexes for performance
+    __table_args__ = (
+        Index('idx_pari_mutuel_pools_event_outcome', 'pari_mutuel_event_id', 'outcome_name'),
+    )
+    
+    def get_bets(self, db_session):
+        """Get all bets placed in this pool"""
+        return db_session.query(Bet).filter(Bet.pari_mutuel_pool_id == self.id).all()
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -289,6 +319,9 @@ class Bet(Base):
     predicted_outcome = Column(String(50), nullable=False)  # The outcome identifier they're betting on
     outcome = Column(Enum(BetOutcome), nullable=True)  # Set when event is settled (WIN/LOSS/PUSH)
     
+    # Pari-mutuel pool the bet was placed in (set on placement)
+    pari_mutuel_pool_id = Column(Integer, ForeignKey("pari_mutuel_pools.id"), nullable=True)
+    
     # System-agnostic betting metadata (JSON field for flexibility)
     betting_metadata = Column(Text, nullable=True)  # JSON string for system-specific data
     
@@ -312,6 +345,13 @@ class Bet(Base):
     sport_event = relationship("SportEvent")  # No back_populates since SportEvent doesn't manage bets
     payout = relationship("Payout", back_populates="bet", uselist=False)
     
+    # Indexes for performance
+    __table_args__ = (
+        Index('idx_bets_event_deposit_status', 'sport_event_id', 'deposit_status'),
+        Index('idx_bets_user_event', 'user_id', 'sport_event_id'),
+        Index('idx_bets_pari_mutuel_pool_id', 'pari_mutuel_pool_id'),
+    )
+    
     # Utility methods for betting metadata
     def get_betting_metadata(self):
         """Parse betting_metadata JSON field"""
@@ -324,15 +364,12 @@ class Bet(Base):
         self.betting_metadata = json.dumps(metadata_dict)
     
     def get_pari_mutuel_pool_id(self):
-        """Helper to get pari-mutuel pool ID from metadata"""
-        metadata = self.get_betting_metadata()
-        return metadata.get('pari_mutuel_pool_id')
+        """Helper to get the pari-mutuel pool ID"""
+        return self.pari_mutuel_pool_id
     
     def set_pari_mutuel_pool_id(self, pool_id):
-        """Helper to set pari-mutuel pool ID in metadata"""
-        metadata = self.get_betting_metadata()
-        metadata['pari_mutuel_pool_id'] = pool_id
-        self.set_betting_metadata(metadata)
+        """Helper to set the pari-mutuel pool ID"""
+        self.pari_mutuel_pool_id = pool_id
     
     def is_active(self):
         """Check if bet is active (deposit confirmed and event not settled)"""
@@ -375,6 +412,31 @@ class Payout(Base):
     user = relationship("User", back_populates="payouts")
     bet = relationship("Bet", back_populates="payout")
     sport_event = relationship("SportEvent")
+    
+    # Indexes for performance
+    __table_args__ = (
+        Index('idx_payouts_event_processed', 'sport_event_id', 'is_processed'),
+    )
+
+
+# Snapshot of a settled event's payout plan, written once at settlement
+class EventPayoutPlan(Base):
+    __tablename__ = "event_payout_plans"
+
+    id = Column(Integer, primary_key=True)
+    sport_event_id = Column(Integer, ForeignKey("sport_events.id"), nullable=False, unique=True)
+    winning_outcome = Column(String(50), nullable=False)
+    
+    # Compact JSON snapshot: pool breakdown, fee totals, payout and bet rows (see payout_plans.py)
+    plan = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Set when the payouts in this plan are sent
+    sent_at = Column(DateTime, nullable=True)
+    transaction_id = Column(String(100), nullable=True)
+    
+    # Relationships
+    sport_event = relationship("SportEvent")
 
 
 class ValidationResult(Base):
@@ -406,9 +468,19 @@ class ValidationResult(Base):
     __table_args__ = (
         # Each user can only validate each event once
         Index('idx_user_event_unique', 'user_id', 'sport_event_id', unique=True),
+        Index('idx_validation_results_event_outcome', 'sport_event_id', 'predicted_outcome'),
     )
 
 
+class ValidationTally(Base):
+    """Running count of validations per predicted outcome, kept in step with validation_results"""
+    __tablename__ = "validation_tallies"
+
+    sport_event_id = Column(Integer, ForeignKey("sport_events.id"), primary_key=True)
+    outcome = Column(String(50), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
 # Transaction tracking enums
 class TransactionType(enum.Enum):
     DEPOSIT = "deposit"                    # User deposits funds
@@ -499,6 +571,8 @@ class UserTransaction(Base):
         Index('idx_user_transactions_status', 'status'),
         Index('idx_user_transactions_created_at', 'created_at'),
         Index('idx_user_transactions_zcash_tx_id', 'zcash_transaction_id'),
+        Index('idx_user_transactions_user_created_id', 'user_id', 'created_at', 'id'),  # Keyset pagination
+        Index('idx_user_transactions_user_status_amount', 'user_id', 'status', 'amount'),  # Covers pending/confirmed sums
     )
     
     def get_metadata(self):
@@ -538,6 +612,7 @@ class BalanceReconciliation(Base):
     total_transparent_pool_database = Column(Float, nullable=False, default=0.0)
     
     # Status and notes
+    reconciliation_type = Column(String(20), default="full", nullable=False)  # "full", "incremental"
     reconciliation_status = Column(String(20), default="completed", nullable=False)  # "completed", "failed", "partial"
     notes = Column(Text, nullable=True)
     
@@ -552,6 +627,7 @@ class UserBalanceReconciliation(Base):
     id = Column(Integer, primary_key=True)
     reconciliation_id = Column(Integer, ForeignKey("balance_reconciliations.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    balance_version = Column(Integer, nullable=True)  # User balance_version that was checked
     
     # Balance comparison
     database_shielded_balance = Column(Float, nullable=False, default=0.0)
@@ -580,3 +656,84 @@ class UserBalanceReconciliation(Base):
         Index('idx_user_balance_reconciliation_discrepancy', 'has_discrepancy'),
     )
 
+
+# Single-leader lease for the in-process scheduler
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(200), nullable=False)  # host:pid:nonce of the leader
+    expires_at = Column(DateTime, nullable=False)
+
+
+# Durable background job (see job_queue.py)
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    job_type = Column(String(50), nullable=False)  # Key into job_queue.JOB_HANDLERS
+    payload = Column(Text, nullable=False, default="{}")  # JSON keyword arguments for the handler
+    
+    # Status: "queued", "running", "succeeded", "failed"
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)  # Not claimed before this (retry backoff)
+    
+    # Lease held by the worker running the job, extended by heartbeats
+    lease_owner = Column(String(200), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    
+    # Outcome
+    result = Column(Text, nullable=True)  # JSON returned by the handler
+    last_error = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+
+class OddsChange(Base):
+    """Change log of pari-mutuel odds; workers poll it to invalidate their odds caches"""
+    __tablename__ = "odds_changes"
+
+    id = Column(Integer, primary_key=True)
+    sport_event_id = Column(Integer, nullable=False)
+    origin = Column(String(200), nullable=False)  # Worker that made the change (odds_cache.origin)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_odds_changes_created_at', 'created_at'),
+    )
+
+
+class OddsHistoryChunk(Base):
+    """
+    A run of pool-amount samples for one event (see odds_history.py).
+    
+    Timestamps and per-pool amounts are stored as delta-encoded, compressed
+    int64 arrays; only an event's last chunk is ever rewritten.
+    """
+    __tablename__ = "odds_history_chunks"
+
+    id = Column(Integer, primary_key=True)
+    sport_event_id = Column(Integer, ForeignKey("sport_events.id"), nullable=False)
+    chunk_index = Column(Integer, nullable=False)  # 0, 1, 2, ... per event
+    outcome_names = Column(Text, nullable=False)  # JSON list; column order of the amounts
+    start_time = Column(DateTime, nullable=False)  # First sample
+    end_time = Column(DateTime, nullable=False)  # Last sample
+    sample_count = Column(Integer, nullable=False)
+    timestamps = Column(LargeBinary, nullable=False)  # Millisecond offsets from start_time
+    amounts = Column(LargeBinary, nullable=False)  # Zatoshi per pool, sample_count x len(outcome_names)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_odds_history_chunks_event_chunk', 'sport_event_id', 'chunk_index', unique=True),
+    )
@@ -0,0 +1,375 @@
+"""
+Process-wide cache of live pari-mutuel odds, keyed by sport event.
+
+Each entry is an immutable snapshot of an event's pools (amounts, bet counts
+and implied payout ratios) plus its fees, so event listings, event detail and
+potential-payout estimates read odds without touching the database.
+
+Writes go through the cache at commit time: bet placement and settlement
+record their change on the session (record_bet / record_invalidation), and
+the change is applied to this process's cache only once the transaction
+commits. A placed bet updates the cached pools in place; settlement drops the
+entry so the next read reloads it. Status-only changes (lifecycle closes,
+paid out) leave the entry alone but still notify listeners, which is how the
+live odds stream (odds_stream) learns what to push.
+
+Every recorded change also writes an odds_changes row in the same
+transaction. With several workers, each one polls that table
+(ODDS_CACHE_SYNC_SECONDS) and drops entries changed by other workers, so a
+worker's odds are at most one poll interval behind a bet placed elsewhere.
+"""
+
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from . import models, pari_mutuel
+from .config import settings
+from .database import SessionLocal
+
+# Session.info key holding changes to apply to the cache when the transaction commits
+PENDING_CHANGES = "odds_cache_pending"
+
+
+class PoolOdds(NamedTuple):
+    id: int
+    outcome_name: str
+    outcome_description: str
+    pool_amount: float
+    bet_count: int
+    payout_ratio: Optional[float]  # Set when the event settles
+    is_winning_pool: bool
+    implied_payout_ratio: Optional[float]  # Live payout per unit staked if this outcome wins; None while the pool is empty
+
+
+class EventOdds(NamedTuple):
+    sport_event_id: int
+    pari_event_id: int
+    minimum_bet: float
+    maximum_bet: float
+    fees: pari_mutuel.PariMutuelFees
+    total_pool: float
+    winning_outcome: Optional[str]
+    pools: Tuple[PoolOdds, ...]
+
+    @property
+    def display_fees(self) -> pari_mutuel.PariMutuelFees:
+        # The display estimate has never deducted the charity share
+        return self.fees._replace(charity=0.0)
+
+    def outcome_index(self) -> Dict[str, int]:
+        return {pool.outcome_name: i for i, pool in enumerate(self.pools)}
+
+    def pool_amounts(self) -> List[float]:
+        return [pool.pool_amount for pool in self.pools]
+
+    def with_bet(self, outcome: str, amount: float) -> Optional["EventOdds"]:
+        """Snapshot after one more bet on outcome; None if the outcome is unknown"""
+        index = self.outcome_index().get(outcome)
+        if index is None:
+            return None
+        pools = list(self.pools)
+        pools[index] = pools[index]._replace(
+            pool_amount=pools[index].pool_amount + amount,
+            bet_count=pools[index].bet_count + 1
+        )
+        return self._replace(
+            total_pool=self.total_pool + amount,
+            pools=_with_implied_ratios(pools, self.display_fees)
+        )
+
+    def to_dict(self) -> dict:
+        """Same shape as PariMutuelEvent.to_dict, plus each pool's implied_payout_ratio"""
+        return {
+            "id": self.pari_event_id,
+            "minimum_bet": self.minimum_bet,
+            "maximum_bet": self.maximum_bet,
+            "house_fee_percentage": self.fees.house,
+            "creator_fee_percentage": self.fees.creator,
+            "validator_fee_percentage": self.fees.validator,
+            "charity_fee_percentage": self.fees.charity,
+            "total_pool": self.total_pool,
+            "winning_outcome": self.winning_outcome,
+            "betting_pools": [pool._asdict() for pool in self.pools]
+        }
+
+
+def _with_implied_ratios(pools: List[PoolOdds], fees: pari_mutuel.PariMutuelFees) -> Tuple[PoolOdds, ...]:
+    """Recompute every pool's implied payout ratio from the current pool amounts"""
+    if not pools:
+        return ()
+    ratios = pari_mutuel.estimate_potential_payouts(
+        amounts=[1.0] * len(pools),
+        outcome_indices=list(range(len(pools))),
+        pool_amounts=[pool.pool_amount for pool in pools],
+        fees=fees
+    ).tolist()
+    return tuple(
+        pool._replace(implied_payout_ratio=ratio if pool.pool_amount > 0 else None)
+        for pool, ratio in zip(pools, ratios)
+    )
+
+
+def load_event_odds(db: Session, sport_event_ids: Iterable[int]) -> Dict[int, EventOdds]:
+    """Build odds snapshots for many events from the database (two queries)"""
+    sport_event_ids = list(sport_event_ids)
+    if not sport_event_ids:
+        return {}
+
+    pari_events = db.query(models.PariMutuelEvent).filter(
+        models.PariMutuelEvent.sport_event_id.in_(sport_event_ids)
+    ).all()
+    if not pari_events:
+        return {}
+
+    pools_by_pari_event: Dict[int, List[PoolOdds]] = {pari_event.id: [] for pari_event in pari_events}
+    for pool in db.query(models.PariMutuelPool).filter(
+        models.PariMutuelPool.pari_mutuel_event_id.in_(list(pools_by_pari_event))
+    ).order_by(models.PariMutuelPool.id):
+        pools_by_pari_event[pool.pari_mutuel_event_id].append(PoolOdds(
+            id=pool.id,
+            outcome_name=pool.outcome_name,
+            outcome_description=pool.outcome_description,
+            pool_amount=pool.pool_amount,
+            bet_count=pool.bet_count,
+            payout_ratio=pool.payout_ratio,
+            is_winning_pool=pool.is_winning_pool,
+            implied_payout_ratio=None
+        ))
+
+    snapshots = {}
+    for pari_event in pari_events:
+        fees = pari_mutuel.PariMutuelFees.from_event(pari_event)
+        snapshots[pari_event.sport_event_id] = EventOdds(
+            sport_event_id=pari_event.sport_event_id,
+            pari_event_id=pari_event.id,
+            minimum_bet=pari_event.minimum_bet,
+            maximum_bet=pari_event.maximum_bet,
+            fees=fees,
+            total_pool=pari_event.total_pool,
+            winning_outcome=pari_event.winning_outcome,
+            pools=_with_implied_ratios(pools_by_pari_event[pari_event.id], fees._replace(charity=0.0))
+        )
+    return snapshots
+
+
+class OddsCache:
+    """Thread-safe map of sport_event_id -> EventOdds"""
+
+    def __init__(self, session_factory=SessionLocal, sync_seconds: float = None,
+                 retention_seconds: float = None):
+        self.session_factory = session_factory
+        self.sync_seconds = sync_seconds if sync_seconds is not None else settings.ODDS_CACHE_SYNC_SECONDS
+        self.retention_seconds = (
+            retention_seconds if retention_seconds is not None else settings.ODDS_CACHE_CHANGE_RETENTION_SECONDS
+        )
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._entries: Dict[int, EventOdds] = {}
+        # Bumped on every change so a load that raced with a change is not stored
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        # Called with a sport_event_id after each change, outside the lock
+        self._listeners: List[Callable[[int], None]] = []
+        self._sync_cursor: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.write_throughs = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+
+    # Reads
+
+    def get(self, db: Session, sport_event_id: int) -> Optional[EventOdds]:
+        return self.get_many(db, [sport_event_id]).get(sport_event_id)
+
+    def get_many(self, db: Session, sport_event_ids: Iterable[int]) -> Dict[int, EventOdds]:
+        """Odds for many events; all misses are loaded together. Events without a pari-mutuel event are left out."""
+        found = {}
+        missing = {}
+        with self._lock:
+            for sport_event_id in set(sport_event_ids):
+                entry = self._entries.get(sport_event_id)
+                if entry is not None:
+                    found[sport_event_id] = entry
+                else:
+                    missing[sport_event_id] = self._generations.get(sport_event_id, 0)
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = load_event_odds(db, missing)
+            with self._lock:
+                for sport_event_id, odds in loaded.items():
+                    if self._generations.get(sport_event_id, 0) == missing[sport_event_id]:
+                        self._entries[sport_event_id] = odds
+            found.update(loaded)
+        return found
+
+    # Writes (called once the change has committed)
+
+    def apply_bet(self, sport_event_id: int, outcome: str, amount: float):
+        with self._lock:
+            self._generations[sport_event_id] = self._generations.get(sport_event_id, 0) + 1
+            entry = self._entries.get(sport_event_id)
+            if entry is not None:
+                updated = entry.with_bet(outcome, amount)
+                if updated is None:
+                    del self._entries[sport_event_id]
+                else:
+                    self._entries[sport_event_id] = updated
+                self.write_throughs += 1
+        self._notify(sport_event_id)
+
+    def invalidate(self, sport_event_id: int):
+        with self._lock:
+            self._generations[sport_event_id] = self._generations.get(sport_event_id, 0) + 1
+            if self._entries.pop(sport_event_id, None) is not None:
+                self.invalidations += 1
+        self._notify(sport_event_id)
+
+    def touch(self, sport_event_id: int):
+        """The event changed outside its odds (e.g. status); notify listeners only"""
+        self._notify(sport_event_id)
+
+    # Change listeners
+
+    def add_listener(self, listener: Callable[[int], None]):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, sport_event_id: int):
+        for listener in list(self._listeners):
+            try:
+                listener(sport_event_id)
+            except Exception as e:
+                print(f"Odds cache listener failed for event {sport_event_id}: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            for sport_event_id in self._entries:
+                self._generations[sport_event_id] = self._generations.get(sport_event_id, 0) + 1
+            self._entries.clear()
+
+    # Cross-worker invalidation
+
+    def sync(self, db: Session) -> int:
+        """Drop entries that other workers changed since the last sync. Returns how many changes were seen."""
+        if self._sync_cursor is None:
+            # Start from the current end of the change log; nothing is cached from before it
+            self._sync_cursor = db.query(func.max(models.OddsChange.id)).scalar() or 0
+            return 0
+
+        changes = db.query(
+            models.OddsChange.id, models.OddsChange.sport_event_id, models.OddsChange.origin
+        ).filter(models.OddsChange.id > self._sync_cursor).order_by(models.OddsChange.id).all()
+        for change in changes:
+            if change.origin != self.origin:
+                self.invalidate(change.sport_event_id)
+                self.remote_invalidations += 1
+        if changes:
+            self._sync_cursor = changes[-1].id
+        return len(changes)
+
+    def prune_changes(self, db: Session) -> int:
+        """Delete change-log rows every worker has long since seen. Commits."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        deleted = db.query(models.OddsChange).filter(
+            models.OddsChange.created_at < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def _run(self):
+        polls = 0
+        while not self._stop.wait(self.sync_seconds):
+            try:
+                with self.session_factory() as db:
+                    self.sync(db)
+                    polls += 1
+                    if polls * self.sync_seconds >= self.retention_seconds:
+                        polls = 0
+                        self.prune_changes(db)
+            except Exception as e:
+                print(f"Odds cache sync failed: {str(e)}")
+
+    def start(self):
+        if self.sync_seconds <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        with self.session_factory() as db:
+            self.sync(db)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="zbet-odds-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "write_throughs": self.write_throughs,
+            "invalidations": self.invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            "syncing": bool(self._thread and self._thread.is_alive()),
+            "sync_seconds": self.sync_seconds
+        }
+
+
+odds_cache = OddsCache()
+
+
+# Recording changes inside a transaction
+
+def _record_change(db: Session, sport_event_id: int, change: tuple):
+    db.add(models.OddsChange(sport_event_id=sport_event_id, origin=odds_cache.origin))
+    db.info.setdefault(PENDING_CHANGES, []).append((sport_event_id, change))
+
+
+def record_bet(db: Session, sport_event_id: int, outcome: str, amount: float):
+    """A bet was added to a pool in this transaction; update the cache when it commits"""
+    _record_change(db, sport_event_id, ("bet", outcome, amount))
+
+
+def record_invalidation(db: Session, sport_event_id: int):
+    """The event's odds changed in this transaction (e.g. settlement); drop it from the cache when it commits"""
+    _record_change(db, sport_event_id, ("invalidate",))
+
+
+def record_status_change(db: Session, sport_event_id: int):
+    """The event's status changed in this transaction but its odds did not; notify listeners when it commits"""
+    _record_change(db, sport_event_id, ("status",))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session: Session):
+    for sport_event_id, change in session.info.pop(PENDING_CHANGES, ()):
+        if change[0] == "bet":
+            odds_cache.apply_bet(sport_event_id, change[1], change[2])
+        elif change[0] == "status":
+            odds_cache.touch(sport_event_id)
+        else:
+            odds_cache.invalidate(sport_event_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_changes(session: Session):
+    session.info.pop(PENDING_CHANGES, None)
@@ -0,0 +1,317 @@
+"""
+Pool-amount history of pari-mutuel events, for odds charts.
+
+The recorder listens to the odds cache like the live stream does: a committed
+bet only marks its event dirty, and every ODDS_HISTORY_INTERVAL_SECONDS one
+sample per dirty event is taken from the (already updated) cache. A sample
+whose amounts match the event's last stored sample is dropped, which also
+keeps several workers that see the same change from recording it twice.
+
+Samples are stored per event in chunks (odds_history_chunks) of up to
+ODDS_HISTORY_CHUNK_SAMPLES. A chunk holds two int64 arrays, millisecond
+offsets and zatoshi amounts (one column per pool), each delta-encoded along
+time and zlib-compressed; pool totals only grow, so the deltas are small and
+mostly repeat. Appending rewrites only the event's last chunk, conditionally on
+its sample_count, so concurrent appends from several workers are never lost.
+
+get_history serves a range downsampled to 1m, 5m or 1h buckets, each bucket
+carrying the pool amounts as of its last sample (amounts are a step function,
+so a chart carries the previous bucket forward across empty ones). It reads
+only the event's chunks, never the bets table.
+"""
+
+import json
+import threading
+import zlib
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Set
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models, pari_mutuel
+from .config import settings
+from .database import SessionLocal
+from .odds_cache import OddsCache, odds_cache
+
+# Supported downsampling buckets, in seconds
+BUCKETS = {"1m": 60, "5m": 300, "1h": 3600}
+
+# How often append_sample re-reads an event's last chunk after losing a race for it
+APPEND_ATTEMPTS = 5
+
+
+def encode_deltas(values) -> bytes:
+    """Delta-encode an int64 array along its first axis and compress it"""
+    values = np.asarray(values, dtype=np.int64)
+    return zlib.compress(np.diff(values, axis=0, prepend=0).astype("<i8").tobytes())
+
+
+def decode_deltas(data: bytes, columns: Optional[int] = None) -> np.ndarray:
+    """Inverse of encode_deltas; columns restores a 2-D array's width"""
+    deltas = np.frombuffer(zlib.decompress(data), dtype="<i8")
+    if columns is not None:
+        deltas = deltas.reshape(-1, columns)
+    return np.cumsum(deltas, axis=0)
+
+
+def _to_ms(moment: datetime) -> int:
+    return int(np.datetime64(moment, "ms").astype(np.int64))
+
+
+def _from_ms(ms: int) -> datetime:
+    return np.datetime64(int(ms), "ms").astype(datetime)
+
+
+class OddsSeries(NamedTuple):
+    outcome_names: List[str]
+    times_ms: np.ndarray  # int64 epoch milliseconds (naive event-local time, like event times)
+    amounts: np.ndarray  # int64 zatoshi, len(times_ms) x len(outcome_names)
+
+
+def _chunk_series(chunk: models.OddsHistoryChunk) -> OddsSeries:
+    outcome_names = json.loads(chunk.outcome_names)
+    return OddsSeries(
+        outcome_names=outcome_names,
+        times_ms=decode_deltas(chunk.timestamps) + _to_ms(chunk.start_time),
+        amounts=decode_deltas(chunk.amounts, len(outcome_names))
+    )
+
+
+def _last_chunk(db: Session, sport_event_id: int) -> Optional[models.OddsHistoryChunk]:
+    # populate_existing: a retry must see what another worker committed meanwhile
+    return db.query(models.OddsHistoryChunk).filter(
+        models.OddsHistoryChunk.sport_event_id == sport_event_id
+    ).order_by(models.OddsHistoryChunk.chunk_index.desc()).populate_existing().first()
+
+
+def append_sample(db: Session, sport_event_id: int, outcome_names: List[str], amounts: List[float],
+                  at: datetime, chunk_samples: int = None) -> bool:
+    """
+    Record one sample of pool amounts (ZEC, in outcome_names order). Does not commit.
+
+    Several workers may append to the same event at once: the last chunk is
+    rewritten only if its sample_count is still the one read, and a new chunk
+    only if no one else created it, otherwise the append starts over from the
+    chunk the other worker wrote.
+
+    Returns:
+        False if the amounts match the event's last sample and nothing was written
+    """
+    chunk_samples = chunk_samples or settings.ODDS_HISTORY_CHUNK_SAMPLES
+    sample = pari_mutuel.to_zatoshi(amounts)
+    for _ in range(APPEND_ATTEMPTS):
+        appended = _try_append(db, sport_event_id, outcome_names, sample, at, chunk_samples)
+        if appended is not None:
+            return appended
+    raise RuntimeError(f"Odds history of event {sport_event_id} kept changing; sample not recorded")
+
+
+def _try_append(db: Session, sport_event_id: int, outcome_names: List[str], sample: np.ndarray,
+                at: datetime, chunk_samples: int) -> Optional[bool]:
+    """One attempt of append_sample; None if another worker changed the last chunk first"""
+    chunk = _last_chunk(db, sport_event_id)
+    at_ms = _to_ms(at)
+
+    if chunk is not None:
+        series = _chunk_series(chunk)
+        if series.outcome_names == outcome_names and np.array_equal(series.amounts[-1], sample):
+            return False
+        if chunk.sample_count < chunk_samples and series.outcome_names == outcome_names:
+            times_ms = np.append(series.times_ms, at_ms)
+            matched = db.query(models.OddsHistoryChunk).filter(
+                models.OddsHistoryChunk.id == chunk.id,
+                models.OddsHistoryChunk.sample_count == chunk.sample_count
+            ).update({
+                models.OddsHistoryChunk.end_time: at,
+                models.OddsHistoryChunk.sample_count: len(times_ms),
+                models.OddsHistoryChunk.timestamps: encode_deltas(times_ms - times_ms[0]),
+                models.OddsHistoryChunk.amounts: encode_deltas(np.vstack([series.amounts, sample]))
+            }, synchronize_session=False)
+            return True if matched else None
+
+    # Start a new chunk; a full one is never rewritten again
+    new_chunk = models.OddsHistoryChunk(
+        sport_event_id=sport_event_id,
+        chunk_index=chunk.chunk_index + 1 if chunk is not None else 0,
+        outcome_names=json.dumps(outcome_names),
+        start_time=at,
+        end_time=at,
+        sample_count=1,
+        timestamps=encode_deltas(np.zeros(1, dtype=np.int64)),
+        amounts=encode_deltas(sample.reshape(1, -1))
+    )
+    try:
+        # Savepoint, so losing the race for this chunk_index keeps the rest of the transaction
+        with db.begin_nested():
+            db.add(new_chunk)
+    except IntegrityError:
+        return None
+    return True
+
+
+def load_series(db: Session, sport_event_id: int, start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> Optional[OddsSeries]:
+    """All samples of an event between start and end (inclusive); None if nothing was recorded"""
+    query = db.query(models.OddsHistoryChunk).filter(models.OddsHistoryChunk.sport_event_id == sport_event_id)
+    if start is not None:
+        query = query.filter(models.OddsHistoryChunk.end_time >= start)
+    if end is not None:
+        query = query.filter(models.OddsHistoryChunk.start_time <= end)
+    chunks = [_chunk_series(chunk) for chunk in query.order_by(models.OddsHistoryChunk.chunk_index)]
+    if not chunks:
+        return None
+
+    # Align every chunk to the latest chunk's outcomes (they only differ if pools were renamed)
+    outcome_names = chunks[-1].outcome_names
+    aligned = []
+    for chunk in chunks:
+        if chunk.outcome_names == outcome_names:
+            aligned.append(chunk.amounts)
+            continue
+        columns = np.zeros((len(chunk.times_ms), len(outcome_names)), dtype=np.int64)
+        for i, name in enumerate(outcome_names):
+            if name in chunk.outcome_names:
+                columns[:, i] = chunk.amounts[:, chunk.outcome_names.index(name)]
+        aligned.append(columns)
+
+    times_ms = np.concatenate([chunk.times_ms for chunk in chunks])
+    amounts = np.vstack(aligned)
+    keep = np.ones(len(times_ms), dtype=bool)
+    if start is not None:
+        keep &= times_ms >= _to_ms(start)
+    if end is not None:
+        keep &= times_ms <= _to_ms(end)
+    return OddsSeries(outcome_names, times_ms[keep], amounts[keep])
+
+
+def downsample(series: OddsSeries, bucket_seconds: int) -> OddsSeries:
+    """One sample per bucket: the bucket's start time and the amounts as of its last sample"""
+    if len(series.times_ms) == 0:
+        return series
+    bucket_ms = bucket_seconds * 1000
+    keys = series.times_ms // bucket_ms
+    last_in_bucket = np.flatnonzero(np.append(keys[1:] != keys[:-1], True))
+    return OddsSeries(series.outcome_names, keys[last_in_bucket] * bucket_ms, series.amounts[last_in_bucket])
+
+
+def get_history(db: Session, sport_event_id: int, bucket: str = "5m", start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> dict:
+    """Downsampled pool-amount history of an event, ready to serialize"""
+    if bucket not in BUCKETS:
+        raise ValueError(f"Invalid bucket: {bucket}. Use one of {list(BUCKETS)}")
+
+    series = load_series(db, sport_event_id, start, end)
+    if series is None:
+        return {"sport_event_id": sport_event_id, "bucket": bucket, "outcomes": [], "points": []}
+
+    series = downsample(series, BUCKETS[bucket])
+    amounts = pari_mutuel.to_zec(series.amounts)
+    return {
+        "sport_event_id": sport_event_id,
+        "bucket": bucket,
+        "outcomes": series.outcome_names,
+        "points": [
+            {
+                "time": _from_ms(time_ms).isoformat(),
+                "pool_amounts": row.tolist(),
+                "total_pool": float(row.sum())
+            }
+            for time_ms, row in zip(series.times_ms.tolist(), amounts)
+        ]
+    }
+
+
+class OddsHistoryRecorder:
+    """Samples the pool amounts of changed events at most once per interval"""
+
+    def __init__(self, cache: OddsCache = odds_cache, session_factory=SessionLocal,
+                 interval_seconds: float = None, chunk_samples: int = None):
+        self.cache = cache
+        self.session_factory = session_factory
+        self.interval_seconds = (
+            interval_seconds if interval_seconds is not None else settings.ODDS_HISTORY_INTERVAL_SECONDS
+        )
+        self.chunk_samples = chunk_samples or settings.ODDS_HISTORY_CHUNK_SAMPLES
+        self._dirty: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Metrics
+        self.changes_received = 0
+        self.samples_recorded = 0
+        self.samples_unchanged = 0
+
+        cache.add_listener(self.mark_changed)
+
+    def mark_changed(self, sport_event_id: int):
+        """Called after commit for every odds change; cheap, safe from any thread"""
+        with self._lock:
+            self.changes_received += 1
+            self._dirty.add(sport_event_id)
+
+    def flush(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Record one sample per changed event. Commits. Returns the number of samples written."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+
+        from .betting_utils import get_est_now
+        now = now or get_est_now()
+        recorded = 0
+        try:
+            for sport_event_id, odds in sorted(self.cache.get_many(db, dirty).items()):
+                if append_sample(
+                    db, sport_event_id, [pool.outcome_name for pool in odds.pools], odds.pool_amounts(),
+                    now, self.chunk_samples
+                ):
+                    recorded += 1
+                else:
+                    self.samples_unchanged += 1
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Try these events again next interval
+            with self._lock:
+                self._dirty |= dirty
+            raise
+        self.samples_recorded += recorded
+        return recorded
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                with self.session_factory() as db:
+                    self.flush(db)
+            except Exception as e:
+                print(f"Odds history flush failed: {str(e)}")
+
+    def start(self):
+        if self.interval_seconds <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="zbet-odds-history", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            dirty = len(self._dirty)
+        return {
+            "dirty_events": dirty,
+            "changes_received": self.changes_received,
+            "samples_recorded": self.samples_recorded,
+            "samples_unchanged": self.samples_unchanged,
+            "recording": bool(self._thread and self._thread.is_alive()),
+            "interval_seconds": self.interval_seconds
+        }
+
+
+odds_history = OddsHistoryRecorder()
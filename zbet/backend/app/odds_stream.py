@@ -0,0 +1,257 @@
+"""
+Live push of pool, odds and status updates to subscribed clients.
+
+Clients subscribe to a set of sport event ids (GET /api/odds/stream, served
+as server-sent events). Bet placement, settlement and status changes reach
+the broker through the odds cache's change listeners once their transaction
+commits, and other workers' bets arrive the same way through the cache's
+odds_changes sync.
+
+Changes are coalesced: a change only marks its event dirty, and a flusher
+thread publishes each dirty event at most once per
+ODDS_STREAM_COALESCE_SECONDS, reading the odds from the (already updated)
+cache. A burst of bets on one event therefore costs one message per
+interval, not one per bet. Each subscription also keeps only the latest
+undelivered message per event, so a slow client skips intermediate states
+instead of building a backlog.
+"""
+
+import asyncio
+import json
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+from .odds_cache import OddsCache, odds_cache
+
+
+class Subscription:
+    """One client's view of the stream: pending messages keyed by event, delivered from any thread"""
+
+    def __init__(self, broker: "OddsStreamBroker", sport_event_ids: Iterable[int],
+                 loop: asyncio.AbstractEventLoop):
+        self.broker = broker
+        self.sport_event_ids = frozenset(sport_event_ids)
+        self._loop = loop
+        self._pending: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def deliver(self, message: dict):
+        """Queue a message, replacing any undelivered one for the same event"""
+        with self._lock:
+            self._pending[message["sport_event_id"]] = message
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # The client's event loop has gone away
+            self.close()
+
+    async def next_messages(self, timeout: float) -> List[dict]:
+        """Wait up to timeout seconds for messages; returns [] on timeout"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        with self._lock:
+            messages = list(self._pending.values())
+            self._pending.clear()
+        return messages
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+
+
+class OddsStreamBroker:
+    """In-process pub/sub from committed odds changes to stream subscriptions"""
+
+    def __init__(self, cache: OddsCache = odds_cache, session_factory=SessionLocal,
+                 coalesce_seconds: float = None):
+        self.cache = cache
+        self.session_factory = session_factory
+        self.coalesce_seconds = (
+            coalesce_seconds if coalesce_seconds is not None else settings.ODDS_STREAM_COALESCE_SECONDS
+        )
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._dirty: Set[int] = set()
+        # Pool amounts as last published per event, for the pool deltas
+        self._published_pools: Dict[int, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Metrics
+        self.changes_received = 0
+        self.changes_coalesced = 0
+        self.messages_published = 0
+        self.messages_delivered = 0
+
+        cache.add_listener(self.publish)
+
+    # Subscriptions
+
+    def subscribe(self, sport_event_ids: Iterable[int],
+                  loop: Optional[asyncio.AbstractEventLoop] = None) -> Subscription:
+        subscription = Subscription(self, sport_event_ids, loop or asyncio.get_running_loop())
+        with self._lock:
+            for sport_event_id in subscription.sport_event_ids:
+                self._subscriptions.setdefault(sport_event_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for sport_event_id in subscription.sport_event_ids:
+                subscribers = self._subscriptions.get(sport_event_id)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[sport_event_id]
+                    self._published_pools.pop(sport_event_id, None)
+                    self._dirty.discard(sport_event_id)
+
+    # Publishing
+
+    def publish(self, sport_event_id: int):
+        """Mark an event changed (called after commit); cheap, safe from any thread"""
+        with self._lock:
+            self.changes_received += 1
+            if sport_event_id not in self._subscriptions:
+                return
+            if sport_event_id in self._dirty:
+                self.changes_coalesced += 1
+            else:
+                self._dirty.add(sport_event_id)
+
+    def snapshot(self, db: Session, sport_event_ids: Iterable[int]) -> List[dict]:
+        """Current state of each event (no pool deltas), e.g. for a new subscriber"""
+        return self._build_messages(db, sport_event_ids)
+
+    def flush(self, db: Session) -> int:
+        """Publish one message per dirty, still-subscribed event. Returns the number published."""
+        with self._lock:
+            dirty = [sport_event_id for sport_event_id in self._dirty if sport_event_id in self._subscriptions]
+            self._dirty.clear()
+        if not dirty:
+            return 0
+
+        messages = self._build_messages(db, dirty, with_deltas=True)
+        for message in messages:
+            with self._lock:
+                subscribers = list(self._subscriptions.get(message["sport_event_id"], ()))
+                self.messages_published += 1
+                self.messages_delivered += len(subscribers)
+            for subscription in subscribers:
+                subscription.deliver(message)
+        return len(messages)
+
+    def _build_messages(self, db: Session, sport_event_ids: Iterable[int], with_deltas: bool = False) -> List[dict]:
+        sport_event_ids = sorted(set(sport_event_ids))
+        if not sport_event_ids:
+            return []
+
+        # Odds come from the cache (updated in place on commit); only status needs a query
+        odds_by_event = self.cache.get_many(db, sport_event_ids)
+        sport_events = db.query(models.SportEvent).filter(models.SportEvent.id.in_(sport_event_ids)).all()
+
+        messages = []
+        for sport_event in sport_events:
+            odds = odds_by_event.get(sport_event.id)
+            message = {
+                "sport_event_id": sport_event.id,
+                "status": sport_event.get_current_status().value,
+                "odds": odds.to_dict() if odds else None
+            }
+            if odds:
+                pools = {pool.outcome_name: pool.pool_amount for pool in odds.pools}
+                with self._lock:
+                    previous = self._published_pools.get(sport_event.id)
+                    if sport_event.id in self._subscriptions and (with_deltas or previous is None):
+                        self._published_pools[sport_event.id] = pools
+                if with_deltas and previous is not None:
+                    message["pool_deltas"] = {
+                        outcome: amount - previous.get(outcome, 0.0)
+                        for outcome, amount in pools.items()
+                        if amount != previous.get(outcome, 0.0)
+                    }
+            messages.append(message)
+        return messages
+
+    # Flusher thread
+
+    def _run(self):
+        while not self._stop.wait(self.coalesce_seconds):
+            try:
+                with self.session_factory() as db:
+                    self.flush(db)
+            except Exception as e:
+                print(f"Odds stream flush failed: {str(e)}")
+
+    def start(self):
+        if self.coalesce_seconds <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="zbet-odds-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            subscriptions = len({
+                subscription for subscribers in self._subscriptions.values() for subscription in subscribers
+            })
+            events = len(self._subscriptions)
+            dirty = len(self._dirty)
+        return {
+            "subscriptions": subscriptions,
+            "subscribed_events": events,
+            "dirty_events": dirty,
+            "changes_received": self.changes_received,
+            "changes_coalesced": self.changes_coalesced,
+            "messages_published": self.messages_published,
+            "messages_delivered": self.messages_delivered,
+            "flushing": bool(self._thread and self._thread.is_alive()),
+            "coalesce_seconds": self.coalesce_seconds
+        }
+
+
+odds_stream = OddsStreamBroker()
+
+
+def format_sse(message: dict, event: str = "odds") -> str:
+    """Encode one message as a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(message)}\n\n"
+
+
+async def sse_messages(subscription: Subscription, initial: List[dict],
+                       is_disconnected: Callable[[], Awaitable[bool]],
+                       keepalive_seconds: float = None) -> AsyncIterator[str]:
+    """Server-sent event stream: the initial snapshot, then updates until the client goes away"""
+    keepalive_seconds = keepalive_seconds or settings.ODDS_STREAM_KEEPALIVE_SECONDS
+    try:
+        for message in initial:
+            yield format_sse(message)
+        while not subscription.closed:
+            if await is_disconnected():
+                break
+            messages = await subscription.next_messages(keepalive_seconds)
+            if not messages:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            for message in messages:
+                yield format_sse(message)
+    finally:
+        subscription.close()
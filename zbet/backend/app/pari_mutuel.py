@@ -0,0 +1,148 @@
+"""
+Vectorized pari-mutuel payout calculations.
+
+Amounts are converted to integer zatoshi once and every pool total, payout and
+fee is computed with whole-array NumPy operations, so the cost of a settlement
+or a display estimate does not depend on a Python loop over bets. Fees and
+winnings are floored to the zatoshi; whatever is left over is reported as the
+remainder instead of silently disappearing.
+"""
+
+from typing import Dict, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+ZATOSHI_PER_ZEC = 100_000_000
+
+FEE_TYPES = ("house", "creator", "validator", "charity")
+
+
+class PariMutuelFees(NamedTuple):
+    """Fee fractions taken from the losing pool"""
+    house: float = 0.0
+    creator: float = 0.0
+    validator: float = 0.0
+    charity: float = 0.0
+
+    @classmethod
+    def from_event(cls, pari_event) -> "PariMutuelFees":
+        return cls(
+            house=pari_event.house_fee_percentage,
+            creator=pari_event.creator_fee_percentage,
+            validator=pari_event.validator_fee_percentage,
+            charity=pari_event.charity_fee_percentage
+        )
+
+    @property
+    def total(self) -> float:
+        return self.house + self.creator + self.validator + self.charity
+
+
+class SettlementResult(NamedTuple):
+    """Result of settling one pari-mutuel event"""
+    payouts: np.ndarray  # Per-bet payout in ZEC, aligned with the input amounts
+    fees: Dict[str, float]  # Fee totals in ZEC keyed by FEE_TYPES
+    remainder: float  # ZEC neither paid out nor taken as a fee
+    pool_totals: np.ndarray  # Per-outcome pool totals in ZEC
+    winning_pool: float
+    losing_pool: float
+
+
+def to_zatoshi(amounts) -> np.ndarray:
+    """Convert ZEC amounts to int64 zatoshi, rounding to the nearest zatoshi"""
+    return np.rint(np.asarray(amounts, dtype=np.float64) * ZATOSHI_PER_ZEC).astype(np.int64)
+
+
+def to_zec(zatoshi):
+    """Convert zatoshi (scalar or array) back to ZEC"""
+    if isinstance(zatoshi, np.ndarray):
+        return zatoshi / ZATOSHI_PER_ZEC
+    return int(zatoshi) / ZATOSHI_PER_ZEC
+
+
+def _floor_zatoshi(values) -> np.ndarray:
+    # Round away float noise (e.g. 0.6 * 7e8 == 419999999.99999994) before flooring
+    return np.floor(np.round(values, 4)).astype(np.int64)
+
+
+def _pool_totals(amounts_zat: np.ndarray, outcome_indices: np.ndarray, n_outcomes: int) -> np.ndarray:
+    if amounts_zat.size == 0:
+        return np.zeros(n_outcomes, dtype=np.int64)
+    # float64 weights are exact for totals below 2**53 zatoshi (~90M ZEC)
+    return np.bincount(outcome_indices, weights=amounts_zat, minlength=n_outcomes).astype(np.int64)
+
+
+def calculate_settlement(amounts: Sequence[float], outcome_indices: Sequence[int],
+                         winning_index: Optional[int], fees: PariMutuelFees,
+                         n_outcomes: Optional[int] = None) -> SettlementResult:
+    """
+    Settle an event in one pass over the bet arrays.
+
+    Winners get their stake back and losers get nothing; fees are fractions of
+    the losing pool. A winning_index of None is a push/tie: every bet is refunded
+    and no fees are taken. The remainder is the part of the losing pool that is
+    not allocated to any fee, plus the zatoshi lost to flooring.
+    """
+    amounts_zat = to_zatoshi(amounts)
+    outcome_indices = np.asarray(outcome_indices, dtype=np.int64)
+    if n_outcomes is None:
+        n_outcomes = int(outcome_indices.max()) + 1 if outcome_indices.size else 0
+    if winning_index is not None:
+        n_outcomes = max(n_outcomes, winning_index + 1)
+
+    pool_totals_zat = _pool_totals(amounts_zat, outcome_indices, n_outcomes)
+    total_zat = int(pool_totals_zat.sum())
+
+    if winning_index is None:
+        return SettlementResult(
+            payouts=to_zec(amounts_zat),
+            fees={fee_type: 0.0 for fee_type in FEE_TYPES},
+            remainder=0.0,
+            pool_totals=to_zec(pool_totals_zat),
+            winning_pool=0.0,
+            losing_pool=0.0
+        )
+
+    winning_zat = int(pool_totals_zat[winning_index])
+    losing_zat = total_zat - winning_zat
+
+    payouts_zat = np.where(outcome_indices == winning_index, amounts_zat, 0)
+    fee_fractions = np.array([getattr(fees, fee_type) for fee_type in FEE_TYPES], dtype=np.float64)
+    fees_zat = _floor_zatoshi(losing_zat * fee_fractions)
+    remainder_zat = total_zat - int(payouts_zat.sum()) - int(fees_zat.sum())
+
+    return SettlementResult(
+        payouts=to_zec(payouts_zat),
+        fees={fee_type: to_zec(fee) for fee_type, fee in zip(FEE_TYPES, fees_zat)},
+        remainder=to_zec(remainder_zat),
+        pool_totals=to_zec(pool_totals_zat),
+        winning_pool=to_zec(winning_zat),
+        losing_pool=to_zec(losing_zat)
+    )
+
+
+def estimate_potential_payouts(amounts: Sequence[float], outcome_indices: Sequence[int],
+                               pool_amounts: Sequence[float], fees: PariMutuelFees) -> np.ndarray:
+    """
+    Estimate each bet's payout if its predicted outcome wins.
+
+    Payout = stake + (stake / own pool) x (losing pools - fees). Bets whose pool is
+    empty, or whose outcome has no opposing money, just get their stake back.
+    pool_amounts are the event's current pool totals, indexed by outcome.
+    """
+    amounts_zat = to_zatoshi(amounts)
+    outcome_indices = np.asarray(outcome_indices, dtype=np.int64)
+    pools_zat = to_zatoshi(pool_amounts)
+    if amounts_zat.size == 0:
+        return np.zeros(0, dtype=np.float64)
+
+    own_pool_zat = pools_zat[outcome_indices]
+    losing_zat = pools_zat.sum() - own_pool_zat
+    net_losing_zat = losing_zat * (1.0 - fees.total)
+
+    has_share = (own_pool_zat > 0) & (losing_zat > 0)
+    share_zat = np.zeros(amounts_zat.shape, dtype=np.int64)
+    share_zat[has_share] = _floor_zatoshi(
+        amounts_zat[has_share] * net_losing_zat[has_share] / own_pool_zat[has_share]
+    )
+    return to_zec(amounts_zat + share_zat)
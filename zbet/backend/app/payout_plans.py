@@ -0,0 +1,204 @@
+"""
+Persisted payout plans for settled events.
+
+Settled events do not change, so the payout plan (pool breakdown, fee totals and
+every payout and bet row with the user details the admin views need) is computed
+once at settlement and stored as a compact JSON snapshot in event_payout_plans.
+Review, send-payouts and settlement-info read that single row instead of
+re-querying payouts, bets and users on every request.
+"""
+
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models, pari_mutuel
+
+PLAN_VERSION = 1
+
+# Rows are stored as arrays in this column order to keep snapshots small
+PAYOUT_COLUMNS = (
+    "payout_id", "user_id", "bet_id", "payout_type", "payout_amount", "recipient_address",
+    "username", "zcash_address", "user_address"
+)
+BET_COLUMNS = (
+    "id", "user_id", "amount", "predicted_outcome", "outcome", "payout_amount",
+    "username", "zcash_address"
+)
+
+FEE_PAYOUT_TYPES = ("house_fee", "creator_fee", "validator_fee", "charity_fee")
+
+
+def build_payout_plan(db: Session, sport_event: models.SportEvent, winning_outcome: str,
+                      pari_event: Optional[models.PariMutuelEvent] = None) -> dict:
+    """Compute the payout plan for a settled event from its payout and bet records"""
+    payouts = models.Payout.__table__
+    bets = models.Bet.__table__
+    users = models.User.__table__
+
+    payout_rows = db.execute(
+        select(
+            payouts.c.id, payouts.c.user_id, payouts.c.bet_id, payouts.c.payout_type,
+            payouts.c.payout_amount, payouts.c.recipient_address,
+            users.c.username, users.c.zcash_address, users.c.zcash_transparent_address
+        ).select_from(
+            payouts.outerjoin(users, users.c.id == payouts.c.user_id)
+        ).where(payouts.c.sport_event_id == sport_event.id).order_by(payouts.c.id)
+    ).all()
+
+    bet_rows = db.execute(
+        select(
+            bets.c.id, bets.c.user_id, bets.c.amount, bets.c.predicted_outcome, bets.c.outcome,
+            bets.c.payout_amount, users.c.username, users.c.zcash_address
+        ).select_from(
+            bets.join(users, users.c.id == bets.c.user_id)
+        ).where(
+            bets.c.sport_event_id == sport_event.id,
+            bets.c.deposit_status == models.DepositStatus.CONFIRMED.name
+        ).order_by(bets.c.id)
+    ).all()
+
+    if pari_event is None:
+        pari_event = db.query(models.PariMutuelEvent).filter(
+            models.PariMutuelEvent.sport_event_id == sport_event.id
+        ).first()
+
+    # Pool breakdown
+    total_pool_amount = pari_event.total_pool if pari_event else 0
+    winning_pool_amount = 0
+    if pari_event:
+        outcome_names = [pool.outcome_name for pool in pari_event.betting_pools]
+        if winning_outcome in outcome_names:
+            pool_breakdown = pari_mutuel.calculate_settlement(
+                amounts=[pool.pool_amount for pool in pari_event.betting_pools],
+                outcome_indices=range(len(outcome_names)),
+                winning_index=outcome_names.index(winning_outcome),
+                fees=pari_mutuel.PariMutuelFees.from_event(pari_event)
+            )
+            winning_pool_amount = pool_breakdown.winning_pool
+
+    # Fee totals from the payout records that were actually created
+    fees = {fee_type: 0.0 for fee_type in FEE_PAYOUT_TYPES}
+    for row in payout_rows:
+        if row.payout_type in fees:
+            fees[row.payout_type] += row.payout_amount
+
+    return {
+        "version": PLAN_VERSION,
+        "winning_outcome": winning_outcome,
+        "total_pool_amount": total_pool_amount,
+        "winning_pool_amount": winning_pool_amount,
+        "losing_pool_amount": total_pool_amount - winning_pool_amount,
+        "fees": fees,
+        "fee_percentages": {
+            "house_fee_percentage": pari_event.house_fee_percentage if pari_event else 0,
+            "creator_fee_percentage": pari_event.creator_fee_percentage if pari_event else 0,
+            "validator_fee_percentage": pari_event.validator_fee_percentage if pari_event else 0
+        },
+        "total_payout_amount": sum(row.payout_amount for row in payout_rows),
+        "payouts": [
+            [
+                row.id, row.user_id, row.bet_id, row.payout_type, row.payout_amount, row.recipient_address,
+                row.username, row.zcash_address, row.zcash_transparent_address or row.zcash_address
+            ]
+            for row in payout_rows
+        ],
+        "bets": [
+            [
+                row.id, row.user_id, row.amount, row.predicted_outcome,
+                row.outcome.value if row.outcome else None, row.payout_amount,
+                row.username, row.zcash_address
+            ]
+            for row in bet_rows
+        ]
+    }
+
+
+def save_payout_plan(db: Session, sport_event: models.SportEvent, winning_outcome: str,
+                     pari_event: Optional[models.PariMutuelEvent] = None) -> models.EventPayoutPlan:
+    """
+    Build and store (or replace) the event's payout plan. Does not commit.
+
+    A plan that was already sent is never replaced: rebuilding it would mark
+    the payouts it paid as unsent.
+    """
+    plan_row = db.query(models.EventPayoutPlan).filter(
+        models.EventPayoutPlan.sport_event_id == sport_event.id
+    ).first()
+    if plan_row is not None and plan_row.sent_at is not None:
+        raise ValueError(f"Payout plan for event {sport_event.id} was already sent")
+
+    db.flush()
+    plan = build_payout_plan(db, sport_event, winning_outcome, pari_event)
+    if plan_row is None:
+        plan_row = models.EventPayoutPlan(sport_event_id=sport_event.id)
+        db.add(plan_row)
+
+    plan_row.winning_outcome = winning_outcome
+    plan_row.plan = json.dumps(plan, separators=(",", ":"))
+    plan_row.created_at = datetime.utcnow()
+    # A rebuilt plan has not been sent yet
+    plan_row.sent_at = None
+    plan_row.transaction_id = None
+    return plan_row
+
+
+def _settled_winning_outcome(db: Session, sport_event: models.SportEvent) -> str:
+    pari_event = db.query(models.PariMutuelEvent).filter(
+        models.PariMutuelEvent.sport_event_id == sport_event.id
+    ).first()
+    if pari_event and pari_event.winning_outcome:
+        return pari_event.winning_outcome
+
+    # Fall back to first winning bet's outcome
+    winning_bet = db.query(models.Bet).filter(
+        models.Bet.sport_event_id == sport_event.id,
+        models.Bet.outcome == models.BetOutcome.WIN
+    ).first()
+    return winning_bet.predicted_outcome if winning_bet else "unknown"
+
+
+def get_payout_plan(db: Session, sport_event: models.SportEvent) -> Optional[models.EventPayoutPlan]:
+    """
+    Get the stored payout plan for a settled event.
+
+    Events settled before plans were stored get one built and committed on first
+    read. Returns None if the event is not settled.
+    """
+    plan_row = db.query(models.EventPayoutPlan).filter(
+        models.EventPayoutPlan.sport_event_id == sport_event.id
+    ).first()
+    if plan_row is not None:
+        return plan_row
+
+    if sport_event.status not in [models.EventStatus.SETTLED, models.EventStatus.PAIDOUT]:
+        return None
+
+    plan_row = save_payout_plan(db, sport_event, _settled_winning_outcome(db, sport_event))
+    sent_payout = db.query(models.Payout).filter(
+        models.Payout.sport_event_id == sport_event.id,
+        models.Payout.is_processed == True
+    ).first()
+    if sent_payout:
+        plan_row.sent_at = sent_payout.payout_processed_at
+        plan_row.transaction_id = sent_payout.zcash_transaction_id
+    db.commit()
+    return plan_row
+
+
+def plan_data(plan_row: models.EventPayoutPlan) -> dict:
+    """Decode a stored plan"""
+    return json.loads(plan_row.plan)
+
+
+def payout_rows(plan: dict) -> List[dict]:
+    """Expand the plan's payout arrays into dicts keyed by PAYOUT_COLUMNS"""
+    return [dict(zip(PAYOUT_COLUMNS, row)) for row in plan["payouts"]]
+
+
+def bet_rows(plan: dict) -> List[dict]:
+    """Expand the plan's bet arrays into dicts keyed by BET_COLUMNS"""
+    return [dict(zip(BET_COLUMNS, row)) for row in plan["bets"]]
@@ -0,0 +1,166 @@
+"""
+Versioned cache of serialized responses for the hottest reads: event
+listings, event detail and the nonprofit list.
+
+Each body is stored with the content versions it was built from:
+- every event has a version, bumped whenever the odds cache reports a change
+  to it (a committed bet, a status change, settlement, a new event, or
+  another worker's change seen through odds_changes);
+- listings have one version, bumped with any event's;
+- nonprofits have one version, bumped by nonprofit writes. Events embed their
+  nonprofit, so it is part of every event version too.
+
+A hit whose versions are still current is returned as the stored bytes, with
+no query and no serialization. Its strong ETag is a hash of those bytes, so a
+poll sending If-None-Match gets a 304. A body rebuilt after an unrelated bump
+(or by another worker) keeps the same ETag when its content is unchanged.
+
+Nonprofit writes are only seen by the worker that made them, so entries also
+expire after RESPONSE_CACHE_TTL_SECONDS.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from .config import settings
+from .odds_cache import OddsCache, odds_cache
+
+
+class CachedResponse(NamedTuple):
+    versions: Tuple
+    body: bytes
+    etag: str
+    built_at: float  # time.monotonic()
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def render_json(content: Any) -> bytes:
+    """Same bytes FastAPI's JSONResponse would send"""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class ResponseCache:
+    """Thread-safe LRU of rendered responses, validated against content versions"""
+
+    def __init__(self, cache: Optional[OddsCache] = odds_cache, ttl_seconds: float = None,
+                 max_entries: int = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.RESPONSE_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._event_versions: Dict[int, int] = {}
+        self._listing_version = 0
+        self._nonprofit_version = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+        if cache is not None:
+            cache.add_listener(self.event_changed)
+
+    # Versions
+
+    def event_changed(self, sport_event_id: int):
+        """Called after commit for every event change; cheap, safe from any thread"""
+        with self._lock:
+            self._event_versions[sport_event_id] = self._event_versions.get(sport_event_id, 0) + 1
+            self._listing_version += 1
+
+    def nonprofits_changed(self):
+        with self._lock:
+            self._nonprofit_version += 1
+
+    def listing_versions(self) -> Tuple:
+        with self._lock:
+            return (self._listing_version, self._nonprofit_version)
+
+    def event_versions(self, sport_event_id: int) -> Tuple:
+        with self._lock:
+            return (self._event_versions.get(sport_event_id, 0), self._nonprofit_version)
+
+    def nonprofit_versions(self) -> Tuple:
+        with self._lock:
+            return (self._nonprofit_version,)
+
+    # Entries
+
+    def get(self, key: Hashable, versions: Tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is None or entry.versions != versions
+                    or time.monotonic() - entry.built_at >= self.ttl_seconds):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, versions: Tuple, content: Any) -> CachedResponse:
+        """
+        Render and store content built at the given versions.
+
+        Read the versions before building: a change committed while building
+        bumps them, so the stored entry is never served as current.
+        """
+        body = render_json(content)
+        entry = CachedResponse(versions, body, make_etag(body), time.monotonic())
+        if self.ttl_seconds > 0:
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, request: Request, key: Hashable, versions: Tuple, build: Callable[[], Any]) -> Response:
+        """The cached response for key, built with build() on a miss; 304 if the client's ETag matches"""
+        entry = self.get(key, versions)
+        if entry is None:
+            entry = self.put(key, versions, build())
+
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,267 @@
+"""
+In-process scheduler for periodic settlement, payout status and reconciliation jobs.
+
+Every app process starts a Scheduler thread, but only the one holding the
+scheduler lease (a row in scheduler_leases, renewed every tick and by a
+heartbeat thread while jobs run) runs jobs, so multi-worker uvicorn still
+settles each batch once. If the leader dies its lease expires and another
+worker takes over; a leader that fails to renew stops starting jobs.
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models, crud, betting_utils, batch_settlement
+from .config import settings
+from .database import SessionLocal
+from .transaction_service import BalanceReconciliationService
+
+LEASE_NAME = "scheduler"
+
+
+def acquire_lease(db: Session, name: str, holder: str, lease_seconds: float) -> bool:
+    """
+    Take or renew the named lease for holder. Commits.
+
+    Succeeds if the lease is free, expired or already held by holder; returns
+    False while another holder's lease is still valid.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=lease_seconds)
+
+    renewed = db.query(models.SchedulerLease).filter(
+        models.SchedulerLease.name == name,
+        or_(models.SchedulerLease.holder == holder, models.SchedulerLease.expires_at < now)
+    ).update({
+        models.SchedulerLease.holder: holder,
+        models.SchedulerLease.expires_at: expires_at
+    }, synchronize_session=False)
+    if renewed:
+        db.commit()
+        return True
+
+    try:
+        db.add(models.SchedulerLease(name=name, holder=holder, expires_at=expires_at))
+        db.commit()
+        return True
+    except IntegrityError:
+        # Someone else holds a valid lease
+        db.rollback()
+        return False
+
+
+def release_lease(db: Session, name: str, holder: str):
+    """Give up the named lease if holder has it. Commits."""
+    db.query(models.SchedulerLease).filter(
+        models.SchedulerLease.name == name,
+        models.SchedulerLease.holder == holder
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+class ScheduledJob:
+    """A periodic job and its run metrics"""
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[Session], Optional[dict]]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.next_run_at = 0.0  # monotonic time; due immediately
+
+        # Metrics
+        self.runs = 0
+        self.failures = 0
+        self.total_duration_ms = 0.0
+        self.last_duration_ms = None
+        self.last_started_at = None
+        self.last_result = None
+        self.last_error = None
+
+    def metrics(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_started_at": self.last_started_at.isoformat() + 'Z' if self.last_started_at else None,
+            "last_duration_ms": self.last_duration_ms,
+            "average_duration_ms": round(self.total_duration_ms / self.runs, 2) if self.runs else None,
+            "last_result": self.last_result,
+            "last_error": self.last_error
+        }
+
+
+class Scheduler:
+    """Runs due jobs on a background thread while this process holds the scheduler lease"""
+
+    def __init__(self, jobs: List[ScheduledJob], session_factory=SessionLocal,
+                 tick_seconds: float = None, lease_seconds: float = None, holder: str = None):
+        self.jobs = {job.name: job for job in jobs}
+        self.session_factory = session_factory
+        self.tick_seconds = tick_seconds if tick_seconds is not None else settings.SCHEDULER_TICK_SECONDS
+        self.lease_seconds = lease_seconds if lease_seconds is not None else settings.SCHEDULER_LEASE_SECONDS
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def tick(self) -> List[str]:
+        """Renew (or try to take) the lease and run every due job. Returns the names run."""
+        with self.session_factory() as db:
+            try:
+                self.is_leader = acquire_lease(db, LEASE_NAME, self.holder, self.lease_seconds)
+            except Exception as e:
+                print(f"Scheduler lease check failed: {str(e)}")
+                self.is_leader = False
+        if not self.is_leader:
+            return []
+        if all(time.monotonic() < job.next_run_at for job in self.jobs.values()):
+            return []
+
+        # Jobs can outlast the lease; keep renewing it while they run
+        stop_renewal = threading.Event()
+        lost = threading.Event()
+        renewal_thread = threading.Thread(
+            target=self._renew_lease, args=(stop_renewal, lost), name="zbet-scheduler-lease", daemon=True
+        )
+        renewal_thread.start()
+        ran = []
+        try:
+            for job in self.jobs.values():
+                if lost.is_set():
+                    print("Scheduler lost its lease; not starting further jobs")
+                    break
+                if time.monotonic() >= job.next_run_at:
+                    self.run_job(job.name)
+                    ran.append(job.name)
+        finally:
+            stop_renewal.set()
+            renewal_thread.join()
+        if lost.is_set():
+            self.is_leader = False
+        return ran
+
+    def _renew_lease(self, stop: threading.Event, lost: threading.Event):
+        """Renew the lease every third of its length until stop; set lost once it cannot be kept"""
+        renewed_at = time.monotonic()
+        while not stop.wait(self.lease_seconds / 3):
+            try:
+                with self.session_factory() as db:
+                    if not acquire_lease(db, LEASE_NAME, self.holder, self.lease_seconds):
+                        lost.set()
+                        return
+                renewed_at = time.monotonic()
+            except Exception as e:
+                print(f"Scheduler lease renewal failed: {str(e)}")
+                # Past its expiry another worker may already have taken it
+                if time.monotonic() - renewed_at >= self.lease_seconds:
+                    lost.set()
+                    return
+
+    def run_job(self, name: str) -> Optional[dict]:
+        """Run one job now in its own session, recording metrics"""
+        job = self.jobs[name]
+        job.last_started_at = datetime.utcnow()
+        started = time.perf_counter()
+        result = None
+        with self.session_factory() as db:
+            try:
+                result = job.func(db)
+                job.last_result = result
+                job.last_error = None
+            except Exception as e:
+                db.rollback()
+                job.failures += 1
+                job.last_error = str(e)
+                print(f"Scheduled job {name} failed: {str(e)}")
+
+        job.runs += 1
+        job.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        job.total_duration_ms += job.last_duration_ms
+        job.next_run_at = time.monotonic() + job.interval_seconds
+        return result
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Scheduler tick failed: {str(e)}")
+            self._stop.wait(self.tick_seconds)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="zbet-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.tick_seconds + 5)
+        if self.is_leader:
+            with self.session_factory() as db:
+                release_lease(db, LEASE_NAME, self.holder)
+            self.is_leader = False
+
+    def metrics(self) -> dict:
+        return {
+            "holder": self.holder,
+            "is_leader": self.is_leader,
+            "running": bool(self._thread and self._thread.is_alive()),
+            "jobs": {name: job.metrics() for name, job in self.jobs.items()}
+        }
+
+
+# Jobs
+
+def close_ended_events_job(db: Session) -> dict:
+    """Persist OPEN -> CLOSED for events past their end time"""
+    return {"events_closed": betting_utils.close_ended_events(db)}
+
+
+def settle_expired_events_job(db: Session) -> dict:
+    """Settle every event past its settlement deadline (consensus or PUSH)"""
+    expired_event_ids = [event.id for event in crud.get_expired_sport_events(db, betting_utils.get_est_now())]
+    db.rollback()
+    results = batch_settlement.settle_expired_events(expired_event_ids)
+    actions = {}
+    for result in results:
+        actions[result["action"]] = actions.get(result["action"], 0) + 1
+    return {"events": len(results), "actions": actions}
+
+
+def track_payout_status_job(db: Session) -> dict:
+    """Mark settled events whose payouts have all been sent as paid out"""
+    return {"events_marked_paid_out": betting_utils.mark_sent_events_paid_out(db)}
+
+
+def reconciliation_sweep_job(db: Session) -> dict:
+    """Incremental balance reconciliation over users whose balances changed"""
+    reconciliation = BalanceReconciliationService(db).run_incremental_reconciliation()
+    return {
+        "reconciliation_id": reconciliation.id,
+        "users_checked": reconciliation.total_users_checked,
+        "discrepancies_found": reconciliation.discrepancies_found
+    }
+
+
+def default_jobs() -> List[ScheduledJob]:
+    return [
+        ScheduledJob("close_ended_events", settings.SCHEDULER_LIFECYCLE_INTERVAL, close_ended_events_job),
+        ScheduledJob("settle_expired_events", settings.SCHEDULER_SETTLEMENT_INTERVAL, settle_expired_events_job),
+        ScheduledJob("track_payout_status", settings.SCHEDULER_PAYOUT_STATUS_INTERVAL, track_payout_status_job),
+        ScheduledJob("reconciliation_sweep", settings.SCHEDULER_RECONCILIATION_INTERVAL, reconciliation_sweep_job)
+    ]
+
+
+scheduler = Scheduler(default_jobs())
@@ -373,7 +373,8 @@ class TransactionHistoryRequest(BaseModel):
     """Schema for transaction history requests"""
     transaction_types: list[str] | None = None
     limit: int = 100
-    offset: int = 0
+    offset: int = 0  # Deprecated: use cursor
+    cursor: str | None = None  # next_cursor from the previous page
     start_date: str | None = None
     end_date: str | None = None
     
@@ -386,6 +387,7 @@ class TransactionHistoryResponse(BaseModel):
     transactions: list[TransactionResponse]
     total_count: int
     has_more: bool
+    next_cursor: str | None = None  # Pass as cursor to fetch the next page
     
     class Config:
         from_attributes = True
@@ -440,6 +442,7 @@ class BalanceReconciliationResponse(BaseModel):
     """Schema for balance reconciliation responses"""
     id: int
     reconciliation_date: str
+    reconciliation_type: str = "full"  # "full" or "incremental"
     total_users_checked: int
     discrepancies_found: int
     total_shielded_pool_blockchain: float
@@ -2,11 +2,13 @@
 Data serializers for transforming database models to API response formats.
 """
 
+from collections import defaultdict
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Optional
 
-from . import models, schemas
+from . import models, schemas, pari_mutuel, payout_plans
+from .odds_cache import odds_cache
 from .config import settings
 
 
@@ -29,52 +31,59 @@ def _calculate_potential_payout(bet: models.Bet, sport_event: models.SportEvent,
 
 
 def _calculate_pari_mutuel_payout(bet: models.Bet, sport_event: models.SportEvent, db: Session) -> float:
+    """Calculate estimated payout for a single pari-mutuel bet."""
+    return calculate_pari_mutuel_potential_payouts([bet], db).get(bet.id, bet.amount)
+
+
+def calculate_pari_mutuel_potential_payouts(bets: List[models.Bet], db: Session) -> Dict[int, float]:
     """
-    Calculate estimated payout for pari-mutuel betting.
-    
-    This calculation matches the authoritative settlement calculation in betting_utils.py
-    to ensure consistency between display and actual payouts.
-    """
-    pari_event = db.query(models.PariMutuelEvent).filter(
-        models.PariMutuelEvent.sport_event_id == sport_event.id
-    ).first()
-    
-    if not pari_event:
-        return bet.amount
+    Estimate payouts for many pari-mutuel bets at once, keyed by bet id.
     
-    # Find the pool for this bet's predicted outcome
-    pool = db.query(models.PariMutuelPool).filter(
-        models.PariMutuelPool.pari_mutuel_event_id == pari_event.id,
-        models.PariMutuelPool.outcome_name == bet.predicted_outcome
-    ).first()
+    Pools and fees come from the live odds cache (events it does not hold yet
+    are loaded together), and every event's estimates come from one
+    vectorized calculation:
+    Payout = Original Bet + (User's Bet / Winning Pool) × (Losing Pools - Fees)
     
-    if not pool or pool.pool_amount <= 0:
-        return bet.amount
-    
-    # Calculate total losing pools (all pools except this one)
-    losing_pool_gross = pari_event.total_pool - pool.pool_amount
-    
-    # Special case: No losing pool means no one bet against this outcome
-    # In this case, just return the bet amount without penalty (no fees)
-    if losing_pool_gross <= 0:
-        return bet.amount
-    
-    # Normal pari-mutuel formula (matches betting_utils._calculate_settlement_payout):
-    # Payout = Original Bet + (User's Bet / Winning Pool) × (Losing Pools - Fees)
-    # 
-    # Key: Fees are deducted from the losing pool FIRST (fees come "off the top"),
-    # not from individual user payouts.
-    
-    # Deduct fees from the losing pool (fees come off the top)
-    total_fee_percentage = pari_event.house_fee_percentage + pari_event.creator_fee_percentage + pari_event.validator_fee_percentage
-    losing_pool_after_fees = losing_pool_gross * (1 - total_fee_percentage)
+    Fees are deducted from the losing pool FIRST (fees come "off the top"),
+    not from individual user payouts.
+    """
+    bets_by_event = defaultdict(list)
+    for bet in bets:
+        bets_by_event[bet.sport_event_id].append(bet)
+    if not bets_by_event:
+        return {}
     
-    # User gets their bet back + proportional share of net losing money
-    user_share_ratio = bet.amount / pool.pool_amount
-    share_of_losing_money = losing_pool_after_fees * user_share_ratio
-    net_payout = bet.amount + share_of_losing_money
+    # Bets without a pari-mutuel event or a matching pool just get their stake back
+    potential_payouts = {bet.id: bet.amount for bet in bets}
+    for sport_event_id, odds in odds_cache.get_many(db, bets_by_event.keys()).items():
+        outcome_index = odds.outcome_index()
+        event_bets = [bet for bet in bets_by_event[sport_event_id] if bet.predicted_outcome in outcome_index]
+        if not event_bets:
+            continue
+        
+        estimates = pari_mutuel.estimate_potential_payouts(
+            amounts=[bet.amount for bet in event_bets],
+            outcome_indices=[outcome_index[bet.predicted_outcome] for bet in event_bets],
+            pool_amounts=odds.pool_amounts(),
+            fees=odds.display_fees
+        )
+        potential_payouts.update(zip((bet.id for bet in event_bets), estimates.tolist()))
     
-    return net_payout
+    return potential_payouts
+
+
+def calculate_potential_payouts(bets: List[models.Bet], db: Session) -> Dict[int, float]:
+    """Calculate potential payouts for a list of bets, batching the pari-mutuel ones"""
+    pari_mutuel_bets = [
+        bet for bet in bets
+        if not (bet.outcome is not None and bet.payout_amount is not None)
+        and bet.sport_event.betting_system_type == models.BettingSystemType.PARI_MUTUEL
+    ]
+    potential_payouts = calculate_pari_mutuel_potential_payouts(pari_mutuel_bets, db)
+    for bet in bets:
+        if bet.id not in potential_payouts:
+            potential_payouts[bet.id] = _calculate_potential_payout(bet, bet.sport_event, db)
+    return potential_payouts
 
 
 def _calculate_fixed_odds_payout(bet: models.Bet, sport_event: models.SportEvent, db: Session) -> float:
@@ -112,8 +121,31 @@ def _calculate_spread_payout(bet: models.Bet, sport_event: models.SportEvent, db
     return bet.amount * 1.9
 
 
-def transform_bet_to_response(bet: models.Bet, db: Session) -> schemas.BetResponse:
-    """Transform a database bet to a BetResponse matching the frontend interface"""
+def serialize_sport_events(events: List[models.SportEvent], db: Session) -> List[schemas.SportEventResponse]:
+    """
+    Serialize a page of events with a constant number of queries.
+    
+    Odds for every pari-mutuel event come from one odds_cache.get_many call
+    (events it does not hold yet are loaded together); load the events with
+    their nonprofits (see crud.get_sport_events) so to_dict issues no queries.
+    """
+    odds_by_event = odds_cache.get_many(db, [
+        event.id for event in events if event.betting_system_type == models.BettingSystemType.PARI_MUTUEL
+    ])
+    return [
+        schemas.SportEventResponse(**event.to_dict(db, odds_by_event=odds_by_event))
+        for event in events
+    ]
+
+
+def transform_bet_to_response(bet: models.Bet, db: Session,
+                              potential_payout: Optional[float] = None) -> schemas.BetResponse:
+    """
+    Transform a database bet to a BetResponse matching the frontend interface.
+    
+    Pass potential_payout when it was already calculated in a batch
+    (see calculate_potential_payouts) to skip the per-bet calculation.
+    """
     # Get the sport event for this bet
     sport_event = bet.sport_event
     if not sport_event:
@@ -135,7 +167,8 @@ def transform_bet_to_response(bet: models.Bet, db: Session) -> schemas.BetRespon
         status = "pending"
     
     # Calculate potential payout based on betting system
-    potential_payout = _calculate_potential_payout(bet, sport_event, db)
+    if potential_payout is None:
+        potential_payout = _calculate_potential_payout(bet, sport_event, db)
     
     # Format dates to ISO string
     placed_at = bet.bet_placed_at.isoformat() + 'Z'
@@ -161,81 +194,59 @@ def transform_bet_to_response(bet: models.Bet, db: Session) -> schemas.BetRespon
     )
 
 
-def serialize_event_payout_details(sport_event: models.SportEvent, pari_event: models.PariMutuelEvent, 
-                                 payouts: List[models.Payout], bets: List[models.Bet]) -> dict:
+def serialize_event_payout_details(sport_event: models.SportEvent, plan: dict) -> dict:
     """
-    Serialize payout details for a settled event using existing database records.
+    Serialize payout details for a settled event from its stored payout plan.
     """
     
     # Format bet data
     bet_data = []
-    for bet in bets:
-        outcome = bet.outcome.value if bet.outcome else "LOSS"
+    for bet in payout_plans.bet_rows(plan):
         bet_data.append({
-            "id": bet.id,
-            "user_id": bet.user_id,
-            "amount": bet.amount,
-            "predicted_outcome": bet.predicted_outcome,
-            "outcome": outcome,
-            "payout_amount": bet.payout_amount if bet.payout_amount else 0.0,
+            "id": bet["id"],
+            "user_id": bet["user_id"],
+            "amount": bet["amount"],
+            "predicted_outcome": bet["predicted_outcome"],
+            "outcome": bet["outcome"] or "LOSS",
+            "payout_amount": bet["payout_amount"] if bet["payout_amount"] else 0.0,
             "user": {
-                "username": bet.user.username,
-                "zcash_address": bet.user.zcash_address
+                "username": bet["username"],
+                "zcash_address": bet["zcash_address"]
             }
         })
     
     # Format payout records with user information for validators
     payout_records = []
-    for payout in payouts:
+    for payout in payout_plans.payout_rows(plan):
         payout_record = {
-            "user_id": payout.user_id,
-            "bet_id": payout.bet_id,
-            "payout_amount": payout.payout_amount,
-            "payout_type": payout.payout_type,
-            "recipient_address": payout.recipient_address
+            "user_id": payout["user_id"],
+            "bet_id": payout["bet_id"],
+            "payout_amount": payout["payout_amount"],
+            "payout_type": payout["payout_type"],
+            "recipient_address": payout["recipient_address"]
         }
         
         # Add user information for validator payouts
-        if payout.payout_type == "validator_fee" and payout.user:
+        if payout["payout_type"] == "validator_fee" and payout["username"]:
             payout_record["user"] = {
-                "username": payout.user.username,
-                "zcash_address": payout.user.zcash_address
+                "username": payout["username"],
+                "zcash_address": payout["zcash_address"]
             }
         
         payout_records.append(payout_record)
     
-    # Calculate pool breakdown
-    winning_pool_amount = 0
-    if pari_event and pari_event.winning_outcome:
-        from sqlalchemy import func
-        # Import here to avoid circular imports
-        from .database import SessionLocal
-        
-        # Use a temporary session to avoid session issues
-        with SessionLocal() as temp_db:
-            winning_pool = temp_db.query(models.PariMutuelPool).filter(
-                models.PariMutuelPool.pari_mutuel_event_id == pari_event.id,
-                models.PariMutuelPool.outcome_name == pari_event.winning_outcome
-            ).first()
-            if winning_pool:
-                winning_pool_amount = winning_pool.pool_amount
-    
-    total_pool_amount = pari_event.total_pool if pari_event else 0
-    losing_pool_amount = total_pool_amount - winning_pool_amount
-    
-    # Calculate fees from payout records
-    house_fee = sum(p.payout_amount for p in payouts if p.payout_type == "house_fee")
-    creator_fee = sum(p.payout_amount for p in payouts if p.payout_type == "creator_fee")
-    validator_fee = sum(p.payout_amount for p in payouts if p.payout_type == "validator_fee")
+    house_fee = plan["fees"]["house_fee"]
+    creator_fee = plan["fees"]["creator_fee"]
+    validator_fee = plan["fees"]["validator_fee"]
     total_fees = house_fee + creator_fee + validator_fee
     
     return {
         "event_id": sport_event.id,
         "event_title": sport_event.title,
-        "winning_outcome": pari_event.winning_outcome if pari_event else None,
-        "total_pool_amount": total_pool_amount,
-        "winning_pool_amount": winning_pool_amount,
-        "losing_pool_amount": losing_pool_amount,
+        "winning_outcome": plan["winning_outcome"],
+        "total_pool_amount": plan["total_pool_amount"],
+        "winning_pool_amount": plan["winning_pool_amount"],
+        "losing_pool_amount": plan["losing_pool_amount"],
         "total_fees": total_fees,
         "house_fee": house_fee,
         "creator_fee": creator_fee,
@@ -254,9 +265,5 @@ def serialize_event_payout_details(sport_event: models.SportEvent, pari_event: m
             "username": sport_event.creator.username,
             "zcash_address": sport_event.creator.zcash_address
         },
-        "fee_percentages": {
-            "house_fee_percentage": pari_event.house_fee_percentage if pari_event else 0,
-            "creator_fee_percentage": pari_event.creator_fee_percentage if pari_event else 0,
-            "validator_fee_percentage": pari_event.validator_fee_percentage if pari_event else 0
-        }
+        "fee_percentages": plan["fee_percentages"]
     }
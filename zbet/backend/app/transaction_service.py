@@ -5,18 +5,46 @@ This service handles all user transaction tracking, balance management,
 and reconciliation for both shielded and transparent Zcash pools.
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy import create_engine, func, and_, or_, tuple_, insert, update, bindparam
+from sqlalchemy.engine import make_url
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
+import base64
+import csv
+import enum
+import io
 import json
 import logging
+import os
 
 from . import models, schemas
+from .database import SessionLocal
 from .zcash_mod import zcash_wallet, zcash_utils
 
 logger = logging.getLogger(__name__)
 
+# Balances that differ by more than one zatoshi are reported as discrepancies
+BALANCE_TOLERANCE = 0.00000001
+
+
+def encode_transaction_cursor(transaction: models.UserTransaction) -> str:
+    """Encode a transaction's (created_at, id) position as an opaque pagination cursor"""
+    payload = json.dumps({"created_at": transaction.created_at.isoformat(), "id": transaction.id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_transaction_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a pagination cursor; raises ValueError if it is malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(payload["created_at"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor}") from e
+
 
 class TransactionService:
     """Service for managing user transactions and balances"""
@@ -75,23 +103,13 @@ class TransactionService:
         transparent_before = user.transparent_balance
         
         # Determine which pool this transaction affects
-        shielded_delta = 0.0
-        transparent_delta = 0.0
-        
-        # Special handling for SHIELD transactions (moves funds between pools)
-        if transaction_type == models.TransactionType.SHIELD:
-            # Shield transactions move funds from transparent to shielded
-            # The amount is what gets shielded, but we also need to account for network fee
-            transparent_delta = -(amount + network_fee)  # Debit transparent pool (amount + fee)
-            shielded_delta = amount                       # Credit shielded pool (only the amount)
-        # Logic to determine pool based on transaction type and addresses
-        elif self._affects_shielded_pool(transaction_type, from_address_type, to_address_type):
-            shielded_delta = amount
-        else:
-            transparent_delta = amount
+        shielded_delta, transparent_delta = self._balance_deltas(
+            transaction_type, amount, from_address_type, to_address_type, network_fee
+        )
         
         # Update user balances
         user.update_balances(shielded_delta=shielded_delta, transparent_delta=transparent_delta)
+        user.transaction_count = (user.transaction_count or 0) + 1
         
         # Create transaction record
         transaction = models.UserTransaction(
@@ -127,6 +145,27 @@ class TransactionService:
         
         return transaction
     
+    def _balance_deltas(
+        self,
+        transaction_type: models.TransactionType,
+        amount: float,
+        from_address_type: models.AddressType = None,
+        to_address_type: models.AddressType = None,
+        network_fee: float = 0.0
+    ) -> Tuple[float, float]:
+        """Return the (shielded, transparent) balance deltas for a transaction"""
+        
+        # Special handling for SHIELD transactions (moves funds between pools)
+        if transaction_type == models.TransactionType.SHIELD:
+            # Shield transactions move funds from transparent to shielded
+            # The amount is what gets shielded, but we also need to account for network fee
+            return amount, -(amount + network_fee)  # Credit shielded (amount), debit transparent (amount + fee)
+        
+        # Logic to determine pool based on transaction type and addresses
+        if self._affects_shielded_pool(transaction_type, from_address_type, to_address_type):
+            return amount, 0.0
+        return 0.0, amount
+    
     def _affects_shielded_pool(
         self,
         transaction_type: models.TransactionType,
@@ -277,6 +316,83 @@ class TransactionService:
     ) -> List[models.UserTransaction]:
         """Get user transaction history with filtering"""
         
+        query = self._user_transactions_query(user_id, transaction_types, start_date, end_date)
+        
+        return query.order_by(
+            models.UserTransaction.created_at.desc(),
+            models.UserTransaction.id.desc()
+        ).offset(offset).limit(limit).all()
+    
+    def get_user_transactions_page(
+        self,
+        user_id: int,
+        transaction_types: List[models.TransactionType] = None,
+        limit: int = 100,
+        cursor: str = None,
+        start_date: datetime = None,
+        end_date: datetime = None
+    ) -> Tuple[List[models.UserTransaction], Optional[str]]:
+        """
+        Get one page of user transaction history using keyset pagination.
+        
+        Pages are ordered newest first on (created_at, id) and continue strictly after
+        the cursor, so deep pages cost the same as the first one with the
+        (user_id, created_at, id) index.
+        
+        Returns:
+            Tuple of (transactions, next_cursor); next_cursor is None on the last page
+        """
+        
+        query = self._user_transactions_query(user_id, transaction_types, start_date, end_date)
+        
+        if cursor:
+            cursor_created_at, cursor_id = decode_transaction_cursor(cursor)
+            # Row-value comparison lets the index seek straight to the cursor position
+            query = query.filter(
+                tuple_(models.UserTransaction.created_at, models.UserTransaction.id) <
+                tuple_(cursor_created_at, cursor_id)
+            )
+        
+        # Fetch one extra row to know whether there is another page
+        transactions = query.order_by(
+            models.UserTransaction.created_at.desc(),
+            models.UserTransaction.id.desc()
+        ).limit(limit + 1).all()
+        
+        if len(transactions) <= limit:
+            return transactions, None
+        
+        transactions = transactions[:limit]
+        return transactions, encode_transaction_cursor(transactions[-1])
+    
+    def count_user_transactions(
+        self,
+        user_id: int,
+        transaction_types: List[models.TransactionType] = None,
+        start_date: datetime = None,
+        end_date: datetime = None
+    ) -> int:
+        """
+        Count a user's transactions.
+        
+        Unfiltered counts come from the users.transaction_count counter; filtered
+        counts fall back to an index-backed COUNT.
+        """
+        
+        if not transaction_types and not start_date and not end_date:
+            count = self.db.query(models.User.transaction_count).filter(models.User.id == user_id).scalar()
+            return count or 0
+        
+        query = self._user_transactions_query(user_id, transaction_types, start_date, end_date)
+        return query.with_entities(func.count(models.UserTransaction.id)).scalar()
+    
+    def _user_transactions_query(
+        self,
+        user_id: int,
+        transaction_types: List[models.TransactionType] = None,
+        start_date: datetime = None,
+        end_date: datetime = None
+    ):
         query = self.db.query(models.UserTransaction).filter(
             models.UserTransaction.user_id == user_id
         )
@@ -290,7 +406,7 @@ class TransactionService:
         if end_date:
             query = query.filter(models.UserTransaction.created_at <= end_date)
         
-        return query.order_by(models.UserTransaction.created_at.desc()).offset(offset).limit(limit).all()
+        return query
     
     def get_user_balance_summary(self, user_id: int) -> Dict:
         """Get comprehensive user balance summary"""
@@ -467,6 +583,276 @@ class TransactionService:
         return transaction
 
 
+class LedgerWriter:
+    """
+    Write-behind buffer for ledger rows within one unit of work.
+    
+    Rows queued with add() are written on flush() with one bulk INSERT per batch
+    instead of an INSERT and commit per row. Balance before/after values are
+    computed at flush time by applying the queued rows in order to each user's
+    balances, exactly as create_transaction would one by one. Nothing is
+    committed until commit() (or leaving the context manager without an error).
+    
+    Usage:
+        with LedgerWriter(db) as ledger:
+            for payout in payouts:
+                ledger.add(user_id=..., transaction_type=..., amount=...)
+    """
+    
+    def __init__(self, db: Session, batch_size: int = 5000):
+        self.db = db
+        self.batch_size = batch_size
+        self._service = TransactionService(db)
+        self._pending = []
+        self.rows_written = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self._pending.clear()
+            self.db.rollback()
+        return False
+    
+    def add(
+        self,
+        user_id: int,
+        transaction_type: models.TransactionType,
+        amount: float,
+        description: str = None,
+        sport_event_id: int = None,
+        bet_id: int = None,
+        payout_id: int = None,
+        from_address: str = None,
+        to_address: str = None,
+        from_address_type: models.AddressType = None,
+        to_address_type: models.AddressType = None,
+        zcash_transaction_id: str = None,
+        operation_id: str = None,
+        metadata: Dict = None,
+        network_fee: float = 0.0,
+        confirmed: bool = False
+    ) -> None:
+        """Queue a ledger row (same arguments as TransactionService.create_transaction)"""
+        self._pending.append({
+            "user_id": user_id,
+            "sport_event_id": sport_event_id,
+            "bet_id": bet_id,
+            "payout_id": payout_id,
+            "transaction_type": transaction_type,
+            "amount": amount,
+            "from_address": from_address,
+            "to_address": to_address,
+            "from_address_type": from_address_type,
+            "to_address_type": to_address_type,
+            "zcash_transaction_id": zcash_transaction_id,
+            "operation_id": operation_id,
+            "description": description,
+            "transaction_metadata": json.dumps(metadata) if metadata else None,
+            "network_fee": network_fee,
+            "confirmed": confirmed,
+        })
+        
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+    
+    def flush(self) -> int:
+        """Write queued rows and balance updates to the session without committing"""
+        if not self._pending:
+            return 0
+        
+        pending, self._pending = self._pending, []
+        
+        # Apply outstanding ORM changes first so balances are read as they currently stand
+        self.db.flush()
+        
+        user_ids = {row["user_id"] for row in pending}
+        balances = {
+            user_id: [shielded, transparent, version, count or 0]
+            for user_id, shielded, transparent, version, count in self.db.query(
+                models.User.id,
+                models.User.shielded_balance,
+                models.User.transparent_balance,
+                models.User.balance_version,
+                models.User.transaction_count
+            ).filter(models.User.id.in_(user_ids))
+        }
+        missing = user_ids - balances.keys()
+        if missing:
+            raise ValueError(f"Users not found: {sorted(missing)}")
+        
+        now = datetime.utcnow()
+        rows = []
+        for row in pending:
+            balance = balances[row["user_id"]]
+            shielded_delta, transparent_delta = self._service._balance_deltas(
+                row["transaction_type"], row["amount"],
+                row["from_address_type"], row["to_address_type"], row["network_fee"]
+            )
+            
+            shielded_before, transparent_before = balance[0], balance[1]
+            balance[0] += shielded_delta
+            balance[1] += transparent_delta
+            balance[2] += 1
+            balance[3] += 1
+            
+            confirmed = row.pop("confirmed")
+            row.update(
+                shielded_balance_before=shielded_before,
+                transparent_balance_before=transparent_before,
+                shielded_balance_after=balance[0],
+                transparent_balance_after=balance[1],
+                status=models.TransactionStatus.CONFIRMED if confirmed else models.TransactionStatus.PENDING,
+                confirmed_at=now if confirmed else None,
+                confirmations=1 if confirmed else 0,
+                created_at=now
+            )
+            rows.append(row)
+        
+        # One executemany for the ledger rows and one for the user balances
+        self.db.execute(insert(models.UserTransaction.__table__), rows)
+        self.db.execute(
+            update(models.User.__table__)
+            .where(models.User.__table__.c.id == bindparam("b_user_id"))
+            .values(
+                shielded_balance=bindparam("b_shielded"),
+                transparent_balance=bindparam("b_transparent"),
+                balance_version=bindparam("b_version"),
+                transaction_count=bindparam("b_count"),
+                last_balance_update=now
+            ),
+            [
+                {"b_user_id": user_id, "b_shielded": shielded, "b_transparent": transparent,
+                 "b_version": version, "b_count": count}
+                for user_id, (shielded, transparent, version, count) in balances.items()
+            ]
+        )
+        
+        # Keep User objects already loaded in the session in step with the new balances
+        for user_id, (shielded, transparent, version, count) in balances.items():
+            user = self.db.identity_map.get(identity_key(models.User, user_id))
+            if user is not None:
+                set_committed_value(user, "shielded_balance", shielded)
+                set_committed_value(user, "transparent_balance", transparent)
+                set_committed_value(user, "balance_version", version)
+                set_committed_value(user, "transaction_count", count)
+                set_committed_value(user, "last_balance_update", now)
+        
+        self.rows_written += len(rows)
+        logger.info(f"Ledger writer flushed {len(rows)} transactions for {len(balances)} users")
+        
+        return len(rows)
+    
+    def commit(self) -> int:
+        """Flush queued rows and commit the unit of work; returns rows written so far"""
+        self.flush()
+        self.db.commit()
+        return self.rows_written
+
+
+# Columns written by the ledger export, in output order
+LEDGER_EXPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "transaction_type",
+    "amount",
+    "status",
+    "created_at",
+    "confirmed_at",
+    "from_address",
+    "to_address",
+    "from_address_type",
+    "to_address_type",
+    "shielded_balance_before",
+    "transparent_balance_before",
+    "shielded_balance_after",
+    "transparent_balance_after",
+    "zcash_transaction_id",
+    "operation_id",
+    "block_height",
+    "confirmations",
+    "network_fee",
+    "sport_event_id",
+    "bet_id",
+    "payout_id",
+    "description",
+)
+
+LEDGER_EXPORT_FORMATS = ("ndjson", "csv")
+
+
+def _export_value(value):
+    """Format a ledger column value the same way the transaction API does"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat() + 'Z'
+    return value
+
+
+def stream_ledger_export(
+    export_format: str,
+    user_id: int = None,
+    batch_size: int = 1000,
+    session_factory=SessionLocal
+):
+    """
+    Generate a ledger export as NDJSON or CSV text chunks, one chunk per batch.
+    
+    Rows are read with yield_per so only one batch is held in memory at a time,
+    whatever the size of the ledger. The generator owns its session because it
+    outlives the request-scoped one when used in a StreamingResponse.
+    
+    Args:
+        export_format: "ndjson" or "csv"
+        user_id: Only export this user's transactions (None exports everyone)
+        batch_size: Rows fetched and written per chunk
+        session_factory: Session factory to read from
+    """
+    if export_format not in LEDGER_EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    
+    db = session_factory()
+    try:
+        query = db.query(
+            *(getattr(models.UserTransaction, column) for column in LEDGER_EXPORT_COLUMNS)
+        )
+        if user_id is not None:
+            query = query.filter(models.UserTransaction.user_id == user_id)
+        
+        result = db.execute(
+            query.order_by(models.UserTransaction.id).statement,
+            execution_options={"yield_per": batch_size}
+        )
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if export_format == "csv" else None
+        if writer:
+            writer.writerow(LEDGER_EXPORT_COLUMNS)
+        
+        for batch in result.partitions():
+            for row in batch:
+                values = [_export_value(value) for value in row]
+                if writer:
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(LEDGER_EXPORT_COLUMNS, values))))
+                    buffer.write("\n")
+            
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        
+        # Header-only CSV for an empty ledger
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
 class BalanceReconciliationService:
     """Service for balance reconciliation and auditing"""
     
@@ -478,43 +864,214 @@ class BalanceReconciliationService:
         
         logger.info("Starting full balance reconciliation")
         
+        # Get all active users
+        users = self.db.query(models.User).filter(models.User.is_active == True).all()
+        
+        return self._run_reconciliation(users, reconciliation_type="full")
+    
+    def run_incremental_reconciliation(self) -> models.BalanceReconciliation:
+        """
+        Reconcile only users whose balance changed since their last reconciliation.
+        
+        A user is considered dirty when their current balance_version differs from the
+        version recorded at their last clean reconciliation. Users whose last check found
+        a discrepancy keep a NULL reconciled version, so they are re-checked every run
+        until they come back clean.
+        """
+        
+        logger.info("Starting incremental balance reconciliation")
+        
+        users = self.db.query(models.User).filter(
+            models.User.is_active == True,
+            or_(
+                models.User.reconciled_balance_version.is_(None),
+                models.User.reconciled_balance_version != models.User.balance_version
+            )
+        ).all()
+        
+        return self._run_reconciliation(users, reconciliation_type="incremental")
+    
+    def run_sharded_reconciliation(
+        self,
+        max_workers: int = None,
+        shards_per_worker: int = 4
+    ) -> models.BalanceReconciliation:
+        """
+        Run a full reconciliation split into user id ranges across a process pool.
+        
+        Each shard opens its own session on a read-only connection, computes ledger
+        balances for its users with one grouped query and returns plain rows. Results
+        are written into the reconciliation tables as each shard completes, and the
+        per-shard totals are merged into the BalanceReconciliation record.
+        
+        In-memory SQLite databases cannot be shared with child processes, so they
+        (and max_workers=1) run the same shards inline on this session.
+        """
+        
+        max_workers = max_workers or os.cpu_count() or 1
+        database_url = self.db.get_bind().url
+        run_inline = max_workers <= 1 or (
+            database_url.get_backend_name() == "sqlite" and database_url.database in (None, "", ":memory:")
+        )
+        
+        logger.info(f"Starting sharded balance reconciliation with {1 if run_inline else max_workers} worker(s)")
+        
+        reconciliation = models.BalanceReconciliation(
+            reconciliation_date=datetime.utcnow(),
+            reconciliation_type="full",
+            reconciliation_status="partial"
+        )
+        self.db.add(reconciliation)
+        self.db.commit()
+        
+        min_id, max_id = self.db.query(
+            func.min(models.User.id), func.max(models.User.id)
+        ).filter(models.User.is_active == True).one()
+        
+        shards = []
+        if min_id is not None:
+            shard_count = max(1, (1 if run_inline else max_workers) * shards_per_worker)
+            shard_size = max(1, -(-(max_id - min_id + 1) // shard_count))  # ceil division
+            shards = [
+                (start_id, min(start_id + shard_size - 1, max_id))
+                for start_id in range(min_id, max_id + 1, shard_size)
+            ]
+        
+        try:
+            if run_inline:
+                shard_results = (_reconcile_user_shard(self.db, start_id, end_id) for start_id, end_id in shards)
+                self._merge_shard_results(reconciliation, shard_results)
+            else:
+                url_string = database_url.render_as_string(hide_password=False)
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    futures = [
+                        executor.submit(_run_user_shard, url_string, start_id, end_id)
+                        for start_id, end_id in shards
+                    ]
+                    self._merge_shard_results(reconciliation, (future.result() for future in as_completed(futures)))
+        except Exception as e:
+            self.db.rollback()
+            reconciliation.reconciliation_status = "failed"
+            reconciliation.notes = f"Sharded reconciliation failed: {str(e)}"
+            self.db.commit()
+            raise
+        
+        reconciliation.reconciliation_status = "completed"
+        reconciliation.notes = f"Sharded across {len(shards)} user id ranges"
+        self.db.commit()
+        
+        logger.info(f"Sharded reconciliation completed. Users checked: {reconciliation.total_users_checked}, "
+                   f"Discrepancies found: {reconciliation.discrepancies_found}")
+        
+        return reconciliation
+    
+    def _merge_shard_results(self, reconciliation: models.BalanceReconciliation, shard_results) -> None:
+        """Stream shard rows into the reconciliation tables and accumulate the totals"""
+        
+        reconciliation.total_users_checked = 0
+        reconciliation.discrepancies_found = 0
+        reconciliation.total_shielded_pool_database = 0.0
+        reconciliation.total_transparent_pool_database = 0.0
+        
+        for shard in shard_results:
+            rows = shard["rows"]
+            if rows:
+                for row in rows:
+                    row["reconciliation_id"] = reconciliation.id
+                self.db.execute(insert(models.UserBalanceReconciliation), rows)
+                self.db.execute(
+                    update(models.User.__table__)
+                    .where(models.User.__table__.c.id == bindparam("b_user_id"))
+                    .values(reconciled_balance_version=bindparam("b_version")),
+                    [
+                        {
+                            "b_user_id": row["user_id"],
+                            "b_version": None if row["has_discrepancy"] else row["balance_version"]
+                        }
+                        for row in rows
+                    ]
+                )
+            
+            reconciliation.total_users_checked += len(rows)
+            reconciliation.discrepancies_found += shard["discrepancies_found"]
+            reconciliation.total_shielded_pool_database += shard["total_shielded"]
+            reconciliation.total_transparent_pool_database += shard["total_transparent"]
+            
+            # Commit per shard so the write lock is only held briefly while other shards read
+            self.db.commit()
+        
+        self._set_blockchain_pool_totals(reconciliation)
+    
+    def _set_blockchain_pool_totals(self, reconciliation: models.BalanceReconciliation) -> None:
+        """
+        Fill in node-side pool totals from account-level wallet balances.
+        
+        Falls back to the database totals when the node is disabled (dev mode).
+        """
+        accounts = [
+            int(account) for (account,) in self.db.query(models.User.zcash_account).filter(
+                models.User.is_active == True,
+                models.User.zcash_account.isnot(None)
+            ).distinct()
+            if str(account).isdigit()
+        ]
+        
+        chain_totals = zcash_wallet.get_wallet_pool_totals(accounts)
+        if chain_totals is None:
+            reconciliation.total_shielded_pool_blockchain = reconciliation.total_shielded_pool_database
+            reconciliation.total_transparent_pool_blockchain = reconciliation.total_transparent_pool_database
+            return
+        
+        reconciliation.total_shielded_pool_blockchain = chain_totals["shielded_total"]
+        reconciliation.total_transparent_pool_blockchain = chain_totals["transparent_total"]
+        
+        shielded_gap = reconciliation.total_shielded_pool_database - chain_totals["shielded_total"]
+        transparent_gap = reconciliation.total_transparent_pool_database - chain_totals["transparent_total"]
+        if abs(shielded_gap) > BALANCE_TOLERANCE or abs(transparent_gap) > BALANCE_TOLERANCE:
+            logger.warning(f"Pool totals differ from node at height {chain_totals['block_height']}: "
+                          f"Shielded: {shielded_gap}, Transparent: {transparent_gap}")
+    
+    def _run_reconciliation(
+        self,
+        users: List[models.User],
+        reconciliation_type: str
+    ) -> models.BalanceReconciliation:
+        """Reconcile the given users and record the run"""
+        
         # Create reconciliation record
         reconciliation = models.BalanceReconciliation(
-            reconciliation_date=datetime.utcnow()
+            reconciliation_date=datetime.utcnow(),
+            reconciliation_type=reconciliation_type
         )
         self.db.add(reconciliation)
         self.db.flush()  # Get ID
         
-        # Get all active users
-        users = self.db.query(models.User).filter(models.User.is_active == True).all()
         reconciliation.total_users_checked = len(users)
         
         discrepancies_found = 0
-        total_shielded_db = 0.0
-        total_transparent_db = 0.0
         
         for user in users:
             user_reconciliation = self._reconcile_user_balance(user, reconciliation.id)
             
             if user_reconciliation.has_discrepancy:
                 discrepancies_found += 1
-            
-            total_shielded_db += user.shielded_balance
-            total_transparent_db += user.transparent_balance
         
-        # Get blockchain totals (in production, this would query the actual blockchain)
-        # For now, we'll use the database totals as a baseline
+        # Pool totals always cover every active user, even when only a subset was checked
+        total_shielded_db, total_transparent_db = self.db.query(
+            func.coalesce(func.sum(models.User.shielded_balance), 0.0),
+            func.coalesce(func.sum(models.User.transparent_balance), 0.0)
+        ).filter(models.User.is_active == True).one()
+        
         reconciliation.total_shielded_pool_database = total_shielded_db
         reconciliation.total_transparent_pool_database = total_transparent_db
-        reconciliation.total_shielded_pool_blockchain = total_shielded_db  # TODO: Get from blockchain
-        reconciliation.total_transparent_pool_blockchain = total_transparent_db  # TODO: Get from blockchain
+        self._set_blockchain_pool_totals(reconciliation)
         
         reconciliation.discrepancies_found = discrepancies_found
         reconciliation.reconciliation_status = "completed"
         
         self.db.commit()
         
-        logger.info(f"Reconciliation completed. Users checked: {reconciliation.total_users_checked}, "
+        logger.info(f"Reconciliation ({reconciliation_type}) completed. Users checked: {reconciliation.total_users_checked}, "
                    f"Discrepancies found: {discrepancies_found}")
         
         return reconciliation
@@ -533,6 +1090,7 @@ class BalanceReconciliationService:
         user_reconciliation = models.UserBalanceReconciliation(
             reconciliation_id=reconciliation_id,
             user_id=user.id,
+            balance_version=user.balance_version,
             database_shielded_balance=user.shielded_balance,
             database_transparent_balance=user.transparent_balance,
             calculated_shielded_balance=calculated_balances['shielded'],
@@ -547,14 +1105,16 @@ class BalanceReconciliationService:
         user_reconciliation.transparent_discrepancy = transparent_discrepancy
         
         # Check for significant discrepancies (more than 0.00000001 ZEC)
-        tolerance = 0.00000001
         has_discrepancy = (
-            abs(shielded_discrepancy) > tolerance or
-            abs(transparent_discrepancy) > tolerance
+            abs(shielded_discrepancy) > BALANCE_TOLERANCE or
+            abs(transparent_discrepancy) > BALANCE_TOLERANCE
         )
         
         user_reconciliation.has_discrepancy = has_discrepancy
         
+        # Only a clean check marks this balance version as reconciled
+        user.reconciled_balance_version = None if has_discrepancy else user.balance_version
+        
         if has_discrepancy:
             logger.warning(f"Balance discrepancy found for user {user.id}: "
                           f"Shielded: {shielded_discrepancy}, Transparent: {transparent_discrepancy}")
@@ -588,8 +1148,8 @@ class BalanceReconciliationService:
             'transparent': transparent_balance
         }
     
+    @staticmethod
     def _affects_shielded_pool(
-        self,
         transaction_type: models.TransactionType,
         from_address_type: models.AddressType = None,
         to_address_type: models.AddressType = None
@@ -616,3 +1176,105 @@ class BalanceReconciliationService:
         }
         
         return transaction_type in shielded_transaction_types
+
+
+def _read_only_database_url(database_url: str) -> str:
+    """Open SQLite files in read-only mode; other backends are used as-is"""
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite":
+        return database_url
+    return f"sqlite:///file:{url.database}?mode=ro&uri=true"
+
+
+def _reconcile_user_shard(db: Session, start_id: int, end_id: int) -> Dict:
+    """
+    Reconcile every active user with an id in [start_id, end_id].
+    
+    Ledger balances are computed with a single grouped query over the shard
+    instead of loading each user's transaction history.
+    """
+    users = db.query(
+        models.User.id,
+        models.User.balance_version,
+        models.User.shielded_balance,
+        models.User.transparent_balance
+    ).filter(
+        models.User.is_active == True,
+        models.User.id >= start_id,
+        models.User.id <= end_id
+    ).all()
+    
+    ledger_sums = db.query(
+        models.UserTransaction.user_id,
+        models.UserTransaction.transaction_type,
+        models.UserTransaction.from_address_type,
+        models.UserTransaction.to_address_type,
+        func.sum(models.UserTransaction.amount)
+    ).filter(
+        models.UserTransaction.status == models.TransactionStatus.CONFIRMED,
+        models.UserTransaction.user_id >= start_id,
+        models.UserTransaction.user_id <= end_id
+    ).group_by(
+        models.UserTransaction.user_id,
+        models.UserTransaction.transaction_type,
+        models.UserTransaction.from_address_type,
+        models.UserTransaction.to_address_type
+    ).all()
+    
+    calculated = {}
+    for user_id, transaction_type, from_address_type, to_address_type, amount in ledger_sums:
+        balances = calculated.setdefault(user_id, {'shielded': 0.0, 'transparent': 0.0})
+        if BalanceReconciliationService._affects_shielded_pool(transaction_type, from_address_type, to_address_type):
+            balances['shielded'] += amount
+        else:
+            balances['transparent'] += amount
+    
+    rows = []
+    discrepancies_found = 0
+    total_shielded = 0.0
+    total_transparent = 0.0
+    
+    for user_id, balance_version, shielded_balance, transparent_balance in users:
+        balances = calculated.get(user_id, {'shielded': 0.0, 'transparent': 0.0})
+        shielded_discrepancy = shielded_balance - balances['shielded']
+        transparent_discrepancy = transparent_balance - balances['transparent']
+        has_discrepancy = (
+            abs(shielded_discrepancy) > BALANCE_TOLERANCE or
+            abs(transparent_discrepancy) > BALANCE_TOLERANCE
+        )
+        
+        if has_discrepancy:
+            discrepancies_found += 1
+            logger.warning(f"Balance discrepancy found for user {user_id}: "
+                          f"Shielded: {shielded_discrepancy}, Transparent: {transparent_discrepancy}")
+        
+        rows.append({
+            "user_id": user_id,
+            "balance_version": balance_version,
+            "database_shielded_balance": shielded_balance,
+            "database_transparent_balance": transparent_balance,
+            "calculated_shielded_balance": balances['shielded'],
+            "calculated_transparent_balance": balances['transparent'],
+            "shielded_discrepancy": shielded_discrepancy,
+            "transparent_discrepancy": transparent_discrepancy,
+            "has_discrepancy": has_discrepancy
+        })
+        total_shielded += shielded_balance
+        total_transparent += transparent_balance
+    
+    return {
+        "rows": rows,
+        "discrepancies_found": discrepancies_found,
+        "total_shielded": total_shielded,
+        "total_transparent": total_transparent
+    }
+
+
+def _run_user_shard(database_url: str, start_id: int, end_id: int) -> Dict:
+    """Process pool entry point: reconcile one shard on its own read-only session"""
+    engine = create_engine(_read_only_database_url(database_url))
+    try:
+        with sessionmaker(bind=engine, autoflush=False)() as db:
+            return _reconcile_user_shard(db, start_id, end_id)
+    finally:
+        engine.dispose()
@@ -8,6 +8,12 @@ import simplejson
 _mock_user_balances = {}
 _mock_pool_balance = 1000.0
 
+# Wallet pool totals cached per block height: (block_height, minconf, accounts) -> totals
+_pool_totals_cache = {}
+
+# Max calls per JSON-RPC batch request
+RPC_BATCH_SIZE = 500
+
 def backupwallet(destination: str):
     try:
         # RPC request payload
@@ -522,6 +528,111 @@ def z_getbalance(account: int = None, minconf: int = 1, include_watchonly: bool
         return 0.0
 
 
+def _rpc_batch(calls: list) -> list:
+    """
+    Send several RPC calls in one JSON-RPC batch request.
+    
+    Args:
+        calls: List of (method, params) tuples
+    
+    Returns:
+        List of results in the same order as calls (None for calls that errored)
+    """
+    payload = [
+        {
+            "jsonrpc": "1.0",
+            "id": index,
+            "method": method,
+            "params": params
+        }
+        for index, (method, params) in enumerate(calls)
+    ]
+    
+    response = requests.post(ZCASH_RPC_URL, json=payload, auth=(ZCASH_RPC_USER, ZCASH_RPC_PASSWORD))
+    
+    if response.status_code != 200:
+        print(response.text)
+        raise HTTPException(status_code=500, detail="Failed to connect to Zcash node")
+    
+    results = [None] * len(calls)
+    for entry in response.json():
+        if entry.get('error'):
+            print(f"{calls[entry['id']][0]} error: {entry['error']}")
+            continue
+        results[entry['id']] = entry['result']
+    return results
+
+
+def get_block_height() -> int:
+    """Get the current block height of the node."""
+    payload = {
+        "jsonrpc": "1.0",
+        "id": "getblockcount",
+        "method": "getblockcount",
+        "params": []
+    }
+    
+    response = requests.post(ZCASH_RPC_URL, json=payload, auth=(ZCASH_RPC_USER, ZCASH_RPC_PASSWORD))
+    
+    if response.status_code != 200:
+        print(response.text)
+        raise HTTPException(status_code=500, detail="Failed to connect to Zcash node")
+    
+    return int(response.json()['result'])
+
+
+def get_wallet_pool_totals(accounts: list, minconf: int = 1):
+    """
+    Get shielded and transparent totals across the given wallet accounts.
+    
+    Account balances are fetched with batched z_getbalanceforaccount calls
+    (one HTTP request per RPC_BATCH_SIZE accounts) and cached per block height,
+    so repeated reconciliations within the same block hit the node once for
+    the height check only.
+    
+    Args:
+        accounts: Wallet account numbers to sum
+        minconf: Minimum confirmations required (default: 1)
+    
+    Returns:
+        Dictionary with shielded_total, transparent_total and block_height,
+        or None in dev mode where there is no node to compare against
+    """
+    if DISABLE_ZCASH_NODE:
+        return None
+    
+    accounts = tuple(sorted(set(accounts)))
+    block_height = get_block_height()
+    cache_key = (block_height, minconf, accounts)
+    if cache_key in _pool_totals_cache:
+        return _pool_totals_cache[cache_key]
+    
+    shielded_zat = 0
+    transparent_zat = 0
+    for start in range(0, len(accounts), RPC_BATCH_SIZE):
+        chunk = accounts[start:start + RPC_BATCH_SIZE]
+        results = _rpc_batch([("z_getbalanceforaccount", [account, minconf]) for account in chunk])
+        for account, result in zip(chunk, results):
+            if result is None:
+                raise HTTPException(status_code=500, detail=f"Failed to get balance for account {account}")
+            for pool, balance in result.get('pools', {}).items():
+                if pool == 'transparent':
+                    transparent_zat += balance.get('valueZat', 0)
+                else:
+                    shielded_zat += balance.get('valueZat', 0)
+    
+    totals = {
+        "shielded_total": shielded_zat / 100000000.0,
+        "transparent_total": transparent_zat / 100000000.0,
+        "block_height": block_height
+    }
+    
+    # Only the latest height is useful; drop older entries
+    _pool_totals_cache.clear()
+    _pool_totals_cache[cache_key] = totals
+    return totals
+
+
 def z_listreceivedbyaddress(address: str, minconf: int = 1):
     """
     List amounts received by a specific shielded address.
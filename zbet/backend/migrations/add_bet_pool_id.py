@@ -0,0 +1,91 @@
+"""
+Database migration script for the bets -> pari_mutuel_pools foreign key.
+
+This script adds:
+1. bets.pari_mutuel_pool_id - the pool a pari-mutuel bet was placed in
+2. idx_bets_pari_mutuel_pool_id - bets(pari_mutuel_pool_id)
+
+Existing bets are backfilled from the pari_mutuel_pool_id key in
+betting_metadata (which is then removed from the JSON), and bets without
+that key from the pool matching their event and predicted outcome.
+
+Run this script after updating the models.py file.
+"""
+
+from sqlalchemy import create_engine, text
+import os
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./zbet_users_events_bets_payouts.sqlite3")
+
+
+def _get_columns(connection, table_name):
+    result = connection.execute(text(f"PRAGMA table_info({table_name})"))
+    return [row[1] for row in result.fetchall()]
+
+
+def run_migration():
+    """Run the database migration"""
+
+    engine = create_engine(DATABASE_URL)
+
+    print("Starting bet pool foreign key migration...")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            print("Adding pari_mutuel_pool_id to bets table...")
+            if 'pari_mutuel_pool_id' not in _get_columns(connection, "bets"):
+                connection.execute(text("""
+                    ALTER TABLE bets ADD COLUMN pari_mutuel_pool_id INTEGER REFERENCES pari_mutuel_pools(id)
+                """))
+                print("  - Added pari_mutuel_pool_id column")
+
+            print("Backfilling pool ids from betting_metadata...")
+            result = connection.execute(text("""
+                UPDATE bets
+                SET pari_mutuel_pool_id = CAST(json_extract(betting_metadata, '$.pari_mutuel_pool_id') AS INTEGER)
+                WHERE pari_mutuel_pool_id IS NULL
+                  AND json_valid(betting_metadata)
+                  AND json_extract(betting_metadata, '$.pari_mutuel_pool_id') IS NOT NULL
+            """))
+            print(f"  - Backfilled {result.rowcount} bets from metadata")
+
+            result = connection.execute(text("""
+                UPDATE bets
+                SET pari_mutuel_pool_id = (
+                    SELECT pari_mutuel_pools.id
+                    FROM pari_mutuel_pools
+                    JOIN pari_mutuel_events ON pari_mutuel_events.id = pari_mutuel_pools.pari_mutuel_event_id
+                    WHERE pari_mutuel_events.sport_event_id = bets.sport_event_id
+                      AND pari_mutuel_pools.outcome_name = bets.predicted_outcome
+                )
+                WHERE pari_mutuel_pool_id IS NULL
+            """))
+            print(f"  - Looked up {result.rowcount} remaining bets by event and predicted outcome")
+
+            print("Removing pari_mutuel_pool_id from betting_metadata...")
+            connection.execute(text("""
+                UPDATE bets
+                SET betting_metadata = NULLIF(json_remove(betting_metadata, '$.pari_mutuel_pool_id'), '{}')
+                WHERE json_valid(betting_metadata)
+                  AND json_extract(betting_metadata, '$.pari_mutuel_pool_id') IS NOT NULL
+            """))
+
+            print("Creating idx_bets_pari_mutuel_pool_id...")
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_bets_pari_mutuel_pool_id ON bets (pari_mutuel_pool_id)
+            """))
+
+            trans.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    run_migration()
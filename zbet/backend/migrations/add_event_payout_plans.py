@@ -0,0 +1,56 @@
+"""
+Database migration script for persisted payout plans.
+
+This script adds:
+1. event_payout_plans table - one compact JSON payout plan snapshot per settled event
+
+Plans for events that were settled before this migration are built the first
+time they are read (see app/payout_plans.get_payout_plan), so no backfill is
+needed here.
+
+Run this script after updating the models.py file.
+"""
+
+from sqlalchemy import create_engine, text
+import os
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./zbet_users_events_bets_payouts.sqlite3")
+
+
+def run_migration():
+    """Run the database migration"""
+
+    engine = create_engine(DATABASE_URL)
+
+    print("Starting payout plan migration...")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            print("Creating event_payout_plans table...")
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS event_payout_plans (
+                    id INTEGER PRIMARY KEY,
+                    sport_event_id INTEGER NOT NULL UNIQUE,
+                    winning_outcome VARCHAR(50) NOT NULL,
+                    plan TEXT NOT NULL,
+                    created_at DATETIME NOT NULL,
+                    sent_at DATETIME,
+                    transaction_id VARCHAR(100),
+                    FOREIGN KEY (sport_event_id) REFERENCES sport_events (id)
+                )
+            """))
+
+            trans.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,69 @@
+"""
+Database migration script for the composite index pack on hot queries.
+
+This script creates (if missing):
+1. idx_bets_event_deposit_status - bets(sport_event_id, deposit_status)
+2. idx_bets_user_event - bets(user_id, sport_event_id)
+3. idx_payouts_event_processed - payouts(sport_event_id, is_processed)
+4. idx_user_transactions_user_status_amount - user_transactions(user_id, status, amount), covering for balance sums
+5. idx_sport_events_status_settlement_time - sport_events(status, settlement_time)
+6. idx_pari_mutuel_pools_event_outcome - pari_mutuel_pools(pari_mutuel_event_id, outcome_name)
+7. idx_pari_mutuel_events_sport_event_id - pari_mutuel_events(sport_event_id)
+8. idx_validation_results_event_outcome - validation_results(sport_event_id, predicted_outcome)
+9. idx_sport_events_status_settled_at - sport_events(status, settled_at), for the paged settled-events list
+10. idx_sport_events_status_event_end_time - sport_events(status, event_end_time), for lifecycle closes and status filters
+11. idx_bets_pari_mutuel_pool_id - bets(pari_mutuel_pool_id), for pool-scoped bet queries (needs add_bet_pool_id.py first)
+
+Run this script after updating the models.py file.
+"""
+
+from sqlalchemy import create_engine, text
+import os
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./zbet_users_events_bets_payouts.sqlite3")
+
+INDEXES = [
+    ("idx_bets_event_deposit_status", "bets", "sport_event_id, deposit_status"),
+    ("idx_bets_user_event", "bets", "user_id, sport_event_id"),
+    ("idx_payouts_event_processed", "payouts", "sport_event_id, is_processed"),
+    ("idx_user_transactions_user_status_amount", "user_transactions", "user_id, status, amount"),
+    ("idx_sport_events_status_settlement_time", "sport_events", "status, settlement_time"),
+    ("idx_pari_mutuel_pools_event_outcome", "pari_mutuel_pools", "pari_mutuel_event_id, outcome_name"),
+    ("idx_pari_mutuel_events_sport_event_id", "pari_mutuel_events", "sport_event_id"),
+    ("idx_validation_results_event_outcome", "validation_results", "sport_event_id, predicted_outcome"),
+    ("idx_sport_events_status_settled_at", "sport_events", "status, settled_at"),
+    ("idx_sport_events_status_event_end_time", "sport_events", "status, event_end_time"),
+    ("idx_bets_pari_mutuel_pool_id", "bets", "pari_mutuel_pool_id"),
+]
+
+
+def run_migration():
+    """Run the database migration"""
+
+    engine = create_engine(DATABASE_URL)
+
+    print("Starting hot query index migration...")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            for index_name, table_name, columns in INDEXES:
+                print(f"Creating {index_name} on {table_name}({columns})...")
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"))
+
+            # Refresh planner statistics so the new indexes are picked up
+            connection.execute(text("ANALYZE"))
+
+            trans.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    run_migration()
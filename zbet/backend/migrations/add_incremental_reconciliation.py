@@ -0,0 +1,69 @@
+"""
+Database migration script for incremental (dirty-set) balance reconciliation.
+
+This script adds:
+1. users.reconciled_balance_version - balance_version at the user's last clean reconciliation
+2. balance_reconciliations.reconciliation_type - "full" or "incremental"
+3. user_balance_reconciliations.balance_version - the balance_version that was checked
+
+Existing users start with a NULL reconciled version, so the first incremental
+run checks everyone once.
+
+Run this script after updating the models.py file.
+"""
+
+from sqlalchemy import create_engine, text
+import os
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./zbet_users_events_bets_payouts.sqlite3")
+
+
+def _get_columns(connection, table_name):
+    result = connection.execute(text(f"PRAGMA table_info({table_name})"))
+    return [row[1] for row in result.fetchall()]
+
+
+def run_migration():
+    """Run the database migration"""
+
+    engine = create_engine(DATABASE_URL)
+
+    print("Starting incremental reconciliation migration...")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            print("Adding reconciled_balance_version to users table...")
+            if 'reconciled_balance_version' not in _get_columns(connection, "users"):
+                connection.execute(text("""
+                    ALTER TABLE users ADD COLUMN reconciled_balance_version INTEGER
+                """))
+                print("  - Added reconciled_balance_version column")
+
+            print("Adding reconciliation_type to balance_reconciliations table...")
+            if 'reconciliation_type' not in _get_columns(connection, "balance_reconciliations"):
+                connection.execute(text("""
+                    ALTER TABLE balance_reconciliations ADD COLUMN reconciliation_type VARCHAR(20) DEFAULT 'full' NOT NULL
+                """))
+                print("  - Added reconciliation_type column")
+
+            print("Adding balance_version to user_balance_reconciliations table...")
+            if 'balance_version' not in _get_columns(connection, "user_balance_reconciliations"):
+                connection.execute(text("""
+                    ALTER TABLE user_balance_reconciliations ADD COLUMN balance_version INTEGER
+                """))
+                print("  - Added balance_version column")
+
+            trans.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,65 @@
+"""
+Database migration script for the durable job queue.
+
+This script adds:
+1. jobs table - queued admin operations (payouts, settlement, reconciliation) with leases and retries
+2. idx_jobs_status_run_after index - used by workers claiming the next runnable job
+
+Run this script after updating the models.py file.
+"""
+
+from sqlalchemy import create_engine, text
+import os
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./zbet_users_events_bets_payouts.sqlite3")
+
+
+def run_migration():
+    """Run the database migration"""
+
+    engine = create_engine(DATABASE_URL)
+
+    print("Starting job queue migration...")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            print("Creating jobs table...")
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY,
+                    job_type VARCHAR(50) NOT NULL,
+                    payload TEXT NOT NULL DEFAULT '{}',
+                    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    run_after DATETIME NOT NULL,
+                    lease_owner VARCHAR(200),
+                    lease_expires_at DATETIME,
+                    heartbeat_at DATETIME,
+                    result TEXT,
+                    last_error TEXT,
+                    created_at DATETIME NOT NULL,
+                    started_at DATETIME,
+                    finished_at DATETIME
+                )
+            """))
+
+            print("Creating jobs index...")
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs (status, run_after)"
+            ))
+
+            trans.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    run_migration()
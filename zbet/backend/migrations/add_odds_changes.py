@@ -0,0 +1,54 @@
+"""
+Database migration script for the live odds cache.
+
+This script adds:
+1. odds_changes table - log of pari-mutuel odds changes that workers poll to invalidate their caches
+2. idx_odds_changes_created_at index - used when old changes are pruned
+
+Run this script after updating the models.py file.
+"""
+
+from sqlalchemy import create_engine, text
+import os
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./zbet_users_events_bets_payouts.sqlite3")
+
+
+def run_migration():
+    """Run the database migration"""
+
+    engine = create_engine(DATABASE_URL)
+
+    print("Starting odds change log migration...")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            print("Creating odds_changes table...")
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS odds_changes (
+                    id INTEGER PRIMARY KEY,
+                    sport_event_id INTEGER NOT NULL,
+                    origin VARCHAR(200) NOT NULL,
+                    created_at DATETIME NOT NULL
+                )
+            """))
+
+            print("Creating odds_changes index...")
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_odds_changes_created_at ON odds_changes (created_at)"
+            ))
+
+            trans.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,62 @@
+"""
+Database migration script for the odds history time series.
+
+This script adds:
+1. odds_history_chunks table - delta-encoded pool-amount samples per event, in chunks
+2. idx_odds_history_chunks_event_chunk unique index - sport_event_id, chunk_index
+
+History starts empty; it is recorded from the first odds change after deploy.
+
+Run this script after updating the models.py file.
+"""
+
+from sqlalchemy import create_engine, text
+import os
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./zbet_users_events_bets_payouts.sqlite3")
+
+
+def run_migration():
+    """Run the database migration"""
+
+    engine = create_engine(DATABASE_URL)
+
+    print("Starting odds history migration...")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            print("Creating odds_history_chunks table...")
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS odds_history_chunks (
+                    id INTEGER PRIMARY KEY,
+                    sport_event_id INTEGER NOT NULL REFERENCES sport_events(id),
+                    chunk_index INTEGER NOT NULL,
+                    outcome_names TEXT NOT NULL,
+                    start_time DATETIME NOT NULL,
+                    end_time DATETIME NOT NULL,
+                    sample_count INTEGER NOT NULL,
+                    timestamps BLOB NOT NULL,
+                    amounts BLOB NOT NULL
+                )
+            """))
+
+            print("Creating odds_history_chunks index...")
+            connection.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_odds_history_chunks_event_chunk "
+                "ON odds_history_chunks (sport_event_id, chunk_index)"
+            ))
+
+            trans.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,47 @@
+"""
+Database migration script for the in-process scheduler.
+
+This script adds:
+1. scheduler_leases table - single-leader lease so only one app worker runs scheduled jobs
+
+Run this script after updating the models.py file.
+"""
+
+from sqlalchemy import create_engine, text
+import os
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./zbet_users_events_bets_payouts.sqlite3")
+
+
+def run_migration():
+    """Run the database migration"""
+
+    engine = create_engine(DATABASE_URL)
+
+    print("Starting scheduler lease migration...")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            print("Creating scheduler_leases table...")
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS scheduler_leases (
+                    name VARCHAR(50) PRIMARY KEY,
+                    holder VARCHAR(200) NOT NULL,
+                    expires_at DATETIME NOT NULL
+                )
+            """))
+
+            trans.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    run_migration()
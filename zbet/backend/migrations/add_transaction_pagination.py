@@ -0,0 +1,67 @@
+"""
+Database migration script for keyset pagination of transaction history.
+
+This script adds:
+1. users.transaction_count - per-user counter of user_transactions rows
+2. idx_user_transactions_user_created_id - composite (user_id, created_at, id) index
+
+The counter is backfilled from the existing user_transactions rows.
+
+Run this script after updating the models.py file.
+"""
+
+from sqlalchemy import create_engine, text
+import os
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./zbet_users_events_bets_payouts.sqlite3")
+
+
+def _get_columns(connection, table_name):
+    result = connection.execute(text(f"PRAGMA table_info({table_name})"))
+    return [row[1] for row in result.fetchall()]
+
+
+def run_migration():
+    """Run the database migration"""
+
+    engine = create_engine(DATABASE_URL)
+
+    print("Starting transaction pagination migration...")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            print("Adding transaction_count to users table...")
+            if 'transaction_count' not in _get_columns(connection, "users"):
+                connection.execute(text("""
+                    ALTER TABLE users ADD COLUMN transaction_count INTEGER DEFAULT 0 NOT NULL
+                """))
+                print("  - Added transaction_count column")
+
+            print("Backfilling transaction counts...")
+            connection.execute(text("""
+                UPDATE users SET transaction_count = (
+                    SELECT COUNT(*) FROM user_transactions
+                    WHERE user_transactions.user_id = users.id
+                )
+            """))
+
+            print("Creating keyset pagination index...")
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_user_transactions_user_created_id
+                ON user_transactions (user_id, created_at, id)
+            """))
+
+            trans.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,59 @@
+"""
+Database migration script for maintained validation tallies.
+
+This script adds:
+1. validation_tallies table - validation count per (event, predicted outcome), updated with each validation
+2. Backfills the tallies from existing validation_results rows
+
+Run this script after updating the models.py file.
+"""
+
+from sqlalchemy import create_engine, text
+import os
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./zbet_users_events_bets_payouts.sqlite3")
+
+
+def run_migration():
+    """Run the database migration"""
+
+    engine = create_engine(DATABASE_URL)
+
+    print("Starting validation tally migration...")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            print("Creating validation_tallies table...")
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS validation_tallies (
+                    sport_event_id INTEGER NOT NULL REFERENCES sport_events(id),
+                    outcome VARCHAR(50) NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (sport_event_id, outcome)
+                )
+            """))
+
+            print("Backfilling validation tallies...")
+            connection.execute(text("DELETE FROM validation_tallies"))
+            result = connection.execute(text("""
+                INSERT INTO validation_tallies (sport_event_id, outcome, count)
+                SELECT sport_event_id, predicted_outcome, COUNT(*)
+                FROM validation_results
+                GROUP BY sport_event_id, predicted_outcome
+            """))
+            print(f"  ✓ Wrote {result.rowcount} tallies")
+
+            trans.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    run_migration()
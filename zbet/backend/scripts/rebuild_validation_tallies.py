@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Check the maintained validation_tallies table against validation_results and
+rebuild the tallies of any event that disagrees.
+
+Usage (from zbet/backend):
+    python -m scripts.rebuild_validation_tallies            # rebuild every mismatched event
+    python -m scripts.rebuild_validation_tallies --check    # report only; exit 1 on mismatches
+    python -m scripts.rebuild_validation_tallies --event 12 --event 15
+"""
+
+import argparse
+import sys
+
+from app import crud
+from app.database import SessionLocal
+
+
+def main():
+    """Main script execution"""
+    parser = argparse.ArgumentParser(description="Rebuild validation tallies from validation results")
+    parser.add_argument("--check", action="store_true", help="Only report mismatched events")
+    parser.add_argument("--event", type=int, action="append", dest="event_ids", help="Limit to these event IDs")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        mismatched = crud.rebuild_validation_tallies(db, args.event_ids, dry_run=args.check)
+
+    if not mismatched:
+        print("Validation tallies are consistent")
+        return
+
+    if args.check:
+        print(f"  ✗ {len(mismatched)} events have inconsistent tallies: {mismatched}")
+        sys.exit(1)
+    print(f"  ✓ Rebuilt tallies for {len(mismatched)} events: {mismatched}")
+
+
+if __name__ == "__main__":
+    main()
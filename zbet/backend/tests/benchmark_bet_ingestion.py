@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak bet placement: one transaction per bet (the default place_bet
+path) vs group-commit ingestion (BET_GROUP_COMMIT).
+
+Concurrent client threads each place bets on one open pari-mutuel event, the
+burst just before event_start_time. Uses a file-backed SQLite database so
+every commit pays its real fsync cost.
+
+Usage (from zbet/backend):
+    python -m tests.benchmark_bet_ingestion [bets] [clients]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import betting_utils, crud, models, schemas
+from app.bet_ingestion import BetIngestor
+from app.database import Base
+
+
+def _setup(path, client_count):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 60})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with session_factory() as db:
+        users = [
+            models.User(
+                username=f"user{i}", email=f"user{i}@test.com", hashed_password="x",
+                zcash_address=f"zuser{i}", transparent_balance=1_000_000.0
+            )
+            for i in range(client_count + 1)
+        ]
+        nonprofit = models.NonProfit(name="Benchmark Charity", federal_tax_id="12-3456789", zcash_transparent_address="t1charity")
+        db.add_all(users + [nonprofit])
+        db.flush()
+
+        now = betting_utils.get_est_now()
+        sport_event = models.SportEvent(
+            title="Benchmark Event", description="Benchmark", category=models.EventCategory.BASEBALL,
+            status=models.EventStatus.OPEN, betting_system_type=models.BettingSystemType.PARI_MUTUEL,
+            creator_id=users[-1].id, nonprofit_id=nonprofit.id,
+            event_start_time=now + timedelta(minutes=5), event_end_time=now + timedelta(hours=3),
+            settlement_time=now + timedelta(hours=6)
+        )
+        db.add(sport_event)
+        db.flush()
+        pari_event = models.PariMutuelEvent(sport_event_id=sport_event.id)
+        db.add(pari_event)
+        db.flush()
+        db.add_all([
+            models.PariMutuelPool(pari_mutuel_event_id=pari_event.id, outcome_name=outcome, outcome_description=outcome)
+            for outcome in ("team_a_wins", "team_b_wins")
+        ])
+        db.commit()
+        return engine, session_factory, [user.id for user in users[:client_count]], sport_event.id
+
+
+def _place_directly(session_factory, user_id, request):
+    # Same steps as place_bet without group commit
+    with session_factory() as db:
+        sport_event = crud.get_sport_event(db, request.sport_event_id)
+        betting_utils.validate_bet_for_event(sport_event, request.predicted_outcome, request.amount, db, user_id)
+        bet = crud.create_bet(db, request, user_id)
+        betting_utils.process_bet_placement(db, bet, sport_event)
+        db.commit()
+
+
+def _place_grouped(session_factory, ingestor, user_id, request):
+    with session_factory() as db:
+        sport_event = crud.get_sport_event(db, request.sport_event_id)
+        betting_utils.validate_bet_for_event(sport_event, request.predicted_outcome, request.amount, db, user_id)
+    ingestor.submit(user_id, request).result()
+
+
+def _run(path, bet_count, client_count, grouped):
+    engine, session_factory, user_ids, event_id = _setup(path, client_count)
+    ingestor = BetIngestor(session_factory=session_factory) if grouped else None
+    errors = []
+
+    def client(index):
+        request = schemas.BetPlacementRequest(
+            sport_event_id=event_id, predicted_outcome=("team_a_wins", "team_b_wins")[index % 2], amount=0.01
+        )
+        for _ in range(index, bet_count, client_count):
+            try:
+                if grouped:
+                    _place_grouped(session_factory, ingestor, user_ids[index], request)
+                else:
+                    _place_directly(session_factory, user_ids[index], request)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(client_count)]
+    try:
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        with session_factory() as db:
+            placed = db.query(models.Bet).count()
+            total_pool = db.query(models.PariMutuelEvent.total_pool).scalar()
+        # Concurrent read-modify-write of pool totals can lose increments
+        lost = round((placed * 0.01 - total_pool) / 0.01)
+        return elapsed, placed, lost, errors, ingestor.metrics() if ingestor else None
+    finally:
+        if ingestor:
+            ingestor.stop()
+        engine.dispose()
+
+
+def main(bet_count=1000, client_count=32):
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{bet_count} bets from {client_count} concurrent clients on one event")
+        for label, grouped in (("per-bet commits", False), ("group commit", True)):
+            elapsed, placed, lost, errors, metrics = _run(
+                os.path.join(tmp, f"{label.replace(' ', '_')}.sqlite3"), bet_count, client_count, grouped
+            )
+            print(f"{label:>16}: {elapsed:8.2f}s  {placed / elapsed:10.0f} bets/sec  "
+                  f"({placed} placed, {len(errors)} errors, {lost} missing from the pool total)")
+            if metrics:
+                print(f"{'':>16}  {metrics['batches']} batches, average {metrics['average_batch_size']:.1f} bets, "
+                      f"largest {metrics['largest_batch']}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark ledger writes: create_transaction per row vs the batched LedgerWriter.
+
+Uses a file-backed SQLite database so per-row commits pay their real fsync cost.
+
+Usage (from zbet/backend):
+    python -m tests.benchmark_ledger_writer [rows] [users]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.transaction_service import TransactionService, LedgerWriter
+
+
+def _session(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    return engine, db
+
+
+def _seed_users(db, user_count):
+    users = [
+        models.User(
+            username=f"user{i}", email=f"user{i}@test.com", hashed_password="x",
+            zcash_address=f"zuser{i}", zcash_transparent_address=f"t1user{i}", zcash_account=str(i)
+        )
+        for i in range(user_count)
+    ]
+    db.add_all(users)
+    db.commit()
+    return [user.id for user in users]
+
+
+def _run(path, row_count, user_count, batched):
+    engine, db = _session(path)
+    try:
+        user_ids = _seed_users(db, user_count)
+        started = time.perf_counter()
+        if batched:
+            with LedgerWriter(db) as ledger:
+                for i in range(row_count):
+                    ledger.add(
+                        user_id=user_ids[i % user_count],
+                        transaction_type=models.TransactionType.PAYOUT_WINNING,
+                        amount=1.0, confirmed=True
+                    )
+        else:
+            service = TransactionService(db)
+            for i in range(row_count):
+                service.create_transaction(
+                    user_id=user_ids[i % user_count],
+                    transaction_type=models.TransactionType.PAYOUT_WINNING,
+                    amount=1.0
+                )
+        return time.perf_counter() - started
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def main(row_count=10000, user_count=1000):
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{row_count} ledger rows across {user_count} users")
+        for label, batched in (("create_transaction", False), ("LedgerWriter", True)):
+            elapsed = _run(os.path.join(tmp, f"{label}.sqlite3"), row_count, user_count, batched)
+            print(f"{label:>20}: {elapsed:8.2f}s  {row_count / elapsed:10.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
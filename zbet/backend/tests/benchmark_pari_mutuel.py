@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark pari-mutuel payout calculation: a per-bet Python loop vs the
+vectorized calculator in app.pari_mutuel.
+
+Usage (from zbet/backend):
+    python -m tests.benchmark_pari_mutuel [bets] [outcomes]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from app import pari_mutuel
+from app.pari_mutuel import PariMutuelFees
+
+FEES = PariMutuelFees(house=0.05, creator=0.05, validator=0.2, charity=0.6)
+
+
+def _loop_estimates(amounts, outcome_indices, n_outcomes):
+    pools = [0.0] * n_outcomes
+    for amount, outcome in zip(amounts, outcome_indices):
+        pools[outcome] += amount
+    total_pool = sum(pools)
+    net_fraction = 1 - (FEES.house + FEES.creator + FEES.validator)
+
+    estimates = []
+    for amount, outcome in zip(amounts, outcome_indices):
+        own_pool = pools[outcome]
+        losing_pool = total_pool - own_pool
+        if own_pool <= 0 or losing_pool <= 0:
+            estimates.append(amount)
+        else:
+            estimates.append(amount + amount / own_pool * losing_pool * net_fraction)
+    return estimates
+
+
+def _vectorized_estimates(amounts, outcome_indices, n_outcomes):
+    settlement = pari_mutuel.calculate_settlement(amounts, outcome_indices, 0, FEES, n_outcomes=n_outcomes)
+    return pari_mutuel.estimate_potential_payouts(
+        amounts, outcome_indices, settlement.pool_totals, FEES._replace(charity=0.0)
+    )
+
+
+def _time(label, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>12}: {elapsed:8.3f}s")
+    return result
+
+
+def main(bet_count=1_000_000, n_outcomes=3):
+    rng = np.random.default_rng(42)
+    amounts = np.round(rng.uniform(0.001, 1.0, bet_count), 8)
+    outcome_indices = rng.integers(0, n_outcomes, bet_count)
+
+    print(f"{bet_count} bets across {n_outcomes} outcomes")
+    looped = _time("python loop", _loop_estimates, amounts.tolist(), outcome_indices.tolist(), n_outcomes)
+    vectorized = _time("numpy", _vectorized_estimates, amounts, outcome_indices, n_outcomes)
+
+    # The calculator floors to the zatoshi, so it never exceeds the float estimate
+    difference = np.asarray(looped) - vectorized
+    print(f"max difference vs loop: {difference.max():.8f} ZEC (min {difference.min():.8f})")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
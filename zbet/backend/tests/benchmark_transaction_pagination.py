@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark offset vs keyset (cursor) pagination of a user's transaction history.
+
+Keyset page latency should stay flat with page depth while OFFSET grows linearly.
+
+Usage (from zbet/backend):
+    python -m tests.benchmark_transaction_pagination [transactions] [page_size]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.transaction_service import TransactionService, encode_transaction_cursor
+
+
+def _seed(db, transaction_count):
+    user = models.User(
+        username="bench", email="bench@test.com", hashed_password="x",
+        zcash_address="zbench", zcash_transparent_address="t1bench", zcash_account="1",
+        transaction_count=transaction_count
+    )
+    db.add(user)
+    db.commit()
+
+    start = datetime(2025, 1, 1)
+    db.execute(insert(models.UserTransaction), [
+        {
+            "user_id": user.id,
+            "transaction_type": models.TransactionType.DEPOSIT,
+            "amount": 1.0,
+            "status": models.TransactionStatus.CONFIRMED,
+            "created_at": start + timedelta(seconds=i),
+        }
+        for i in range(transaction_count)
+    ])
+    db.commit()
+    return user
+
+
+def _time(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main(transaction_count=200000, page_size=50):
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = _seed(db, transaction_count)
+    service = TransactionService(db)
+
+    print(f"{transaction_count} transactions, page size {page_size}")
+    print(f"{'depth':>10} {'offset ms':>12} {'cursor ms':>12}")
+
+    newest_first = db.query(models.UserTransaction).order_by(
+        models.UserTransaction.created_at.desc(), models.UserTransaction.id.desc()
+    )
+    for depth in (0, transaction_count // 10, transaction_count // 2, transaction_count - page_size):
+        cursor = encode_transaction_cursor(newest_first.offset(depth - 1).first()) if depth else None
+        offset_ms = _time(lambda: service.get_user_transactions(user.id, limit=page_size, offset=depth))
+        cursor_ms = _time(lambda: service.get_user_transactions_page(user.id, limit=page_size, cursor=cursor))
+        print(f"{depth:>10} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
+
+    count_ms = _time(lambda: service.count_user_transactions(user.id))
+    print(f"total_count from counter: {count_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
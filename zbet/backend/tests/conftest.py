@@ -0,0 +1,118 @@
+"""
+Shared pytest fixtures.
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+
+
+@pytest.fixture(autouse=True)
+def empty_odds_cache():
+    """Each test gets an empty process-wide odds cache (event ids repeat across test databases)"""
+    from app.odds_cache import odds_cache
+
+    odds_cache.clear()
+    yield
+    odds_cache.clear()
+
+
+@pytest.fixture
+def db_session():
+    """Session on a fresh in-memory SQLite database with all tables created"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def make_pari_mutuel_event(db_session):
+    """
+    Factory for a pari-mutuel event with confirmed bets and validations.
+
+    bets is a list of (predicted_outcome, amount); validations is a list of
+    predicted outcomes. Each bet and validation gets its own user. Pool totals
+    are filled in as if the bets had been placed through the API, and
+    validation tallies as if the validations had been submitted through it.
+    """
+    from datetime import timedelta
+
+    from app import betting_utils, crud, models
+
+    counter = {"users": 0}
+
+    def _user():
+        counter["users"] += 1
+        i = counter["users"]
+        return models.User(
+            username=f"user{i}", email=f"user{i}@test.com", hashed_password="hashed_password",
+            zcash_address=f"zuser{i}", zcash_transparent_address=f"t1user{i}", zcash_account=str(i)
+        )
+
+    def factory(bets, validations=(), outcomes=("team_a_wins", "team_b_wins")):
+        db = db_session
+        creator = _user()
+        nonprofit = models.NonProfit(
+            name="Test Charity", federal_tax_id=f"12-{counter['users']:07d}",
+            zcash_transparent_address=f"t1charity{counter['users']}"
+        )
+        db.add_all([creator, nonprofit])
+        db.flush()
+
+        now = betting_utils.get_est_now()
+        sport_event = models.SportEvent(
+            title="Test Event", description="Test", category=models.EventCategory.BASEBALL,
+            status=models.EventStatus.OPEN, betting_system_type=models.BettingSystemType.PARI_MUTUEL,
+            creator_id=creator.id, nonprofit_id=nonprofit.id,
+            event_start_time=now - timedelta(hours=3), event_end_time=now - timedelta(hours=1),
+            settlement_time=now + timedelta(hours=6)
+        )
+        db.add(sport_event)
+        db.flush()
+
+        pari_event = models.PariMutuelEvent(
+            sport_event_id=sport_event.id,
+            total_pool=sum(amount for _, amount in bets)
+        )
+        db.add(pari_event)
+        db.flush()
+        pools = {
+            outcome: models.PariMutuelPool(
+                pari_mutuel_event_id=pari_event.id, outcome_name=outcome, outcome_description=outcome,
+                pool_amount=sum(amount for predicted, amount in bets if predicted == outcome),
+                bet_count=sum(1 for predicted, _ in bets if predicted == outcome)
+            )
+            for outcome in outcomes
+        }
+        db.add_all(pools.values())
+
+        bettors = [_user() for _ in bets]
+        validators = [_user() for _ in validations]
+        db.add_all(bettors + validators)
+        db.flush()
+        db.add_all([
+            models.Bet(
+                user_id=user.id, sport_event_id=sport_event.id, amount=amount,
+                predicted_outcome=predicted, deposit_status=models.DepositStatus.CONFIRMED,
+                pari_mutuel_pool_id=pools[predicted].id if predicted in pools else None
+            )
+            for user, (predicted, amount) in zip(bettors, bets)
+        ])
+        db.add_all([
+            models.ValidationResult(user_id=user.id, sport_event_id=sport_event.id, predicted_outcome=predicted)
+            for user, predicted in zip(validators, validations)
+        ])
+        for predicted in validations:
+            crud.increment_validation_tally(db, sport_event.id, predicted)
+        db.commit()
+        return sport_event
+
+    return factory
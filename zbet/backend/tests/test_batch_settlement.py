@@ -0,0 +1,78 @@
+"""
+Test parallel batch settlement of expired events (app.batch_settlement).
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import batch_settlement, models
+from app.database import Base
+
+
+@pytest.fixture
+def db_session(tmp_path):
+    """File-backed database so worker threads get their own connections"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'settlement.sqlite3'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def session_factory(db_session):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+
+
+def test_each_event_settles_in_its_own_transaction(db_session, make_pari_mutuel_event, session_factory):
+    consensus = make_pari_mutuel_event(
+        bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)],
+        validations=["team_a_wins", "team_a_wins", "team_a_wins"]
+    )
+    no_consensus = make_pari_mutuel_event(bets=[("team_a_wins", 1.0), ("team_b_wins", 1.5)])
+    # Consensus on an outcome the event does not offer fails settlement
+    broken = make_pari_mutuel_event(
+        bets=[("team_a_wins", 1.0)], validations=["draw", "draw", "draw"]
+    )
+    event_ids = [consensus.id, broken.id, no_consensus.id]
+
+    results = batch_settlement.settle_expired_events(event_ids, max_workers=3, session_factory=session_factory)
+
+    assert [result["event_id"] for result in results] == event_ids
+    assert [result["action"] for result in results] == [
+        "settled_with_consensus", "error", "cancelled_and_refunded"
+    ]
+    assert results[0]["winning_outcome"] == "team_a_wins"
+    assert results[2]["total_refund_amount"] == pytest.approx(2.5)
+    assert all(result["duration_ms"] >= 0 for result in results)
+
+    db_session.expire_all()
+    assert consensus.status == models.EventStatus.SETTLED
+    assert no_consensus.status == models.EventStatus.SETTLED
+    assert broken.status == models.EventStatus.OPEN
+    assert db_session.query(models.Payout).filter(models.Payout.sport_event_id == broken.id).count() == 0
+
+
+def test_settled_and_locked_events_are_skipped(db_session, make_pari_mutuel_event, session_factory):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 1.0), ("team_b_wins", 1.0)])
+
+    first = batch_settlement.settle_expired_event(sport_event.id, session_factory)
+    second = batch_settlement.settle_expired_event(sport_event.id, session_factory)
+    assert first["action"] == "cancelled_and_refunded"
+    assert second["action"] == "skipped"
+    assert second["reason"] == "Event is no longer open for settlement"
+
+    other = make_pari_mutuel_event(bets=[("team_a_wins", 1.0)])
+    with batch_settlement._event_lock(other.id):
+        locked = batch_settlement.settle_expired_event(other.id, session_factory)
+    assert locked["action"] == "skipped"
+    assert locked["reason"] == "Settlement already in progress"
+
+    # Nothing stays marked once settlement ends, skipped or not
+    assert batch_settlement._settling == set()
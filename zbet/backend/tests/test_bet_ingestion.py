@@ -0,0 +1,134 @@
+"""
+Test group-commit bet ingestion: batching, balance checks and pool totals
+within a batch, and isolation of failing bets.
+"""
+
+from concurrent.futures import Future
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app import betting_utils, models, schemas
+from app.bet_ingestion import BetIngestor, PendingBet
+from app.database import Base
+from app.odds_cache import odds_cache
+
+
+@pytest.fixture
+def db_session(tmp_path):
+    """File-backed database so the writer thread gets its own connection"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'bets.sqlite3'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def ingestor(db_session):
+    ingestor = BetIngestor(
+        session_factory=sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind()),
+        window_ms=0
+    )
+    yield ingestor
+    ingestor.stop()
+
+
+@pytest.fixture
+def open_event(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)])
+    sport_event.event_end_time = betting_utils.get_est_now() + timedelta(hours=1)
+    db_session.commit()
+    return sport_event
+
+
+def _bettor(db, balance):
+    n = db.query(models.User).count()
+    user = models.User(
+        username=f"bettor{n}", email=f"bettor{n}@test.com", hashed_password="x",
+        zcash_address=f"zb{n}", transparent_balance=balance
+    )
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def _bet(sport_event, outcome, amount):
+    return schemas.BetPlacementRequest(sport_event_id=sport_event.id, predicted_outcome=outcome, amount=amount)
+
+
+def test_queued_bets_commit_together(db_session, ingestor, open_event):
+    users = [_bettor(db_session, 10.0) for _ in range(20)]
+
+    # Everything queued before the writer starts lands in one batch
+    futures = []
+    for user_id in users:
+        futures.append(Future())
+        ingestor._queue.put(PendingBet(user_id, _bet(open_event, "team_a_wins", 0.5), futures[-1]))
+    ingestor.start()
+    bet_ids = [future.result(timeout=10) for future in futures]
+
+    assert len(set(bet_ids)) == 20
+    assert ingestor.batches == 1
+    assert ingestor.largest_batch == 20
+
+    db_session.expire_all()
+    pool = db_session.query(models.PariMutuelPool).filter_by(outcome_name="team_a_wins").one()
+    assert (pool.pool_amount, pool.bet_count) == (12.0, 21)
+    assert db_session.query(models.PariMutuelEvent).one().total_pool == 15.0
+    assert db_session.query(func.count(models.UserTransaction.id)).filter(
+        models.UserTransaction.transaction_type == models.TransactionType.BET_PLACED,
+        models.UserTransaction.status == models.TransactionStatus.CONFIRMED
+    ).scalar() == 20
+    assert {user.get_total_balance() for user in db_session.query(models.User).filter(models.User.id.in_(users))} == {9.5}
+
+    # Cached odds picked up the whole batch on commit
+    assert odds_cache.get(db_session, open_event.id).total_pool == 15.0
+
+
+def test_balance_is_checked_against_earlier_bets_in_the_batch(db_session, ingestor, open_event):
+    user_id = _bettor(db_session, 3.0)
+
+    futures = [Future(), Future()]
+    ingestor.write_batch([PendingBet(user_id, _bet(open_event, "team_b_wins", 2.0), future) for future in futures])
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result(timeout=0))
+        except HTTPException as e:
+            results.append(e)
+
+    placed = [result for result in results if isinstance(result, int)]
+    rejected = [result for result in results if isinstance(result, HTTPException)]
+    assert len(placed) == 1
+    assert len(rejected) == 1 and rejected[0].status_code == 400
+    assert "Insufficient balance" in rejected[0].detail
+
+    db_session.expire_all()
+    assert db_session.get(models.User, user_id).get_total_balance() == 1.0
+    assert db_session.query(models.PariMutuelPool).filter_by(outcome_name="team_b_wins").one().pool_amount == 5.0
+
+
+def test_rejected_bets_do_not_fail_their_batch(db_session, ingestor, open_event):
+    good, bad = _bettor(db_session, 10.0), _bettor(db_session, 10.0)
+
+    good_future, bad_future = Future(), Future()
+    committed = ingestor.write_batch([
+        PendingBet(good, _bet(open_event, "team_a_wins", 1.0), good_future),
+        PendingBet(bad, _bet(open_event, "no_such_outcome", 1.0), bad_future),
+    ])
+
+    assert committed == 1
+    assert isinstance(good_future.result(timeout=0), int)
+    with pytest.raises(HTTPException) as error:
+        bad_future.result(timeout=0)
+    assert error.value.status_code == 400
+    assert db_session.query(models.Bet).filter_by(user_id=bad).count() == 0
@@ -0,0 +1,101 @@
+"""
+Test deadline-driven event timers (app.deadlines).
+"""
+
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import betting_utils, deadlines, models
+from app.database import Base
+from app.deadlines import DeadlineScheduler, CLOSE, CONSENSUS_CHECK, DEADLINE_REFUND
+
+
+def _recording_scheduler(session_factory=None):
+    fired = []
+
+    def record(action):
+        def handler(event_id, session_factory):
+            fired.append((event_id, action))
+            return {"event_id": event_id}
+        return handler
+
+    timers = DeadlineScheduler(
+        session_factory=session_factory, handlers={action: record(action) for action in deadlines.ACTIONS}
+    )
+    return timers, fired
+
+
+def test_deadlines_fire_in_order_and_reschedules_replace_old_entries():
+    timers, fired = _recording_scheduler()
+    now = betting_utils.get_est_now()
+
+    timers.schedule(1, DEADLINE_REFUND, now + timedelta(minutes=30))
+    timers.schedule(2, CLOSE, now - timedelta(minutes=1))
+    timers.schedule(1, CLOSE, now - timedelta(minutes=2))
+    # Moved later: the original entry must not fire
+    timers.schedule(3, CLOSE, now - timedelta(minutes=3))
+    timers.schedule(3, CLOSE, now + timedelta(minutes=10))
+    timers.schedule(4, CLOSE, now - timedelta(minutes=1))
+    timers.cancel(4)
+
+    timers.run_due(now)
+    assert fired == [(1, CLOSE), (2, CLOSE)]
+    assert timers.metrics()["pending_deadlines"] == 2
+    assert 599 < timers.seconds_until_next(now) <= 600
+
+    timers.run_due(now + timedelta(hours=1))
+    assert fired[2:] == [(3, CLOSE), (1, DEADLINE_REFUND)]
+    assert timers.seconds_until_next() is None
+
+
+def test_loaded_event_closes_and_settles_on_consensus(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(
+        bets=[("team_a_wins", 1.0), ("team_b_wins", 2.0)],
+        validations=["team_b_wins", "team_b_wins", "team_b_wins"]
+    )
+    timers = DeadlineScheduler(session_factory=sessionmaker(bind=db_session.get_bind()))
+
+    assert timers.load(db_session) == 1
+    results = timers.run_due()
+
+    assert [(r["deadline"], r["action"]) for r in results] == [
+        (CLOSE, "closed"), (CONSENSUS_CHECK, "settled_with_consensus")
+    ]
+    db_session.expire_all()
+    assert sport_event.status == models.EventStatus.SETTLED
+
+    # The refund deadline later finds the event already settled
+    later = sport_event.settlement_time + timedelta(seconds=1)
+    assert [r["action"] for r in timers.run_due(later)] == ["skipped"]
+
+
+def test_consensus_check_without_consensus_leaves_event_open(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 1.0)], validations=["team_a_wins"])
+    timers = DeadlineScheduler(session_factory=sessionmaker(bind=db_session.get_bind()))
+
+    timers.check_consensus_soon(sport_event.id)
+    assert [r["action"] for r in timers.run_due()] == ["no_consensus"]
+    db_session.expire_all()
+    assert sport_event.status == models.EventStatus.OPEN
+
+
+def test_timer_thread_wakes_for_new_earlier_deadline(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'deadlines.sqlite3'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    timers, fired = _recording_scheduler(sessionmaker(bind=engine))
+    timers.start()
+    try:
+        # Nothing is pending, so the thread is blocked without a timeout
+        assert timers.seconds_until_next() is None
+        timers.schedule(7, CLOSE, betting_utils.get_est_now() + timedelta(milliseconds=200))
+        deadline = time.monotonic() + 5
+        while not fired and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert fired == [(7, CLOSE)]
+        assert timers.metrics()["last_lateness_ms"] < 1000
+    finally:
+        timers.stop()
+        engine.dispose()
@@ -0,0 +1,68 @@
+"""
+Test persisted OPEN -> CLOSED lifecycle transitions and index-driven status filters.
+"""
+
+from datetime import timedelta
+
+from app import betting_utils, crud, models, scheduler
+from tests.test_query_plans import captured_statements
+
+
+def _event(make_pari_mutuel_event, db, ends_in):
+    sport_event = make_pari_mutuel_event(bets=[])
+    sport_event.event_end_time = betting_utils.get_est_now() + ends_in
+    sport_event.event_start_time = sport_event.event_end_time - timedelta(hours=2)
+    sport_event.settlement_time = sport_event.event_end_time + timedelta(hours=6)
+    db.commit()
+    return sport_event
+
+
+def test_ended_events_are_closed_in_bulk(db_session, make_pari_mutuel_event):
+    ended = [_event(make_pari_mutuel_event, db_session, timedelta(minutes=-m)) for m in (1, 30, 90)]
+    running = _event(make_pari_mutuel_event, db_session, timedelta(minutes=30))
+    settled = _event(make_pari_mutuel_event, db_session, timedelta(hours=-3))
+    settled.status = models.EventStatus.SETTLED
+    db_session.commit()
+
+    assert betting_utils.close_ended_events(db_session) == 3
+    assert betting_utils.close_ended_events(db_session) == 0
+
+    db_session.expire_all()
+    assert [event.status for event in ended] == [models.EventStatus.CLOSED] * 3
+    assert running.status == models.EventStatus.OPEN
+    assert settled.status == models.EventStatus.SETTLED
+
+    # Filters now see the persisted status, in end-time order
+    closed = crud.get_sport_events(db_session, status=models.EventStatus.CLOSED)
+    assert [event.id for event in closed] == [event.id for event in reversed(ended)]
+    assert [event.id for event in crud.get_sport_events(db_session, status=models.EventStatus.OPEN)] == [running.id]
+
+
+def test_derived_status_uses_the_same_clock_as_the_lifecycle_job(db_session, make_pari_mutuel_event):
+    # Ends in 30 minutes on the EST clock; the old UTC-4 model clock called this closed
+    sport_event = _event(make_pari_mutuel_event, db_session, timedelta(minutes=30))
+    assert sport_event.get_current_status() == models.EventStatus.OPEN
+
+    sport_event.event_end_time = betting_utils.get_est_now() - timedelta(seconds=1)
+    db_session.commit()
+    assert sport_event.get_current_status() == models.EventStatus.CLOSED
+    assert betting_utils.close_ended_events(db_session) == 1
+    assert sport_event.status == models.EventStatus.CLOSED
+
+
+def test_status_listing_pages_from_the_index_without_sorting(db_session, make_pari_mutuel_event):
+    for m in (5, 10, 15):
+        _event(make_pari_mutuel_event, db_session, timedelta(minutes=m))
+
+    with captured_statements(db_session) as statements:
+        crud.get_sport_events(db_session, skip=1, limit=1, status=models.EventStatus.OPEN)
+    connection = db_session.connection()
+    statement, parameters = statements[0]
+    plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    assert any("idx_sport_events_status_event_end_time" in step for step in plan)
+    assert not any("TEMP B-TREE" in step for step in plan)
+
+
+def test_lifecycle_job_is_scheduled():
+    jobs = {job.name: job for job in scheduler.default_jobs()}
+    assert jobs["close_ended_events"].interval_seconds == scheduler.settings.SCHEDULER_LIFECYCLE_INTERVAL
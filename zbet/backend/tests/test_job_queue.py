@@ -0,0 +1,295 @@
+"""
+Test the durable job queue: claiming, lease expiry, retries with backoff,
+permanent failures, the worker pool and queue metrics.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import job_queue, models
+from app.database import Base
+from app.job_queue import JobWorkerPool
+
+
+@pytest.fixture
+def db_session(tmp_path):
+    """File-backed database so worker threads get their own connections"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'jobs.sqlite3'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def session_factory(db_session):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Swap in test handlers; keys must be registered job types"""
+    def install(**funcs):
+        for job_type, func in funcs.items():
+            monkeypatch.setitem(job_queue.JOB_HANDLERS, job_type, func)
+    return install
+
+
+def test_a_job_is_claimed_by_one_worker_until_its_lease_expires(db_session, session_factory):
+    job = job_queue.enqueue(db_session, "process_payouts", {"event_id": 1})
+
+    with session_factory() as other:
+        claimed = job_queue.claim_next_job(other, "worker-a", lease_seconds=30)
+        assert claimed.id == job.id
+        assert claimed.status == job_queue.RUNNING
+        assert claimed.attempts == 1
+
+    with session_factory() as other:
+        assert job_queue.claim_next_job(other, "worker-b", lease_seconds=30) is None
+
+    # worker-a dies: once its lease expires the job is reclaimed
+    db_session.query(models.Job).update({models.Job.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    db_session.commit()
+    with session_factory() as other:
+        reclaimed = job_queue.claim_next_job(other, "worker-b", lease_seconds=30)
+        assert reclaimed.id == job.id
+        assert reclaimed.lease_owner == "worker-b"
+        assert reclaimed.attempts == 2
+
+    # The old owner can no longer heartbeat it
+    assert not job_queue.heartbeat(db_session, job.id, "worker-a", 30)
+    assert job_queue.heartbeat(db_session, job.id, "worker-b", 30)
+
+
+def test_expired_jobs_without_attempts_left_are_failed_not_rerun(db_session, session_factory):
+    job = job_queue.enqueue(db_session, "send_payouts", {"event_id": 1}, max_attempts=1)
+
+    with session_factory() as other:
+        assert job_queue.claim_next_job(other, "worker-a", lease_seconds=0).id == job.id
+
+    # worker-a died after (maybe) sending: the job must not run a second time
+    with session_factory() as other:
+        assert job_queue.claim_next_job(other, "worker-b", lease_seconds=30) is None
+
+    db_session.refresh(job)
+    assert job.status == job_queue.FAILED
+    assert job.last_error == "Lease expired"
+    assert job.attempts == 1
+    assert job.lease_owner is None
+
+
+def test_a_worker_that_lost_its_lease_cannot_record_an_outcome(db_session, session_factory, handlers):
+    job = job_queue.enqueue(db_session, "process_payouts", {"event_id": 1})
+    stale = job_queue.claim_next_job(db_session, "worker-a", lease_seconds=0)
+
+    with session_factory() as other:
+        reclaimed = job_queue.claim_next_job(other, "worker-b", lease_seconds=30)
+        assert reclaimed.id == job.id and reclaimed.attempts == 2
+
+    # worker-a's handler finishes late: neither outcome overwrites worker-b's run
+    assert not job_queue.complete_job(db_session, stale, {"stale": True}, "worker-a")
+    assert not job_queue.fail_job(db_session, stale, "late failure", "worker-a")
+    db_session.refresh(job)
+    assert (job.status, job.lease_owner, job.result) == (job_queue.RUNNING, "worker-b", None)
+
+    handlers(process_payouts=lambda db, event_id: {"event_id": event_id})
+    with session_factory() as other:
+        job_queue.run_job(other, other.get(models.Job, job.id))
+    db_session.refresh(job)
+    assert job.status == job_queue.SUCCEEDED
+    assert json.loads(job.result) == {"event_id": 1}
+
+
+def test_failures_are_retried_with_backoff_then_marked_failed(db_session, handlers, monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "JOB_RETRY_BASE_SECONDS", 10.0)
+    calls = []
+
+    def flaky(db, event_id):
+        calls.append(event_id)
+        raise RuntimeError("node unavailable")
+
+    handlers(process_payouts=flaky)
+    job = job_queue.enqueue(db_session, "process_payouts", {"event_id": 7}, max_attempts=2)
+
+    claimed = job_queue.claim_next_job(db_session, "worker", 30)
+    job_queue.run_job(db_session, claimed)
+    assert job.status == job_queue.QUEUED
+    assert job.last_error == "node unavailable"
+    assert job.run_after >= datetime.utcnow() + timedelta(seconds=9)
+
+    # Not runnable until the backoff has passed
+    assert job_queue.claim_next_job(db_session, "worker", 30) is None
+    job.run_after = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+
+    claimed = job_queue.claim_next_job(db_session, "worker", 30)
+    job_queue.run_job(db_session, claimed)
+    assert job.status == job_queue.FAILED
+    assert job.attempts == 2
+    assert calls == [7, 7]
+
+
+def test_retry_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "JOB_RETRY_BASE_SECONDS", 10.0)
+    monkeypatch.setattr(job_queue.settings, "JOB_RETRY_MAX_SECONDS", 50.0)
+    assert [job_queue.retry_delay_seconds(n) for n in (1, 2, 3, 4)] == [10.0, 20.0, 40.0, 50.0]
+
+
+def test_client_errors_fail_without_retrying(db_session, handlers):
+    def not_settled(db, event_id):
+        raise HTTPException(status_code=400, detail="Event must be settled before processing payouts")
+
+    handlers(process_payouts=not_settled)
+    job = job_queue.enqueue(db_session, "process_payouts", {"event_id": 3})
+
+    job_queue.run_job(db_session, job_queue.claim_next_job(db_session, "worker", 30))
+    assert job.status == job_queue.FAILED
+    assert job.attempts == 1
+    assert job.last_error == "Event must be settled before processing payouts"
+
+
+def test_worker_pool_runs_queued_jobs(db_session, session_factory, handlers):
+    handlers(process_payouts=lambda db, event_id: {"event_id": event_id, "created_payouts": 2})
+    jobs = [job_queue.enqueue(db_session, "process_payouts", {"event_id": i}) for i in range(3)]
+
+    pool = JobWorkerPool(worker_count=2, session_factory=session_factory, poll_seconds=0.05, lease_seconds=30)
+    while pool.run_once("worker"):
+        pass
+
+    db_session.expire_all()
+    for i, job in enumerate(jobs):
+        assert job.status == job_queue.SUCCEEDED
+        assert json.loads(job.result) == {"event_id": i, "created_payouts": 2}
+        assert job_queue.serialize_job(job)["result"]["event_id"] == i
+    assert pool.jobs_run == 3
+
+    # Threads pick up jobs enqueued after start
+    pool.start()
+    try:
+        late = job_queue.enqueue(db_session, "process_payouts", {"event_id": 9})
+        for _ in range(100):
+            db_session.expire_all()
+            if late.status == job_queue.SUCCEEDED:
+                break
+            pool._stop.wait(0.05)
+        assert late.status == job_queue.SUCCEEDED
+    finally:
+        pool.stop()
+
+
+def test_queue_metrics_report_depth_and_latency(db_session, handlers):
+    handlers(process_payouts=lambda db, event_id: {})
+    done = job_queue.enqueue(db_session, "process_payouts", {"event_id": 1})
+    job_queue.enqueue(db_session, "process_payouts", {"event_id": 2})
+    done.created_at = datetime.utcnow() - timedelta(seconds=5)
+    db_session.commit()
+
+    claimed = job_queue.claim_next_job(db_session, "worker", 30)
+    assert claimed.id == done.id
+    job_queue.run_job(db_session, claimed)
+
+    metrics = job_queue.queue_metrics(db_session)
+    assert metrics["depth"] == {"queued": 1, "running": 0, "succeeded": 1, "failed": 0}
+    assert metrics["recent_jobs"] == 1
+    assert metrics["wait_latency"]["max_ms"] >= 5000
+    assert metrics["oldest_queued_age_seconds"] is not None
+
+
+def test_unknown_job_types_are_rejected(db_session):
+    with pytest.raises(ValueError):
+        job_queue.enqueue(db_session, "drop_tables")
+
+
+def test_process_payouts_job_summarises_a_settled_event(db_session, make_pari_mutuel_event, session_factory):
+    from app import batch_settlement
+
+    sport_event = make_pari_mutuel_event(
+        bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)],
+        validations=["team_a_wins", "team_a_wins", "team_a_wins"]
+    )
+    assert batch_settlement.settle_expired_event(sport_event.id, session_factory)["action"] == "settled_with_consensus"
+
+    job = job_queue.enqueue(db_session, "process_payouts", {"event_id": sport_event.id})
+    job_queue.run_job(db_session, job_queue.claim_next_job(db_session, "worker", 30))
+
+    result = json.loads(job.result)
+    assert job.status == job_queue.SUCCEEDED
+    assert result["event_id"] == sport_event.id
+    assert result["created_payouts"] > 0
+
+
+def test_concurrent_send_jobs_broadcast_once(db_session, make_pari_mutuel_event, session_factory, monkeypatch):
+    from app import batch_settlement, betting_utils
+
+    sport_event = make_pari_mutuel_event(
+        bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)],
+        validations=["team_a_wins", "team_a_wins", "team_a_wins"]
+    )
+    batch_settlement.settle_expired_event(sport_event.id, session_factory)
+    # Both jobs exist, e.g. enqueued by two admins at the same moment
+    first = job_queue.enqueue(db_session, "send_payouts", {"event_id": sport_event.id}, max_attempts=1)
+    second = job_queue.enqueue(db_session, "send_payouts", {"event_id": sport_event.id}, max_attempts=1)
+
+    broadcasts = []
+
+    def send(pool_address, records):
+        broadcasts.append(len(records))
+        if len(broadcasts) == 1:
+            # The second job runs while the first is still talking to the node
+            with session_factory() as other:
+                job_queue.run_job(other, job_queue.claim_next_job(other, "worker-b", 30))
+        return f"opid-{len(broadcasts)}"
+
+    monkeypatch.setattr(betting_utils, "_send_batch_payouts", send)
+    with session_factory() as db:
+        job_queue.run_job(db, job_queue.claim_next_job(db, "worker-a", 30))
+
+    assert len(broadcasts) == 1
+    db_session.expire_all()
+    assert first.status == job_queue.SUCCEEDED
+    assert second.status == job_queue.FAILED
+    # The committed claim already hides the plan from the second sender
+    assert second.last_error == "No pending payouts found. Process payouts first."
+    plan_row = db_session.query(models.EventPayoutPlan).filter_by(sport_event_id=sport_event.id).one()
+    assert plan_row.transaction_id == "opid-1"
+    assert db_session.query(models.Payout).filter(models.Payout.is_processed == False).count() == 0
+
+
+def test_a_failed_send_releases_the_plan(db_session, make_pari_mutuel_event, session_factory, monkeypatch):
+    from app import batch_settlement, betting_utils
+
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 1.0), ("team_b_wins", 2.0)])
+    batch_settlement.settle_expired_event(sport_event.id, session_factory)
+
+    def rejected(pool_address, records):
+        raise HTTPException(status_code=500, detail="Failed to send external payout transaction: node down")
+
+    monkeypatch.setattr(betting_utils, "_send_batch_payouts", rejected)
+    with pytest.raises(HTTPException):
+        betting_utils.send_event_payouts(db_session, sport_event.id)
+    plan_row = db_session.query(models.EventPayoutPlan).filter_by(sport_event_id=sport_event.id).one()
+    assert plan_row.sent_at is None
+
+    monkeypatch.setattr(betting_utils, "_send_batch_payouts", lambda pool_address, records: "opid")
+    assert betting_utils.send_event_payouts(db_session, sport_event.id)["transaction_id"] == "opid"
+
+
+def test_active_send_jobs_are_found_by_event(db_session):
+    assert job_queue.find_active_job(db_session, "send_payouts", {"event_id": 5}) is None
+    job = job_queue.enqueue(db_session, "send_payouts", {"event_id": 5}, max_attempts=1)
+    assert job_queue.find_active_job(db_session, "send_payouts", {"event_id": 5}).id == job.id
+    assert job_queue.find_active_job(db_session, "send_payouts", {"event_id": 6}) is None
+
+    job.status = job_queue.SUCCEEDED
+    db_session.commit()
+    assert job_queue.find_active_job(db_session, "send_payouts", {"event_id": 5}) is None
@@ -0,0 +1,67 @@
+"""
+Test streaming NDJSON/CSV ledger export.
+"""
+
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.transaction_service import TransactionService, LEDGER_EXPORT_COLUMNS, stream_ledger_export
+
+
+@pytest.fixture
+def ledger(db_session):
+    users = [
+        models.User(
+            username=f"user{i}", email=f"user{i}@test.com", hashed_password="hashed_password",
+            zcash_address=f"zuser{i}", zcash_transparent_address=f"t1user{i}", zcash_account=str(i)
+        )
+        for i in range(2)
+    ]
+    db_session.add_all(users)
+    db_session.commit()
+
+    service = TransactionService(db_session)
+    for i in range(5):
+        for user in users:
+            service.process_deposit(
+                user_id=user.id, amount=1.0 + i, from_address="t1external",
+                zcash_transaction_id=f"tx-{user.id}-{i}"
+            )
+    return users, sessionmaker(bind=db_session.get_bind())
+
+
+def test_ndjson_export_streams_one_chunk_per_batch(ledger):
+    users, session_factory = ledger
+    chunks = list(stream_ledger_export("ndjson", user_id=users[0].id, batch_size=2, session_factory=session_factory))
+    assert len(chunks) == 3
+
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert len(rows) == 5
+    assert all(row["user_id"] == users[0].id for row in rows)
+    assert rows[0]["transaction_type"] == "deposit"
+    assert rows[0]["created_at"].endswith("Z")
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+
+def test_csv_export_covers_all_users(ledger):
+    users, session_factory = ledger
+    text = "".join(stream_ledger_export("csv", batch_size=3, session_factory=session_factory))
+    rows = list(csv.reader(io.StringIO(text)))
+    assert tuple(rows[0]) == LEDGER_EXPORT_COLUMNS
+    assert len(rows) == 11
+
+
+def test_csv_export_of_empty_ledger_has_header(db_session):
+    session_factory = sessionmaker(bind=db_session.get_bind())
+    text = "".join(stream_ledger_export("csv", user_id=999, session_factory=session_factory))
+    assert text.strip() == ",".join(LEDGER_EXPORT_COLUMNS)
+
+
+def test_unknown_format_is_rejected(db_session):
+    with pytest.raises(ValueError):
+        list(stream_ledger_export("xml", session_factory=sessionmaker(bind=db_session.get_bind())))
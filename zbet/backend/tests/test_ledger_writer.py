@@ -0,0 +1,87 @@
+"""
+Test the write-behind LedgerWriter against row-at-a-time create_transaction.
+"""
+
+import pytest
+
+from app import models
+from app.transaction_service import TransactionService, LedgerWriter
+
+BALANCE_FIELDS = (
+    "shielded_balance_before", "transparent_balance_before",
+    "shielded_balance_after", "transparent_balance_after",
+)
+
+OPERATIONS = [
+    (0, models.TransactionType.DEPOSIT, 5.0),
+    (1, models.TransactionType.DEPOSIT, 2.0),
+    (0, models.TransactionType.BET_PLACED, -1.5),
+    (0, models.TransactionType.PAYOUT_WINNING, 3.0),
+    (1, models.TransactionType.FEE_VALIDATOR, 0.25),
+    (0, models.TransactionType.WITHDRAWAL, -0.5),
+]
+
+
+def _create_users(db, count):
+    users = [
+        models.User(
+            username=f"user{i}", email=f"user{i}@test.com", hashed_password="hashed_password",
+            zcash_address=f"zuser{i}", zcash_transparent_address=f"t1user{i}", zcash_account=str(i)
+        )
+        for i in range(count)
+    ]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def _ledger(db, user):
+    return db.query(models.UserTransaction).filter(
+        models.UserTransaction.user_id == user.id
+    ).order_by(models.UserTransaction.id).all()
+
+
+def test_batched_rows_match_one_by_one_rows(db_session):
+    users = _create_users(db_session, 4)
+    service = TransactionService(db_session)
+    for index, transaction_type, amount in OPERATIONS:
+        service.create_transaction(user_id=users[index].id, transaction_type=transaction_type, amount=amount)
+
+    with LedgerWriter(db_session, batch_size=4) as ledger:
+        for index, transaction_type, amount in OPERATIONS:
+            ledger.add(user_id=users[index + 2].id, transaction_type=transaction_type, amount=amount, confirmed=True)
+    assert ledger.rows_written == len(OPERATIONS)
+
+    for one_by_one, batched in ((users[0], users[2]), (users[1], users[3])):
+        expected = _ledger(db_session, one_by_one)
+        actual = _ledger(db_session, batched)
+        assert len(actual) == len(expected)
+        for expected_row, actual_row in zip(expected, actual):
+            for field in BALANCE_FIELDS:
+                assert getattr(actual_row, field) == pytest.approx(getattr(expected_row, field))
+            assert actual_row.status == models.TransactionStatus.CONFIRMED
+
+        assert batched.shielded_balance == pytest.approx(one_by_one.shielded_balance)
+        assert batched.transparent_balance == pytest.approx(one_by_one.transparent_balance)
+        assert batched.balance_version == one_by_one.balance_version
+        assert batched.transaction_count == one_by_one.transaction_count
+
+
+def test_error_rolls_back_the_unit_of_work(db_session):
+    users = _create_users(db_session, 1)
+    with pytest.raises(RuntimeError):
+        with LedgerWriter(db_session, batch_size=2) as ledger:
+            for _ in range(3):
+                ledger.add(user_id=users[0].id, transaction_type=models.TransactionType.DEPOSIT, amount=1.0)
+            raise RuntimeError("payout failed")
+
+    db_session.expire_all()
+    assert _ledger(db_session, users[0]) == []
+    assert users[0].transparent_balance == 0.0
+
+
+def test_unknown_user_is_rejected(db_session):
+    ledger = LedgerWriter(db_session)
+    ledger.add(user_id=999, transaction_type=models.TransactionType.DEPOSIT, amount=1.0)
+    with pytest.raises(ValueError):
+        ledger.flush()
@@ -0,0 +1,117 @@
+"""
+Test the live odds cache: query-free reads, write-through on commit,
+invalidation on settlement and cross-worker invalidation.
+"""
+
+import pytest
+
+from app import betting_utils, models, serializers
+from app.odds_cache import OddsCache, odds_cache
+from tests.test_query_plans import captured_statements
+
+
+def _place_bet(db, sport_event, outcome, amount):
+    n = db.query(models.User).count()
+    bettor = models.User(
+        username=f"bettor{n}", email=f"bettor{n}@test.com", hashed_password="x", zcash_address=f"zb{n}"
+    )
+    db.add(bettor)
+    db.flush()
+    bet = models.Bet(
+        user_id=bettor.id, sport_event_id=sport_event.id, amount=amount, predicted_outcome=outcome,
+        deposit_status=models.DepositStatus.CONFIRMED
+    )
+    db.add(bet)
+    db.flush()
+    betting_utils.update_pari_mutuel_pool_stats(db, bet, sport_event)
+    return bet
+
+
+def _pools(odds):
+    return {pool.outcome_name: (pool.pool_amount, pool.bet_count) for pool in odds.pools}
+
+
+def test_cached_odds_are_read_without_queries(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)])
+    event_id = sport_event.id
+    pari_event = db_session.query(models.PariMutuelEvent).filter_by(sport_event_id=event_id).one()
+    expected = pari_event.to_dict(db_session)
+
+    odds_cache.get(db_session, event_id)
+    with captured_statements(db_session) as statements:
+        odds = odds_cache.get(db_session, event_id)
+        data = odds.to_dict()
+    assert statements == []
+
+    # Same shape as the database serialization, plus the live implied ratios
+    implied = {pool["outcome_name"]: pool.pop("implied_payout_ratio") for pool in data["betting_pools"]}
+    assert data == expected
+    # Fees (house, creator, validator; the display leaves out charity) come off the losing pool
+    assert implied == {"team_a_wins": pytest.approx(1 + 3.0 * 0.7 / 2.0), "team_b_wins": pytest.approx(1 + 2.0 * 0.7 / 3.0)}
+
+
+def test_bets_write_through_on_commit_only(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)])
+    odds_cache.get(db_session, sport_event.id)
+
+    _place_bet(db_session, sport_event, "team_a_wins", 1.5)
+    db_session.rollback()
+    assert _pools(odds_cache.get(db_session, sport_event.id)) == {"team_a_wins": (2.0, 1), "team_b_wins": (3.0, 1)}
+
+    _place_bet(db_session, sport_event, "team_a_wins", 1.5)
+    db_session.commit()
+    event_id = sport_event.id
+    with captured_statements(db_session) as statements:
+        odds = odds_cache.get(db_session, event_id)
+    assert statements == []
+    assert _pools(odds) == {"team_a_wins": (3.5, 2), "team_b_wins": (3.0, 1)}
+    assert odds.total_pool == 6.5
+
+    # The write-through matches what a fresh load reads from the database
+    assert OddsCache(sync_seconds=0).get(db_session, event_id) == odds
+
+
+def test_potential_payouts_use_cached_pools(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)])
+    bets = db_session.query(models.Bet).filter_by(sport_event_id=sport_event.id).all()
+    expected = serializers.calculate_pari_mutuel_potential_payouts(bets, db_session)
+
+    with captured_statements(db_session) as statements:
+        assert serializers.calculate_pari_mutuel_potential_payouts(bets, db_session) == expected
+    assert statements == []
+
+
+def test_settlement_invalidates_cached_odds(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)])
+    assert odds_cache.get(db_session, sport_event.id).winning_outcome is None
+
+    betting_utils.settle_event(db_session, sport_event.id, "team_a_wins", pool_address="t1pool")
+
+    odds = odds_cache.get(db_session, sport_event.id)
+    assert odds.winning_outcome == "team_a_wins"
+    assert [pool.is_winning_pool for pool in odds.pools] == [True, False]
+
+
+def test_other_workers_invalidate_on_sync(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)])
+    other_worker = OddsCache(sync_seconds=0)
+    other_worker.sync(db_session)
+    other_worker.get(db_session, sport_event.id)
+
+    # This worker places a bet: its own cache is updated, the other worker's is stale
+    _place_bet(db_session, sport_event, "team_b_wins", 1.0)
+    db_session.commit()
+    assert other_worker.metrics()["entries"] == 1
+
+    assert other_worker.sync(db_session) == 1
+    assert other_worker.metrics()["entries"] == 0
+    assert _pools(other_worker.get(db_session, sport_event.id)) == {"team_a_wins": (2.0, 1), "team_b_wins": (4.0, 2)}
+
+    # Changes a worker made itself do not invalidate its own cache
+    odds_cache.sync(db_session)
+    odds_cache.get(db_session, sport_event.id)
+    _place_bet(db_session, sport_event, "team_b_wins", 1.0)
+    db_session.commit()
+    odds_cache.sync(db_session)
+    assert _pools(odds_cache.get(db_session, sport_event.id))["team_b_wins"] == (5.0, 3)
+    assert odds_cache.remote_invalidations == 0
@@ -0,0 +1,156 @@
+"""
+Test the odds history: delta encoding, coalesced sampling, chunking and
+downsampled reads that never touch the bets table.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, odds_history
+from app.database import Base
+from app.odds_cache import odds_cache
+from app.odds_history import OddsHistoryRecorder
+from tests.test_odds_cache import _place_bet
+from tests.test_query_plans import assert_no_full_scans, captured_statements
+
+T0 = datetime(2025, 7, 4, 18, 0, 0)
+
+
+def _zec(zatoshi):
+    return (zatoshi / 100_000_000).tolist()
+
+
+@pytest.fixture
+def recorder():
+    recorder = OddsHistoryRecorder(cache=odds_cache, interval_seconds=0, chunk_samples=4)
+    yield recorder
+    odds_cache.remove_listener(recorder.mark_changed)
+
+
+def test_delta_encoding_round_trips():
+    amounts = np.array([[0, 0], [100, 0], [100, 250], [7_500_000_000, 250]], dtype=np.int64)
+    assert np.array_equal(odds_history.decode_deltas(odds_history.encode_deltas(amounts), 2), amounts)
+
+    times = np.array([0, 10_000, 20_000, 3_600_000], dtype=np.int64)
+    assert np.array_equal(odds_history.decode_deltas(odds_history.encode_deltas(times)), times)
+
+
+def test_bets_are_sampled_once_per_interval(db_session, make_pari_mutuel_event, recorder):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)])
+
+    for _ in range(3):
+        _place_bet(db_session, sport_event, "team_a_wins", 0.5)
+        db_session.commit()
+    assert recorder.flush(db_session, now=T0) == 1
+
+    # Nothing changed since: no sample
+    odds_cache.touch(sport_event.id)
+    assert recorder.flush(db_session, now=T0 + timedelta(seconds=10)) == 0
+
+    _place_bet(db_session, sport_event, "team_b_wins", 1.0)
+    db_session.commit()
+    assert recorder.flush(db_session, now=T0 + timedelta(seconds=20)) == 1
+
+    series = odds_history.load_series(db_session, sport_event.id)
+    assert series.outcome_names == ["team_a_wins", "team_b_wins"]
+    assert series.times_ms.tolist() == [odds_history._to_ms(T0), odds_history._to_ms(T0) + 20_000]
+    assert series.amounts.tolist() == [[350_000_000, 300_000_000], [350_000_000, 400_000_000]]
+    assert recorder.metrics()["samples_unchanged"] == 1
+
+
+def test_samples_roll_over_into_new_chunks(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[])
+    names = ["team_a_wins", "team_b_wins"]
+    for i in range(10):
+        assert odds_history.append_sample(
+            db_session, sport_event.id, names, [float(i), 1.0], T0 + timedelta(minutes=i), chunk_samples=4
+        )
+    db_session.commit()
+
+    chunks = db_session.query(models.OddsHistoryChunk).order_by(models.OddsHistoryChunk.chunk_index).all()
+    assert [chunk.sample_count for chunk in chunks] == [4, 4, 2]
+    assert chunks[1].start_time == T0 + timedelta(minutes=4)
+
+    series = odds_history.load_series(
+        db_session, sport_event.id, start=T0 + timedelta(minutes=3), end=T0 + timedelta(minutes=5)
+    )
+    assert _zec(series.amounts[:, 0]) == [3.0, 4.0, 5.0]
+
+
+@pytest.fixture
+def file_session_factory(tmp_path):
+    """File-backed database so two sessions really are two connections"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.sqlite3'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.mark.parametrize("chunk_samples", [4, 1])
+def test_concurrent_appends_keep_every_sample(file_session_factory, monkeypatch, chunk_samples):
+    names = ["team_a_wins", "team_b_wins"]
+    real_last_chunk = odds_history._last_chunk
+
+    with file_session_factory() as db:
+        assert odds_history.append_sample(db, 1, names, [1.0, 1.0], T0, chunk_samples)
+        db.commit()
+
+        def other_worker_appends_meanwhile(session, sport_event_id):
+            chunk = real_last_chunk(session, sport_event_id)
+            if session is db and not raced:
+                # Another worker appends to (or starts) the same chunk between our read and write
+                raced.append(True)
+                with file_session_factory() as other:
+                    assert odds_history.append_sample(
+                        other, 1, names, [2.0, 1.0], T0 + timedelta(minutes=1), chunk_samples
+                    )
+                    other.commit()
+            return chunk
+
+        raced = []
+        monkeypatch.setattr(odds_history, "_last_chunk", other_worker_appends_meanwhile)
+        assert odds_history.append_sample(db, 1, names, [3.0, 1.0], T0 + timedelta(minutes=2), chunk_samples)
+        db.commit()
+
+        series = odds_history.load_series(db, 1)
+        assert _zec(series.amounts[:, 0]) == [1.0, 2.0, 3.0]
+        chunks = db.query(models.OddsHistoryChunk).order_by(models.OddsHistoryChunk.chunk_index).all()
+        assert [chunk.sample_count for chunk in chunks] == ([3] if chunk_samples == 4 else [1, 1, 1])
+
+
+def test_history_is_downsampled_without_reading_bets(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[])
+    names = ["team_a_wins", "team_b_wins"]
+    # One sample every 20 seconds for 12 minutes
+    for i in range(36):
+        odds_history.append_sample(
+            db_session, sport_event.id, names, [0.1 * (i + 1), 0.0], T0 + timedelta(seconds=20 * i), chunk_samples=8
+        )
+    db_session.commit()
+
+    with captured_statements(db_session) as statements:
+        history = odds_history.get_history(db_session, sport_event.id, bucket="5m")
+    assert not any(re.search(r"\bbets\b", statement) for statement, _ in statements)
+    assert_no_full_scans(db_session, statements)
+
+    assert history["outcomes"] == names
+    assert [point["time"] for point in history["points"]] == [
+        "2025-07-04T18:00:00", "2025-07-04T18:05:00", "2025-07-04T18:10:00"
+    ]
+    # Each bucket closes on its last sample: 15 samples per full 5 minutes
+    assert [point["pool_amounts"][0] for point in history["points"]] == pytest.approx([1.5, 3.0, 3.6])
+    assert history["points"][-1]["total_pool"] == pytest.approx(3.6)
+
+    minutes = odds_history.get_history(
+        db_session, sport_event.id, bucket="1m", start=T0 + timedelta(minutes=2), end=T0 + timedelta(minutes=3, seconds=59)
+    )
+    assert [point["time"][11:16] for point in minutes["points"]] == ["18:02", "18:03"]
+
+    with pytest.raises(ValueError):
+        odds_history.get_history(db_session, sport_event.id, bucket="2m")
+    assert odds_history.get_history(db_session, sport_event.id + 1)["points"] == []
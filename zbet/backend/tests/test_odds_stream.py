@@ -0,0 +1,128 @@
+"""
+Test the live odds stream: coalescing of bursts, status changes and the
+server-sent event framing.
+"""
+
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import betting_utils, deadlines, models
+from app.odds_cache import odds_cache
+from app.odds_stream import OddsStreamBroker, sse_messages
+from tests.test_odds_cache import _place_bet
+
+
+@pytest.fixture
+def broker():
+    broker = OddsStreamBroker(cache=odds_cache, coalesce_seconds=0)
+    yield broker
+    odds_cache.remove_listener(broker.publish)
+
+
+def test_burst_of_bets_is_coalesced_into_one_update(db_session, make_pari_mutuel_event, broker):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)])
+    other_event = make_pari_mutuel_event(bets=[("team_a_wins", 1.0)])
+
+    async def scenario():
+        subscription = broker.subscribe([sport_event.id])
+        initial = broker.snapshot(db_session, [sport_event.id])
+
+        for _ in range(5):
+            _place_bet(db_session, sport_event, "team_a_wins", 1.0)
+            db_session.commit()
+        # Nobody watches the other event, so its bets are not queued for publishing
+        _place_bet(db_session, other_event, "team_a_wins", 1.0)
+        db_session.commit()
+
+        assert broker.flush(db_session) == 1
+        assert broker.flush(db_session) == 0
+        return initial, await subscription.next_messages(timeout=1)
+
+    initial, messages = asyncio.run(scenario())
+
+    assert initial[0]["odds"]["total_pool"] == 5.0
+    assert "pool_deltas" not in initial[0]
+    assert len(messages) == 1
+    assert messages[0]["sport_event_id"] == sport_event.id
+    assert messages[0]["status"] == "closed"
+    assert messages[0]["odds"]["total_pool"] == 10.0
+    assert messages[0]["pool_deltas"] == {"team_a_wins": 5.0}
+
+    metrics = broker.metrics()
+    assert metrics["changes_received"] == 6
+    assert metrics["changes_coalesced"] == 4
+    assert metrics["messages_published"] == 1
+
+
+def test_status_changes_are_published(db_session, make_pari_mutuel_event, broker):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)])
+
+    async def scenario():
+        subscription = broker.subscribe([sport_event.id])
+        broker.snapshot(db_session, [sport_event.id])
+
+        # Lifecycle close, then settlement
+        assert betting_utils.close_ended_events(db_session) == 1
+        broker.flush(db_session)
+        closed = await subscription.next_messages(timeout=1)
+
+        betting_utils.settle_event(db_session, sport_event.id, "team_a_wins", pool_address="t1pool")
+        broker.flush(db_session)
+        settled = await subscription.next_messages(timeout=1)
+        return closed, settled
+
+    closed, settled = asyncio.run(scenario())
+
+    assert [message["status"] for message in closed] == ["closed"]
+    assert closed[0]["pool_deltas"] == {}
+    assert [message["status"] for message in settled] == ["settled"]
+    assert settled[0]["odds"]["winning_outcome"] == "team_a_wins"
+
+
+def test_timer_closes_are_published(db_session, make_pari_mutuel_event, broker):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0)])
+    session_factory = sessionmaker(bind=db_session.get_bind())
+
+    async def scenario():
+        subscription = broker.subscribe([sport_event.id])
+        broker.snapshot(db_session, [sport_event.id])
+
+        assert deadlines.close_event(sport_event.id, session_factory)["action"] == "closed"
+        broker.flush(db_session)
+        closed = await subscription.next_messages(timeout=1)
+
+        # Already closed: nothing to publish
+        assert deadlines.close_event(sport_event.id, session_factory)["action"] == "skipped"
+        return closed, broker.flush(db_session)
+
+    closed, republished = asyncio.run(scenario())
+
+    assert [message["status"] for message in closed] == ["closed"]
+    assert republished == 0
+    assert db_session.query(models.OddsChange).filter_by(sport_event_id=sport_event.id).count() == 1
+
+
+def test_sse_stream_sends_snapshot_keepalive_and_unsubscribes(db_session, make_pari_mutuel_event, broker):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0)])
+
+    async def scenario():
+        subscription = broker.subscribe([sport_event.id])
+        initial = broker.snapshot(db_session, [sport_event.id])
+        disconnects = iter([False, True])
+
+        async def is_disconnected():
+            return next(disconnects)
+
+        chunks = [chunk async for chunk in sse_messages(subscription, initial, is_disconnected, keepalive_seconds=0.01)]
+        return subscription, chunks
+
+    subscription, chunks = asyncio.run(scenario())
+
+    assert chunks[0].startswith("event: odds\ndata: ")
+    assert json.loads(chunks[0].split("data: ", 1)[1])["sport_event_id"] == sport_event.id
+    assert chunks[1:] == [": keepalive\n\n"]
+    assert subscription.closed
+    assert broker.metrics()["subscriptions"] == 0
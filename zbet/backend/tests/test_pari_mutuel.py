@@ -0,0 +1,82 @@
+"""
+Test the vectorized pari-mutuel calculator and the serializers that use it.
+"""
+
+import pytest
+
+from app import pari_mutuel, serializers, models
+from app.pari_mutuel import PariMutuelFees
+
+DEFAULT_FEES = PariMutuelFees(house=0.05, creator=0.05, validator=0.2, charity=0.6)
+
+
+def test_settlement_pays_winning_stakes_and_floors_fees():
+    result = pari_mutuel.calculate_settlement(
+        amounts=[2.0, 3.0, 1.0, 4.0],
+        outcome_indices=[0, 1, 0, 1],
+        winning_index=0,
+        fees=DEFAULT_FEES
+    )
+
+    assert result.payouts.tolist() == [2.0, 0.0, 1.0, 0.0]
+    assert result.pool_totals.tolist() == [3.0, 7.0]
+    assert result.winning_pool == 3.0
+    assert result.losing_pool == 7.0
+    # 0.6 * 7.0 is 4.199999... in floating point; it must not lose a zatoshi
+    assert result.fees == {"house": 0.35, "creator": 0.35, "validator": 1.4, "charity": 4.2}
+    assert result.remainder == pytest.approx(0.7)
+
+
+def test_settlement_remainder_keeps_floored_zatoshi():
+    result = pari_mutuel.calculate_settlement(
+        amounts=[0.00000001, 0.00000003],
+        outcome_indices=[0, 1],
+        winning_index=0,
+        fees=PariMutuelFees(house=0.5, charity=0.5)
+    )
+
+    # 1.5 zatoshi per fee floors to 1, the leftover zatoshi is the remainder
+    assert result.fees["house"] == result.fees["charity"] == 0.00000001
+    assert result.remainder == 0.00000001
+    total = sum(result.payouts) + sum(result.fees.values()) + result.remainder
+    assert total == pytest.approx(0.00000004, abs=1e-12)
+
+
+def test_push_refunds_everything_without_fees():
+    result = pari_mutuel.calculate_settlement(
+        amounts=[1.5, 2.5], outcome_indices=[0, 1], winning_index=None, fees=DEFAULT_FEES
+    )
+
+    assert result.payouts.tolist() == [1.5, 2.5]
+    assert all(fee == 0.0 for fee in result.fees.values())
+    assert result.remainder == 0.0
+
+
+def test_potential_payouts_share_the_net_losing_pool():
+    estimates = pari_mutuel.estimate_potential_payouts(
+        amounts=[1.0, 2.0, 4.0, 5.0],
+        outcome_indices=[0, 0, 1, 2],
+        pool_amounts=[3.0, 4.0, 0.0],
+        fees=PariMutuelFees(house=0.05, creator=0.05, validator=0.2)
+    )
+
+    # Outcome 0: 1/3 and 2/3 of 4.0 * 0.7; outcome 1 has 3.0 against it;
+    # outcome 2 has an empty pool, so the stake comes back unchanged
+    assert estimates.tolist() == pytest.approx([1.0 + 2.8 / 3, 2.0 + 5.6 / 3, 4.0 + 2.1, 5.0], abs=1e-8)
+
+
+def test_serializer_batch_matches_single_bet_estimates(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(
+        bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0), ("team_a_wins", 1.0)]
+    )
+    bets = db_session.query(models.Bet).order_by(models.Bet.id).all()
+
+    batch = serializers.calculate_potential_payouts(bets, db_session)
+
+    assert batch == {
+        bet.id: pytest.approx(serializers._calculate_pari_mutuel_payout(bet, sport_event, db_session))
+        for bet in bets
+    }
+    # Each team_a bettor gets a share of 3.0 * (1 - 0.3); team_b gets 3.0 * 0.7
+    assert batch[bets[0].id] == pytest.approx(2.0 + 2.0 / 3.0 * 2.1)
+    assert batch[bets[1].id] == pytest.approx(3.0 + 2.1)
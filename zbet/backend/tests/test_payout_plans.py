@@ -0,0 +1,120 @@
+"""
+Test the payout plan snapshot stored at settlement (app.payout_plans).
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from app import betting_utils, models, payout_plans, serializers
+
+
+def _plan_row(db, sport_event):
+    return db.query(models.EventPayoutPlan).filter(
+        models.EventPayoutPlan.sport_event_id == sport_event.id
+    ).one_or_none()
+
+
+def test_settlement_stores_payout_plan(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(
+        bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0), ("team_a_wins", 1.0), ("team_b_wins", 4.0)],
+        validations=["team_a_wins", "team_a_wins"]
+    )
+
+    betting_utils.settle_event(db_session, sport_event.id, "team_a_wins", pool_address="t1pool")
+
+    plan_row = _plan_row(db_session, sport_event)
+    assert plan_row.winning_outcome == "team_a_wins"
+    assert plan_row.sent_at is None
+
+    plan = payout_plans.plan_data(plan_row)
+    assert plan["winning_pool_amount"] == 3.0
+    assert plan["losing_pool_amount"] == 7.0
+    assert plan["fees"]["house_fee"] == pytest.approx(0.35)
+    assert plan["fees"]["validator_fee"] == pytest.approx(1.4)
+
+    payouts = payout_plans.payout_rows(plan)
+    assert [p["payout_type"] for p in payouts] == [
+        "user_winning", "user_winning", "house_fee", "creator_fee", "charity_fee",
+        "validator_fee", "validator_fee"
+    ]
+    assert payouts[0]["payout_id"] == db_session.query(models.Payout).order_by(models.Payout.id).first().id
+    assert plan["total_payout_amount"] == pytest.approx(3.0 + 0.9 * 7.0)
+    assert [bet["outcome"] for bet in payout_plans.bet_rows(plan)] == ["win", "loss", "win", "loss"]
+
+    details = serializers.serialize_event_payout_details(sport_event, plan)
+    assert details["total_fees"] == pytest.approx(0.35 + 0.35 + 1.4)
+    assert details["payout_records"][-1]["user"]["username"].startswith("user")
+    assert len(details["bets"]) == 4
+
+
+def test_plan_is_built_on_first_read_for_older_settlements(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 1.0), ("team_b_wins", 2.0)])
+    betting_utils.settle_event(db_session, sport_event.id, "push", pool_address="t1pool")
+
+    # Simulate an event settled and paid before plans were stored
+    db_session.delete(_plan_row(db_session, sport_event))
+    db_session.query(models.Payout).update({
+        models.Payout.is_processed: True,
+        models.Payout.zcash_transaction_id: "txid"
+    })
+    db_session.commit()
+
+    plan_row = payout_plans.get_payout_plan(db_session, sport_event)
+    assert plan_row.winning_outcome == "push"
+    assert plan_row.transaction_id == "txid"
+    assert plan_row.sent_at is not None
+    assert [p["payout_type"] for p in payout_plans.payout_rows(payout_plans.plan_data(plan_row))] == ["refund", "refund"]
+    assert _plan_row(db_session, sport_event) is plan_row
+
+
+def test_sent_payouts_are_never_sent_again(db_session, make_pari_mutuel_event, monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        betting_utils, "_send_batch_payouts",
+        lambda pool_address, records: sent.append([record.bet_id for record in records]) or "txid-1"
+    )
+    sport_event = make_pari_mutuel_event(
+        bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)], validations=["team_a_wins", "team_a_wins"]
+    )
+    betting_utils.settle_event(db_session, sport_event.id, "team_a_wins", pool_address="t1pool")
+
+    result = betting_utils.send_event_payouts(db_session, sport_event.id)
+    payout_count = db_session.query(models.Payout).count()
+    assert result["processed_payouts"] == payout_count
+    assert len(sent) == 1
+
+    # Re-running process-payouts must not create a second set of payouts
+    with pytest.raises(HTTPException) as error:
+        betting_utils.process_event_payouts(db_session, sport_event.id)
+    assert error.value.status_code == 400
+    db_session.rollback()
+    assert db_session.query(models.Payout).count() == payout_count
+
+    plan_row = _plan_row(db_session, sport_event)
+    assert plan_row.sent_at is not None and plan_row.transaction_id == "txid-1"
+    with pytest.raises(ValueError):
+        payout_plans.save_payout_plan(db_session, sport_event, "team_a_wins")
+
+    with pytest.raises(HTTPException) as error:
+        betting_utils.send_event_payouts(db_session, sport_event.id)
+    assert error.value.status_code == 400
+    assert len(sent) == 1
+
+
+def test_only_unprocessed_plan_rows_are_sent(db_session, make_pari_mutuel_event, monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        betting_utils, "_send_batch_payouts",
+        lambda pool_address, records: sent.extend(record.payout_type for record in records) or "txid-2"
+    )
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 1.0), ("team_b_wins", 2.0)])
+    betting_utils.settle_event(db_session, sport_event.id, "push", pool_address="t1pool")
+
+    # One refund already went out through another path
+    first = db_session.query(models.Payout).order_by(models.Payout.id).first()
+    first.is_processed = True
+    db_session.commit()
+
+    result = betting_utils.send_event_payouts(db_session, sport_event.id)
+    assert result["processed_payouts"] == 1
+    assert sent == ["refund"]
@@ -0,0 +1,181 @@
+"""
+Query-plan regression tests for hot queries.
+
+Each test runs real code paths from crud.py, betting_utils.py and
+transaction_service.py, captures the SQL they issue and runs EXPLAIN QUERY PLAN
+on every captured SELECT/UPDATE/DELETE. A plan step that scans a whole table
+(``SCAN <table>`` without an index) fails the test.
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, models, schemas, serializers, betting_utils
+from app.transaction_service import TransactionService, _reconcile_user_shard
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+@contextmanager
+def captured_statements(db):
+    """Collect (statement, parameters) for every query issued on the session's engine"""
+    statements = []
+    engine = db.get_bind()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def assert_no_full_scans(db, statements):
+    assert statements, "no statements were captured"
+    connection = db.connection()
+    for statement, parameters in statements:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        for row in plan:
+            detail = row[-1]
+            assert not FULL_SCAN.match(detail), f"Full table scan ({detail}) in:\n{statement}"
+
+
+@pytest.fixture
+def settled_world(db_session):
+    """Users, a pari-mutuel event with two pools, confirmed bets and validations"""
+    db = db_session
+    nonprofit = models.NonProfit(
+        name="Test Charity", federal_tax_id="12-3456789", zcash_transparent_address="t1charity"
+    )
+    users = [
+        models.User(
+            username=f"user{i}", email=f"user{i}@test.com", hashed_password="hashed_password",
+            zcash_address=f"zuser{i}", zcash_transparent_address=f"t1user{i}", zcash_account=str(i)
+        )
+        for i in range(4)
+    ]
+    db.add(nonprofit)
+    db.add_all(users)
+    db.commit()
+
+    now = betting_utils.get_est_now()
+    sport_event = models.SportEvent(
+        title="Test Event", description="Test", category=models.EventCategory.BASEBALL,
+        status=models.EventStatus.OPEN, betting_system_type=models.BettingSystemType.PARI_MUTUEL,
+        creator_id=users[0].id, nonprofit_id=nonprofit.id,
+        event_start_time=now - timedelta(hours=3), event_end_time=now + timedelta(hours=1),
+        settlement_time=now + timedelta(hours=6)
+    )
+    db.add(sport_event)
+    db.commit()
+
+    crud.create_pari_mutuel_event(db, sport_event.id, schemas.PariMutuelEventCreate(
+        betting_pools=[
+            schemas.PariMutuelPoolCreate(outcome_name="team_a_wins", outcome_description="Team A Wins"),
+            schemas.PariMutuelPoolCreate(outcome_name="team_b_wins", outcome_description="Team B Wins"),
+        ]
+    ))
+    for i, user in enumerate(users):
+        bet = crud.create_bet(db, schemas.BetPlacementRequest(
+            sport_event_id=sport_event.id, amount=1.0 + i,
+            predicted_outcome="team_a_wins" if i % 2 else "team_b_wins"
+        ), user.id)
+        betting_utils.update_pari_mutuel_pool_stats(db, bet, sport_event)
+        crud.create_validation_result(db, user.id, sport_event.id, schemas.ValidationRequest(
+            predicted_outcome="team_a_wins"
+        ))
+    db.commit()
+    return users, sport_event
+
+
+def test_crud_hot_queries_use_indexes(db_session, settled_world):
+    users, sport_event = settled_world
+    with captured_statements(db_session) as statements:
+        crud.get_sport_events(db_session, status=models.EventStatus.OPEN)
+        crud.get_expired_sport_events(db_session, betting_utils.get_est_now())
+        betting_utils.close_ended_events(db_session)
+        crud.get_user_bets(db_session, users[1].id)
+        crud.get_user_bets_for_event(db_session, users[1].id, sport_event.id)
+        crud.has_user_bet_on_event(db_session, users[1].id, sport_event.id)
+        crud.get_user_validation_for_event(db_session, users[1].id, sport_event.id)
+        crud.get_validations_for_event(db_session, sport_event.id)
+        crud.get_validation_tallies(db_session, [sport_event.id, sport_event.id + 1])
+        crud.get_validation_summary(db_session, sport_event.id)
+        crud.determine_consensus_outcome(db_session, sport_event.id)
+        crud.get_settled_events_page(db_session, limit=10)
+        crud.count_settled_events(db_session)
+    assert_no_full_scans(db_session, statements)
+
+
+def test_pool_scoped_bet_queries_use_indexes(db_session, settled_world):
+    users, sport_event = settled_world
+    pari_event = db_session.query(models.PariMutuelEvent).filter_by(sport_event_id=sport_event.id).one()
+    pools = {pool.outcome_name: pool for pool in pari_event.betting_pools}
+    with captured_statements(db_session) as statements:
+        event_bets = pari_event.get_bets(db_session)
+        pool_bets = pools["team_a_wins"].get_bets(db_session)
+    assert_no_full_scans(db_session, statements)
+
+    assert len(event_bets) == len(users)
+    assert {bet.user_id for bet in pool_bets} == {users[1].id, users[3].id}
+
+
+def test_settlement_hot_queries_use_indexes(db_session, settled_world):
+    users, sport_event = settled_world
+    with captured_statements(db_session) as statements:
+        betting_utils.settle_event(db_session, sport_event.id, "team_a_wins", pool_address="t1pool")
+        db_session.query(models.Payout).filter(models.Payout.sport_event_id == sport_event.id).update(
+            {models.Payout.is_processed: True}
+        )
+        betting_utils.mark_event_paid_out(db_session, sport_event.id)
+    assert_no_full_scans(db_session, statements)
+
+
+def test_transaction_service_hot_queries_use_indexes(db_session, settled_world):
+    users, sport_event = settled_world
+    service = TransactionService(db_session)
+    for user in users:
+        service.process_deposit(
+            user_id=user.id, amount=1.0, from_address="t1external", zcash_transaction_id=f"tx-{user.id}"
+        )
+
+    with captured_statements(db_session) as statements:
+        page, cursor = service.get_user_transactions_page(users[0].id, limit=1)
+        service.get_user_transactions_page(users[0].id, limit=1, cursor=cursor)
+        service.count_user_transactions(users[0].id, transaction_types=[models.TransactionType.DEPOSIT])
+        service.get_user_balance_summary(users[0].id)
+        _reconcile_user_shard(db_session, users[0].id, users[-1].id)
+    assert_no_full_scans(db_session, statements)
+
+
+@pytest.mark.parametrize("event_count", [1, 25])
+def test_event_listing_query_count_is_constant(db_session, make_pari_mutuel_event, event_count):
+    for i in range(event_count):
+        make_pari_mutuel_event(bets=[("team_a_wins", 1.0 + i), ("team_b_wins", 2.0)])
+    db_session.commit()
+    db_session.expire_all()
+
+    with captured_statements(db_session) as statements:
+        events = crud.get_sport_events(db_session, limit=100)
+        response = serializers.serialize_sport_events(events, db_session)
+    # Events, their nonprofits, pari-mutuel rows and pools
+    assert len(statements) == 4, "\n".join(statement for statement, _ in statements)
+
+    assert len(response) == event_count
+    assert {event.nonprofit.name for event in response} == {"Test Charity"}
+    assert [event.betting_system_data["total_pool"] for event in response] == [
+        3.0 + i for i in range(event_count)
+    ]
+
+    # Once the odds are cached, only events and nonprofits are read
+    db_session.expire_all()
+    with captured_statements(db_session) as statements:
+        serializers.serialize_sport_events(crud.get_sport_events(db_session, limit=100), db_session)
+    assert len(statements) == 2
@@ -0,0 +1,201 @@
+"""
+Test balance reconciliation, including the incremental (dirty-set) mode.
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.transaction_service import TransactionService, BalanceReconciliationService
+from app.zcash_mod import zcash_wallet
+
+
+def _create_users(db, count):
+    users = [
+        models.User(
+            username=f"user{i}",
+            email=f"user{i}@test.com",
+            hashed_password="hashed_password",
+            zcash_address=f"ztestsapling1user{i}address",
+            zcash_transparent_address=f"t1user{i}address",
+            zcash_account=str(i)
+        )
+        for i in range(count)
+    ]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def _deposit(db, user, amount):
+    return TransactionService(db).process_deposit(
+        user_id=user.id,
+        amount=amount,
+        from_address="t1external",
+        zcash_transaction_id=f"tx-{user.id}-{amount}"
+    )
+
+
+def test_incremental_reconciliation_only_checks_changed_users(db_session):
+    users = _create_users(db_session, 3)
+    for user in users:
+        _deposit(db_session, user, 1.0)
+
+    service = BalanceReconciliationService(db_session)
+
+    # First incremental run checks everyone (nobody has been reconciled yet)
+    first = service.run_incremental_reconciliation()
+    assert first.reconciliation_type == "incremental"
+    assert first.total_users_checked == 3
+    assert first.discrepancies_found == 0
+
+    # Nothing changed since, so nothing is checked
+    second = service.run_incremental_reconciliation()
+    assert second.total_users_checked == 0
+    assert second.total_transparent_pool_database == pytest.approx(3.0)
+
+    # Only the user who transacted is checked on the next run
+    _deposit(db_session, users[1], 0.5)
+    third = service.run_incremental_reconciliation()
+    assert third.total_users_checked == 1
+    checked = db_session.query(models.UserBalanceReconciliation).filter(
+        models.UserBalanceReconciliation.reconciliation_id == third.id
+    ).one()
+    assert checked.user_id == users[1].id
+    assert checked.balance_version == users[1].balance_version
+
+
+def test_users_with_discrepancies_stay_dirty(db_session):
+    users = _create_users(db_session, 2)
+    for user in users:
+        _deposit(db_session, user, 1.0)
+
+    # A pending withdrawal moves the balance but is not confirmed in the ledger yet
+    withdrawal = TransactionService(db_session).process_withdrawal(
+        user_id=users[0].id, amount=0.25, to_address="t1external"
+    )
+
+    service = BalanceReconciliationService(db_session)
+    first = service.run_incremental_reconciliation()
+    assert first.discrepancies_found == 1
+    assert users[0].reconciled_balance_version is None
+
+    # Confirmation does not touch balance_version, but the user is re-checked anyway
+    TransactionService(db_session).confirm_transaction(withdrawal.id)
+    second = service.run_incremental_reconciliation()
+    assert second.total_users_checked == 1
+    assert second.discrepancies_found == 0
+    assert users[0].reconciled_balance_version == users[0].balance_version
+
+
+def test_full_reconciliation_checks_everyone(db_session):
+    users = _create_users(db_session, 3)
+    for user in users:
+        _deposit(db_session, user, 2.0)
+
+    service = BalanceReconciliationService(db_session)
+    service.run_incremental_reconciliation()
+
+    full = service.run_full_reconciliation()
+    assert full.reconciliation_type == "full"
+    assert full.total_users_checked == 3
+    assert full.total_transparent_pool_database == pytest.approx(6.0)
+
+
+def _create_file_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reconciliation.sqlite3'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_sharded_reconciliation_matches_full(tmp_path, max_workers):
+    db = _create_file_session(tmp_path)
+    try:
+        users = _create_users(db, 7)
+        for i, user in enumerate(users):
+            _deposit(db, user, 1.0 + i)
+        TransactionService(db).process_withdrawal(
+            user_id=users[3].id, amount=0.5, to_address="t1external"
+        )
+
+        service = BalanceReconciliationService(db)
+        full = service.run_full_reconciliation()
+        sharded = service.run_sharded_reconciliation(max_workers=max_workers, shards_per_worker=2)
+
+        assert sharded.reconciliation_status == "completed"
+        assert sharded.total_users_checked == full.total_users_checked == 7
+        assert sharded.discrepancies_found == full.discrepancies_found == 1
+        assert sharded.total_transparent_pool_database == pytest.approx(full.total_transparent_pool_database)
+
+        rows = db.query(models.UserBalanceReconciliation).filter(
+            models.UserBalanceReconciliation.reconciliation_id == sharded.id
+        ).all()
+        assert sorted(row.user_id for row in rows if row.has_discrepancy) == [users[3].id]
+        db.expire_all()
+        assert users[3].reconciled_balance_version is None
+        assert users[0].reconciled_balance_version == users[0].balance_version
+    finally:
+        db.close()
+
+
+class _FakeNode:
+    """Answers getblockcount and batched z_getbalanceforaccount calls"""
+
+    def __init__(self, balances, block_height=100):
+        self.balances = balances
+        self.block_height = block_height
+        self.requests = []
+
+    def post(self, url, json=None, auth=None):
+        self.requests.append(json)
+        if isinstance(json, list):
+            body = [
+                {"id": call["id"], "error": None, "result": {"pools": self.balances[call["params"][0]]}}
+                for call in json
+            ]
+        else:
+            body = {"id": json["id"], "error": None, "result": self.block_height}
+        return _FakeResponse(body)
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+def test_blockchain_totals_use_batched_account_balances(db_session, monkeypatch):
+    users = _create_users(db_session, 3)
+    for user in users:
+        _deposit(db_session, user, 1.0)
+
+    node = _FakeNode({
+        i: {"transparent": {"valueZat": 100000000}, "sapling": {"valueZat": 25000000}}
+        for i in range(3)
+    })
+    monkeypatch.setattr(zcash_wallet, "DISABLE_ZCASH_NODE", False)
+    monkeypatch.setattr(zcash_wallet.requests, "post", node.post)
+    monkeypatch.setattr(zcash_wallet, "_pool_totals_cache", {})
+
+    service = BalanceReconciliationService(db_session)
+    first = service.run_full_reconciliation()
+    assert first.total_transparent_pool_blockchain == pytest.approx(3.0)
+    assert first.total_shielded_pool_blockchain == pytest.approx(0.75)
+    # One height check plus one batch for all accounts
+    assert len(node.requests) == 2
+    assert len(node.requests[1]) == 3
+
+    # Same block height: served from cache after the height check
+    service.run_incremental_reconciliation()
+    assert len(node.requests) == 3
+
+    node.block_height += 1
+    service.run_incremental_reconciliation()
+    assert len(node.requests) == 5
@@ -0,0 +1,132 @@
+"""
+Test the versioned response cache: hits without queries, strong ETags and
+304s, and invalidation by committed bets, status changes and nonprofit writes.
+"""
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app import crud, serializers
+from app.odds_cache import odds_cache, record_status_change
+from app.response_cache import ResponseCache, etag_matches
+from tests.test_odds_cache import _place_bet
+from tests.test_query_plans import captured_statements
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.fixture
+def cache():
+    cache = ResponseCache(cache=odds_cache, ttl_seconds=60, max_entries=10)
+    yield cache
+    odds_cache.remove_listener(cache.event_changed)
+
+
+def _event_response(cache, db, sport_event_id, if_none_match=None):
+    def build():
+        return serializers.serialize_sport_events([crud.get_sport_event(db, sport_event_id)], db)[0]
+    return cache.respond(_request(if_none_match), ("event", sport_event_id), cache.event_versions(sport_event_id), build)
+
+
+def _listing_response(cache, db, if_none_match=None):
+    def build():
+        return serializers.serialize_sport_events(crud.get_sport_events(db), db)
+    return cache.respond(_request(if_none_match), ("events", 0, 100, None), cache.listing_versions(), build)
+
+
+def test_repeat_reads_cost_no_queries(db_session, make_pari_mutuel_event, cache):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0)])
+    db_session.commit()
+
+    first = _event_response(cache, db_session, sport_event.id)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    with captured_statements(db_session) as statements:
+        again = _event_response(cache, db_session, sport_event.id)
+        not_modified = _event_response(cache, db_session, sport_event.id, if_none_match=etag)
+    assert statements == []
+    assert again.body == first.body and again.headers["etag"] == etag
+    assert not_modified.status_code == 304 and not_modified.body == b""
+    assert not_modified.headers["etag"] == etag
+    assert cache.metrics()["hits"] == 2 and cache.metrics()["not_modified"] == 1
+
+
+def test_committed_changes_invalidate_their_event_and_listings(db_session, make_pari_mutuel_event, cache):
+    changed = make_pari_mutuel_event(bets=[("team_a_wins", 2.0)])
+    other = make_pari_mutuel_event(bets=[("team_b_wins", 1.0)])
+    db_session.commit()
+
+    changed_etag = _event_response(cache, db_session, changed.id).headers["etag"]
+    other_etag = _event_response(cache, db_session, other.id).headers["etag"]
+    listing_etag = _listing_response(cache, db_session).headers["etag"]
+
+    # Uncommitted bets change nothing
+    _place_bet(db_session, changed, "team_b_wins", 0.5)
+    assert _event_response(cache, db_session, changed.id, if_none_match=changed_etag).status_code == 304
+
+    db_session.commit()
+    response = _event_response(cache, db_session, changed.id, if_none_match=changed_etag)
+    assert response.status_code == 200 and response.headers["etag"] != changed_etag
+    assert b'"total_pool":2.5' in response.body
+    assert _listing_response(cache, db_session, if_none_match=listing_etag).status_code == 200
+    assert _event_response(cache, db_session, other.id, if_none_match=other_etag).status_code == 304
+
+    # A status-only change is a new version, but identical content keeps its ETag
+    changed_etag = response.headers["etag"]
+    record_status_change(db_session, changed.id)
+    db_session.commit()
+    misses = cache.metrics()["misses"]
+    assert _event_response(cache, db_session, changed.id, if_none_match=changed_etag).status_code == 304
+    assert cache.metrics()["misses"] == misses + 1
+
+
+def test_nonprofit_writes_invalidate_embedded_nonprofits(db_session, make_pari_mutuel_event, cache):
+    sport_event = make_pari_mutuel_event(bets=[])
+    db_session.commit()
+    etag = _event_response(cache, db_session, sport_event.id).headers["etag"]
+
+    sport_event.nonprofit.name = "Renamed Charity"
+    db_session.commit()
+    cache.nonprofits_changed()
+
+    response = _event_response(cache, db_session, sport_event.id, if_none_match=etag)
+    assert response.status_code == 200 and b"Renamed Charity" in response.body
+
+
+def test_failed_builds_and_disabled_cache_are_not_stored(db_session, cache):
+    def missing():
+        raise HTTPException(status_code=404, detail="Event not found")
+    with pytest.raises(HTTPException):
+        cache.respond(_request(), ("event", 1), cache.event_versions(1), missing)
+    assert cache.metrics()["entries"] == 0
+
+    uncached = ResponseCache(cache=None, ttl_seconds=0)
+    builds = []
+    first = uncached.respond(_request(), "key", (), lambda: builds.append(1) or {"a": 1})
+    second = uncached.respond(_request(first.headers["etag"]), "key", (), lambda: builds.append(1) or {"a": 1})
+    assert len(builds) == 2 and second.status_code == 304
+
+
+def test_entries_are_evicted_least_recently_used_first():
+    cache = ResponseCache(cache=None, ttl_seconds=60, max_entries=2)
+    for key in ("a", "b"):
+        cache.respond(_request(), key, (), lambda: key)
+    cache.get("a", ())
+    cache.respond(_request(), "c", (), lambda: "c")
+    assert cache.get("a", ()) is not None
+    assert cache.get("b", ()) is None
+
+
+def test_if_none_match_parsing():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"xyz", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abcd"', etag)
+    assert not etag_matches(None, etag)
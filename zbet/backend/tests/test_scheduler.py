@@ -0,0 +1,134 @@
+"""
+Test the in-process scheduler: leader lease, job metrics and payout status tracking.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import betting_utils, models, scheduler
+from app.database import Base
+from app.scheduler import Scheduler, ScheduledJob
+
+
+@pytest.fixture
+def session_factory(db_session):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+
+
+def test_only_one_holder_gets_the_lease(db_session):
+    assert scheduler.acquire_lease(db_session, "scheduler", "worker-a", 30)
+    assert not scheduler.acquire_lease(db_session, "scheduler", "worker-b", 30)
+    # Renewal by the holder keeps it
+    assert scheduler.acquire_lease(db_session, "scheduler", "worker-a", 30)
+
+    # An expired lease can be taken over
+    db_session.query(models.SchedulerLease).update({
+        models.SchedulerLease.expires_at: datetime.utcnow() - timedelta(seconds=1)
+    })
+    db_session.commit()
+    assert scheduler.acquire_lease(db_session, "scheduler", "worker-b", 30)
+    assert not scheduler.acquire_lease(db_session, "scheduler", "worker-a", 30)
+
+    scheduler.release_lease(db_session, "scheduler", "worker-b")
+    assert scheduler.acquire_lease(db_session, "scheduler", "worker-a", 30)
+
+
+def test_leader_runs_due_jobs_and_records_metrics(session_factory):
+    calls = []
+
+    def ok(db):
+        calls.append("ok")
+        return {"done": True}
+
+    def broken(db):
+        raise RuntimeError("boom")
+
+    leader = Scheduler([ScheduledJob("ok", 60, ok), ScheduledJob("broken", 60, broken)],
+                       session_factory=session_factory, holder="leader")
+    follower = Scheduler([ScheduledJob("ok", 60, ok)], session_factory=session_factory, holder="follower")
+
+    assert leader.tick() == ["ok", "broken"]
+    assert follower.tick() == []
+    assert not follower.is_leader
+
+    # Not due again until the interval has passed
+    assert leader.tick() == []
+    assert calls == ["ok"]
+
+    metrics = leader.metrics()
+    assert metrics["is_leader"]
+    assert metrics["jobs"]["ok"]["runs"] == 1
+    assert metrics["jobs"]["ok"]["last_result"] == {"done": True}
+    assert metrics["jobs"]["broken"]["failures"] == 1
+    assert metrics["jobs"]["broken"]["last_error"] == "boom"
+    assert metrics["jobs"]["broken"]["last_duration_ms"] >= 0
+
+
+@pytest.fixture
+def file_session_factory(tmp_path):
+    """File-backed database so the lease renewal thread shares it"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'lease.sqlite3'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def test_lease_is_renewed_while_a_long_job_runs(file_session_factory):
+    attempts = []
+
+    def long_job(db):
+        # Outlasts the lease several times over; nobody else may take it meanwhile
+        for _ in range(4):
+            time.sleep(0.15)
+            with file_session_factory() as other:
+                attempts.append(scheduler.acquire_lease(other, "scheduler", "follower", 0.3))
+        return {}
+
+    leader = Scheduler([ScheduledJob("long", 60, long_job)], session_factory=file_session_factory,
+                       holder="leader", lease_seconds=0.3)
+    assert leader.tick() == ["long"]
+    assert attempts == [False] * 4
+    assert leader.is_leader
+
+
+def test_leader_stops_starting_jobs_once_its_lease_is_lost(file_session_factory):
+    calls = []
+
+    def stolen(db):
+        # Another worker takes over while this job runs
+        db.query(models.SchedulerLease).update({
+            models.SchedulerLease.holder: "follower",
+            models.SchedulerLease.expires_at: datetime.utcnow() + timedelta(seconds=60)
+        })
+        db.commit()
+        time.sleep(0.3)
+        calls.append("stolen")
+
+    leader = Scheduler(
+        [ScheduledJob("stolen", 60, stolen), ScheduledJob("next", 60, lambda db: calls.append("next"))],
+        session_factory=file_session_factory, holder="leader", lease_seconds=0.3
+    )
+    assert leader.tick() == ["stolen"]
+    assert calls == ["stolen"]
+    assert not leader.is_leader
+
+
+def test_sent_events_are_marked_paid_out(db_session, make_pari_mutuel_event):
+    sent = make_pari_mutuel_event(bets=[("team_a_wins", 1.0), ("team_b_wins", 1.0)])
+    unsent = make_pari_mutuel_event(bets=[("team_a_wins", 1.0), ("team_b_wins", 1.0)])
+    for sport_event in (sent, unsent):
+        betting_utils.settle_event(db_session, sport_event.id, "push", pool_address="t1pool")
+    db_session.query(models.Payout).filter(models.Payout.sport_event_id == sent.id).update({
+        models.Payout.is_processed: True
+    })
+    db_session.commit()
+
+    assert scheduler.track_payout_status_job(db_session) == {"events_marked_paid_out": 1}
+
+    db_session.expire_all()
+    assert sent.status == models.EventStatus.PAIDOUT
+    assert unsent.status == models.EventStatus.SETTLED
@@ -0,0 +1,66 @@
+"""
+Test the aggregated, keyset-paginated settled-events query.
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from app import crud, models
+from tests.test_query_plans import captured_statements
+
+
+@pytest.fixture
+def settled_events(db_session, make_pari_mutuel_event):
+    """Five settled events, newest settlement first; the oldest has no settled_at"""
+    events = []
+    for i in range(5):
+        sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 1.0 + i), ("team_b_wins", 2.0)])
+        db_session.add(models.Bet(
+            user_id=sport_event.creator_id, sport_event_id=sport_event.id, amount=50.0,
+            predicted_outcome="team_a_wins", deposit_status=models.DepositStatus.PENDING
+        ))
+        sport_event.status = models.EventStatus.SETTLED
+        sport_event.settled_at = sport_event.event_end_time + timedelta(minutes=10 * i) if i else None
+        db_session.query(models.PariMutuelEvent).filter(
+            models.PariMutuelEvent.sport_event_id == sport_event.id
+        ).update({models.PariMutuelEvent.winning_outcome: "team_a_wins" if i % 2 else "team_b_wins"})
+        events.append(sport_event)
+    # Still open: never listed
+    make_pari_mutuel_event(bets=[("team_a_wins", 9.0)])
+    db_session.commit()
+    return [events[4], events[3], events[2], events[1], events[0]]
+
+
+def test_pages_walk_every_settled_event_once(db_session, settled_events):
+    seen = []
+    cursor = None
+    while True:
+        rows, cursor = crud.get_settled_events_page(db_session, limit=2, cursor=cursor)
+        seen.extend(event.id for event, *_ in rows)
+        if cursor is None:
+            break
+    assert seen == [event.id for event in settled_events]
+    assert crud.count_settled_events(db_session) == 5
+
+
+def test_each_page_is_one_aggregated_query(db_session, settled_events):
+    with captured_statements(db_session) as statements:
+        rows, _ = crud.get_settled_events_page(db_session, limit=5)
+        summary = [
+            (event.id, winning_outcome, bet_count, total_pool_amount)
+            for event, winning_outcome, bet_count, total_pool_amount in rows
+        ]
+    assert len(statements) == 1
+
+    # Pending bets are not counted; the fixture's i-th event has a 1.0 + i bet
+    expected = []
+    for position, event in enumerate(settled_events):
+        i = len(settled_events) - 1 - position
+        expected.append((event.id, "team_a_wins" if i % 2 else "team_b_wins", 2, 3.0 + i))
+    assert summary == expected
+
+
+def test_malformed_cursor_is_rejected(db_session):
+    with pytest.raises(ValueError):
+        crud.get_settled_events_page(db_session, cursor="not-a-cursor")
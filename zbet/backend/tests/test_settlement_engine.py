@@ -0,0 +1,99 @@
+"""
+Test the set-based settlement engine (betting_utils._process_event_payouts via settle_event).
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app import betting_utils, models
+
+
+def _payouts(db, sport_event, payout_type):
+    return db.query(models.Payout).filter(
+        models.Payout.sport_event_id == sport_event.id,
+        models.Payout.payout_type == payout_type
+    ).order_by(models.Payout.id).all()
+
+
+def test_settlement_marks_bets_and_creates_payouts(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(
+        bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0), ("team_a_wins", 1.0), ("team_b_wins", 4.0)],
+        validations=["team_a_wins", "team_a_wins", "team_b_wins"]
+    )
+    pending = models.Bet(
+        user_id=sport_event.creator_id, sport_event_id=sport_event.id, amount=9.0,
+        predicted_outcome="team_a_wins", deposit_status=models.DepositStatus.PENDING
+    )
+    db_session.add(pending)
+    db_session.commit()
+
+    response = betting_utils.settle_event(db_session, sport_event.id, "team_a_wins", pool_address="t1pool")
+    db_session.expire_all()
+
+    bets = db_session.query(models.Bet).filter(
+        models.Bet.deposit_status == models.DepositStatus.CONFIRMED
+    ).order_by(models.Bet.id).all()
+    assert [bet.outcome for bet in bets] == [
+        models.BetOutcome.WIN, models.BetOutcome.LOSS, models.BetOutcome.WIN, models.BetOutcome.LOSS
+    ]
+    assert [bet.payout_amount for bet in bets] == [2.0, 0.0, 1.0, 0.0]
+    assert pending.outcome is None
+
+    winners = _payouts(db_session, sport_event, "user_winning")
+    assert [(p.bet_id, p.payout_amount) for p in winners] == [(bets[0].id, 2.0), (bets[2].id, 1.0)]
+    assert winners[0].recipient_address == bets[0].user.zcash_address
+    assert all(not p.is_processed for p in winners)
+
+    # Losing pool is 7.0
+    assert _payouts(db_session, sport_event, "house_fee")[0].payout_amount == pytest.approx(0.35)
+    assert _payouts(db_session, sport_event, "creator_fee")[0].payout_amount == pytest.approx(0.35)
+    assert _payouts(db_session, sport_event, "charity_fee")[0].payout_amount == pytest.approx(4.2)
+    validator_payouts = _payouts(db_session, sport_event, "validator_fee")
+    assert [p.payout_amount for p in validator_payouts] == pytest.approx([0.7, 0.7])
+
+    validations = db_session.query(models.ValidationResult).order_by(models.ValidationResult.id).all()
+    assert [v.is_correct_validation for v in validations] == [True, True, False]
+    assert [v.validator_reward_amount for v in validations] == pytest.approx([0.7, 0.7, 0.0])
+
+    assert response.total_payouts == 7
+    assert [r.payout_type for r in response.payout_records] == [
+        "user_winning", "user_winning", "house_fee", "creator_fee", "charity_fee", "validator_fee", "validator_fee"
+    ]
+    assert response.total_payout_amount == pytest.approx(3.0 + 0.9 * 7.0)
+
+
+def test_push_refunds_every_confirmed_bet_without_fees(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[("team_a_wins", 2.0), ("team_b_wins", 3.0)])
+
+    response = betting_utils.settle_event(db_session, sport_event.id, "push", pool_address="t1pool")
+
+    assert [r.payout_type for r in response.payout_records] == ["refund", "refund"]
+    assert [r.payout_amount for r in response.payout_records] == [2.0, 3.0]
+    outcomes = {bet.outcome for bet in db_session.query(models.Bet)}
+    assert outcomes == {models.BetOutcome.PUSH}
+
+
+def test_statement_count_does_not_grow_with_bets(db_session, make_pari_mutuel_event):
+    engine = db_session.get_bind()
+    counts = []
+    for bet_count in (10, 1000):
+        sport_event = make_pari_mutuel_event(
+            bets=[("team_a_wins" if i % 3 else "team_b_wins", 1.0) for i in range(bet_count)],
+            validations=["team_a_wins"] * 5
+        )
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            betting_utils.settle_event(db_session, sport_event.id, "team_a_wins", pool_address="t1pool")
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+    # Settlement plus the payout plan snapshot
+    assert counts[1] <= 30
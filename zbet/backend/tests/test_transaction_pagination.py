@@ -0,0 +1,85 @@
+"""
+Test keyset (cursor) pagination and counting of user transaction history.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.transaction_service import TransactionService
+
+
+@pytest.fixture
+def user(db_session):
+    user = models.User(
+        username="pager",
+        email="pager@test.com",
+        hashed_password="hashed_password",
+        zcash_address="ztestsaplingpager",
+        zcash_transparent_address="t1pager",
+        zcash_account="1"
+    )
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def _deposits(db, user, count):
+    service = TransactionService(db)
+    transactions = [
+        service.process_deposit(
+            user_id=user.id, amount=1.0, from_address="t1external", zcash_transaction_id=f"tx-{i}"
+        )
+        for i in range(count)
+    ]
+    # Give half of the rows the same timestamp so the id tie-breaker matters
+    shared = datetime(2025, 1, 1)
+    for i, transaction in enumerate(transactions):
+        transaction.created_at = shared if i % 2 else shared + timedelta(seconds=i)
+    db.commit()
+    return transactions
+
+
+def test_cursor_pages_cover_every_transaction_once(db_session, user):
+    transactions = _deposits(db_session, user, 11)
+    service = TransactionService(db_session)
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = service.get_user_transactions_page(user.id, limit=4, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert len(seen) == 11
+    assert {t.id for t in seen} == {t.id for t in transactions}
+    assert seen == sorted(seen, key=lambda t: (t.created_at, t.id), reverse=True)
+
+    # Same order as offset pagination
+    assert seen == service.get_user_transactions(user.id, limit=100)
+
+
+def test_last_full_page_has_no_cursor(db_session, user):
+    _deposits(db_session, user, 4)
+    page, cursor = TransactionService(db_session).get_user_transactions_page(user.id, limit=4)
+    assert len(page) == 4
+    assert cursor is None
+
+
+def test_invalid_cursor_raises_value_error(db_session, user):
+    with pytest.raises(ValueError):
+        TransactionService(db_session).get_user_transactions_page(user.id, cursor="not-a-cursor")
+
+
+def test_count_uses_counter_and_filters(db_session, user):
+    _deposits(db_session, user, 5)
+    service = TransactionService(db_session)
+    service.process_withdrawal(user_id=user.id, amount=0.5, to_address="t1external")
+
+    assert user.transaction_count == 6
+    assert service.count_user_transactions(user.id) == 6
+    assert service.count_user_transactions(
+        user.id, transaction_types=[models.TransactionType.WITHDRAWAL]
+    ) == 1
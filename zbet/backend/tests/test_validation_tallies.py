@@ -0,0 +1,93 @@
+"""
+Test the maintained validation tallies, their rebuild, and the consensus
+rules built on them.
+"""
+
+from app import crud, models, schemas
+from tests.test_query_plans import captured_statements
+
+
+def test_tallies_for_many_events_come_from_one_read(db_session, make_pari_mutuel_event):
+    agreed = make_pari_mutuel_event(bets=[], validations=["team_a_wins"] * 3 + ["team_b_wins"])
+    split = make_pari_mutuel_event(bets=[], validations=["team_a_wins", "team_b_wins"])
+    empty = make_pari_mutuel_event(bets=[])
+    event_ids = [agreed.id, split.id, empty.id]
+
+    with captured_statements(db_session) as statements:
+        tallies = crud.get_validation_tallies(db_session, event_ids)
+    assert len(statements) == 1
+
+    assert tallies == {
+        agreed.id: {"team_a_wins": 3, "team_b_wins": 1},
+        split.id: {"team_a_wins": 1, "team_b_wins": 1},
+        empty.id: {}
+    }
+    assert crud.get_validation_tallies(db_session, []) == {}
+
+
+def test_summary_and_consensus_match_the_tally(db_session, make_pari_mutuel_event):
+    agreed = make_pari_mutuel_event(bets=[], validations=["team_a_wins"] * 3 + ["team_b_wins"])
+    split = make_pari_mutuel_event(bets=[], validations=["team_a_wins", "team_b_wins"])
+
+    summary = crud.get_validation_summary(db_session, agreed.id)
+    assert summary.total_validations == 4
+    assert summary.outcome_counts == {"team_a_wins": 3, "team_b_wins": 1}
+    assert summary.consensus_outcome == "team_a_wins"
+    assert summary.consensus_percentage == 75.0
+    assert crud.determine_consensus_outcome(db_session, agreed.id) == ("team_a_wins", 75.0)
+
+    # A tie has no majority, and too few validations never reach consensus
+    tied = crud.get_validation_summary(db_session, split.id)
+    assert tied.consensus_outcome is None and tied.total_validations == 2
+    assert crud.determine_consensus_outcome(db_session, split.id) == (None, None)
+
+
+def test_consensus_needs_the_minimum_and_the_threshold():
+    assert crud.consensus_from_tally({"a": 2}) == (None, None)
+    assert crud.consensus_from_tally({"a": 3}) == ("a", 100.0)
+    assert crud.consensus_from_tally({"a": 3, "b": 2}) == ("a", 60.0)
+    assert crud.consensus_from_tally({"a": 3, "b": 3}) == (None, None)
+    assert crud.consensus_from_tally({"a": 2, "b": 1, "c": 1}) == (None, None)
+    assert crud.consensus_from_tally({"a": 2, "b": 1, "c": 1}, consensus_threshold=0.5) == ("a", 50.0)
+
+
+def test_submitting_a_validation_updates_the_tally(db_session, make_pari_mutuel_event):
+    sport_event = make_pari_mutuel_event(bets=[], validations=["team_a_wins"])
+    validator = models.User(username="late", email="late@test.com", hashed_password="x", zcash_address="zlate")
+    another = models.User(username="later", email="later@test.com", hashed_password="x", zcash_address="zlater")
+    db_session.add_all([validator, another])
+    db_session.commit()
+
+    crud.create_validation_result(db_session, validator.id, sport_event.id, schemas.ValidationRequest(predicted_outcome="team_a_wins"))
+    crud.create_validation_result(db_session, another.id, sport_event.id, schemas.ValidationRequest(predicted_outcome="team_b_wins"))
+
+    assert crud.get_validation_tally(db_session, sport_event.id) == {"team_a_wins": 2, "team_b_wins": 1}
+    assert crud.rebuild_validation_tallies(db_session, dry_run=True) == []
+
+
+def test_rebuild_repairs_drifted_tallies(db_session, make_pari_mutuel_event):
+    drifted = make_pari_mutuel_event(bets=[], validations=["team_a_wins", "team_a_wins", "team_b_wins"])
+    consistent = make_pari_mutuel_event(bets=[], validations=["team_b_wins"])
+    missing = make_pari_mutuel_event(bets=[], validations=["team_a_wins"])
+
+    db_session.query(models.ValidationTally).filter(
+        models.ValidationTally.sport_event_id == drifted.id, models.ValidationTally.outcome == "team_a_wins"
+    ).update({models.ValidationTally.count: 5})
+    db_session.query(models.ValidationTally).filter(
+        models.ValidationTally.sport_event_id == missing.id
+    ).delete()
+    db_session.add(models.ValidationTally(sport_event_id=consistent.id + 100, outcome="team_a_wins", count=1))
+    db_session.commit()
+
+    stale = [drifted.id, missing.id, consistent.id + 100]
+    assert crud.rebuild_validation_tallies(db_session, dry_run=True) == stale
+    assert crud.get_validation_tally(db_session, drifted.id) == {"team_a_wins": 5, "team_b_wins": 1}
+
+    assert crud.rebuild_validation_tallies(db_session) == stale
+    assert crud.get_validation_tallies(db_session, [drifted.id, consistent.id, missing.id, consistent.id + 100]) == {
+        drifted.id: {"team_a_wins": 2, "team_b_wins": 1},
+        consistent.id: {"team_b_wins": 1},
+        missing.id: {"team_a_wins": 1},
+        consistent.id + 100: {}
+    }
+    assert crud.rebuild_validation_tallies(db_session, dry_run=True) == []
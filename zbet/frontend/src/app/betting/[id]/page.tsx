@@ -204,6 +204,27 @@ export default function IndividualBettingPage() {
     fetchBetDetails();
   }, [betId]);
 
+  // Live pool, odds and status updates pushed by the server (no polling)
+  useEffect(() => {
+    const stream = new EventSource(`${API_BASE_URL}/api/odds/stream?event_ids=${betId}`);
+
+    stream.addEventListener('odds', (message) => {
+      const update = JSON.parse((message as MessageEvent).data);
+      setBet((current: any) => {
+        if (!current) return current;
+        if (!update.odds) return { ...current, status: update.status };
+        return {
+          ...current,
+          status: update.status,
+          bettingDisplay: getBettingDisplayData(current.bettingSystemType, update.odds),
+          participants: update.odds.betting_pools.reduce((sum: number, pool: any) => sum + pool.bet_count, 0)
+        };
+      });
+    });
+
+    return () => stream.close();
+  }, [betId]);
+
   const fetchBetDetails = async () => {
     try {
       setLoading(true);
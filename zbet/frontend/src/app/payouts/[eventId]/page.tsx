@@ -28,6 +28,30 @@ import Disclaimer from '@/components/Disclaimer';
 // API Configuration
 const API_BASE_URL = 'http://localhost:8000';
 
+// Admin payout operations run as background jobs; poll until the job finishes
+const waitForJob = async (jobId: number, token: string) => {
+  for (;;) {
+    const response = await fetch(`${API_BASE_URL}/api/admin/jobs/${jobId}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+    
+    if (!response.ok) {
+      throw new Error(`Failed to fetch job status: ${response.status}`);
+    }
+    
+    const job = await response.json();
+    if (job.status === 'succeeded') {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.last_error || 'Job failed');
+    }
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+  }
+};
+
 // Types for payout processing
 interface PayoutRecord {
   user_id: number | null;
@@ -186,7 +210,8 @@ export default function PayoutProcessingPage() {
         throw new Error(`Failed to process payouts: ${response.status}`);
       }
       
-      const result = await response.json();
+      const job = await response.json();
+      const result = await waitForJob(job.job_id, token);
       alert(`Payouts sent successfully! ${result.processed_payouts} blockchain transactions completed. Transaction ID: ${result.transaction_id}`);
       
       // Redirect back to payouts page
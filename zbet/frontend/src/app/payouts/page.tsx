@@ -26,6 +26,30 @@ import Disclaimer from '@/components/Disclaimer';
 // API Configuration
 const API_BASE_URL = 'http://localhost:8000';
 
+// Admin payout operations run as background jobs; poll until the job finishes
+const waitForJob = async (jobId: number, token: string) => {
+  for (;;) {
+    const response = await fetch(`${API_BASE_URL}/api/admin/jobs/${jobId}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+    
+    if (!response.ok) {
+      throw new Error(`Failed to fetch job status: ${response.status}`);
+    }
+    
+    const job = await response.json();
+    if (job.status === 'succeeded') {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.last_error || 'Job failed');
+    }
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+  }
+};
+
 // Types for payouts
 interface SettledEvent {
   id: number;
@@ -47,6 +71,9 @@ export default function PayoutsPage() {
   const [searchTerm, setSearchTerm] = useState('');
   const [sortBy, setSortBy] = useState('settlement'); // settlement, amount, count
   const [settledEvents, setSettledEvents] = useState<SettledEvent[]>([]);
+  const [totalCount, setTotalCount] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [processingEventId, setProcessingEventId] = useState<number | null>(null);
@@ -65,9 +92,15 @@ export default function PayoutsPage() {
     }
   }, [isAuthenticated, router]);
 
-  const fetchSettledEvents = async () => {
+  // Pass the previous page's cursor to append the next page of settled events
+  const fetchSettledEvents = async (cursor: string | null = null) => {
     try {
-      setLoading(true);
+      // Keep the list on screen while the next page loads
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
       setError(null);
       
       // Get the authentication token
@@ -77,7 +110,8 @@ export default function PayoutsPage() {
       }
       
       // Get settled events that are ready for payout processing
-      const response = await fetch(`${API_BASE_URL}/api/admin/settled-events`, {
+      const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${API_BASE_URL}/api/admin/settled-events${params}`, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
@@ -88,13 +122,17 @@ export default function PayoutsPage() {
       }
       
       const data = await response.json();
-      setSettledEvents(data.settled_events || []);
+      const page = data.settled_events || [];
+      setSettledEvents((previous) => (cursor ? [...previous, ...page] : page));
+      setTotalCount(data.total_count || 0);
+      setNextCursor(data.next_cursor || null);
       
     } catch (err) {
       console.error('Failed to fetch settled events:', err);
       setError(err instanceof Error ? err.message : 'Failed to load settled events');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -121,7 +159,8 @@ export default function PayoutsPage() {
         throw new Error(`Failed to process payouts: ${response.status}`);
       }
       
-      const result = await response.json();
+      const job = await response.json();
+      const result = await waitForJob(job.job_id, token);
       console.log('Payout processing result:', result);
       
       // Navigate to the payout detail page to show the created records
@@ -195,7 +234,7 @@ export default function PayoutsPage() {
           <p className="text-red-600 text-lg mb-4">Failed to load settled events</p>
           <p className="text-gray-600 mb-4">{error}</p>
           <button 
-            onClick={fetchSettledEvents}
+            onClick={() => fetchSettledEvents()}
             className="bg-banana-400 hover:bg-banana-500 text-white px-6 py-2 rounded-lg"
           >
             Try Again
@@ -280,7 +319,7 @@ export default function PayoutsPage() {
 
             <div className="flex items-center space-x-4">
               <button 
-                onClick={fetchSettledEvents}
+                onClick={() => fetchSettledEvents()}
                 className="flex items-center space-x-2 text-sm text-banana-600 hover:text-banana-700"
               >
                 <RefreshCw size={16} />
@@ -400,6 +439,19 @@ export default function PayoutsPage() {
           </AnimatePresence>
         </motion.div>
 
+        {/* Next Page */}
+        {nextCursor && (
+          <div className="text-center mt-6">
+            <button
+              onClick={() => fetchSettledEvents(nextCursor)}
+              disabled={loadingMore}
+              className="px-6 py-2 rounded-lg font-medium bg-banana-500 hover:bg-banana-600 text-white disabled:bg-gray-400"
+            >
+              Load more ({settledEvents.length} of {totalCount})
+            </button>
+          </div>
+        )}
+
         {/* Empty State */}
         {filteredEvents.length === 0 && (
           <motion.div